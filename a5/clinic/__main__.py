@@ -1,21 +1,34 @@
 import os
 import sys
-from clinic.cli.clinic_cli import ClinicCLI
-import clinic.gui.clinic_gui
+
+#each front-end is imported only when it is run, so the cli never pays for (or needs) PyQt6
 
 def main():
 	# You can run either a command-line interface (CLI) 
 	# or a graphical user interface (GUI) to your clinic.
+	# Patients can also be imported from or exported to a .csv or .jsonl file.
+	if len(sys.argv) == 3 and sys.argv[1] == 'import':
+		from clinic.cli.import_cli import ImportCLI
+		ImportCLI(sys.argv[2])
+		return
+	if len(sys.argv) >= 3 and sys.argv[1] == 'export':
+		from clinic.cli.export_cli import ExportCLI
+		ExportCLI(sys.argv[2:])
+		return
 	if len(sys.argv) != 2:
 		print('ERROR: wrong number of arguments')
 		print('\nCorrect Command usage:')
 		print('python -m clinic option')
 		print('where option is either cli or gui')
+		print('or: python -m clinic import file')
+		print('or: python -m clinic export file [--from-phn PHN] [--to-phn PHN] [--since DATE] [--until DATE]')
 		sys.exit()
 
 	if sys.argv[1] == 'cli':
+		from clinic.cli.clinic_cli import ClinicCLI
 		ClinicCLI()
 	elif sys.argv[1] == 'gui':
+		import clinic.gui.clinic_gui
 		clinic.gui.clinic_gui.main()
 	else:
 		print('ERROR: Wrong argument')
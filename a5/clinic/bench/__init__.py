@@ -0,0 +1,5 @@
+'''Benchmarks for the clinic storage layer.
+
+Each module can be run on its own, e.g. python -m clinic.bench.startup.
+python -m clinic.bench runs the operation suite of clinic.bench.suite.
+'''
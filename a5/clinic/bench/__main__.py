@@ -0,0 +1,3 @@
+from clinic.bench.suite import main
+
+main()
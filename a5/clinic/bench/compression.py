@@ -0,0 +1,57 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from clinic.bench.memory import iter_patients
+from clinic.bench.notes import fill
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao_log import NoteDAOLog
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def measure_patients(directory, count, compress):
+    """Return (bytes, save seconds, load seconds) of patients.json."""
+    filename = os.path.join(directory, 'patients.json')
+    dao = PatientDAOJSON(filename=filename, compress=compress)
+    dao.create_patients(iter_patients(count))
+    dao.autosave = True
+    save = timed(dao.save_patients)
+    load = timed(lambda: PatientDAOJSON(autosave=True, filename=filename))
+    return os.path.getsize(filename), save, load
+
+def measure_notes(directory, cls, count, compress):
+    """Return (bytes, save seconds, load seconds) of one patient record holding count notes."""
+    records_path = os.path.join(directory, cls.__name__)
+    open_dao = lambda: cls(9700000000, autosave=True, records_path=records_path, compress=compress)
+    save = timed(lambda: fill(open_dao(), count))
+    load = timed(open_dao)
+    size = sum(os.path.getsize(os.path.join(records_path, name)) for name in os.listdir(records_path))
+    return size, save, load
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare plain and compressed storage size and speed.')
+    parser.add_argument('--patients', type=int, default=100000)
+    parser.add_argument('--notes', type=int, default=10000)
+    args = parser.parse_args()
+
+    print('%-22s %12s %10s %10s' % ('store', 'bytes', 'save ms', 'load ms'))
+    rows = [('patients.json', lambda directory, compress: measure_patients(directory, args.patients, compress))]
+    for cls in (NoteDAOPickle, NoteDAOLog):
+        rows.append((cls.__name__, lambda directory, compress, cls=cls: measure_notes(directory, cls, args.notes, compress)))
+    for name, measure in rows:
+        for compress in (False, True):
+            directory = tempfile.mkdtemp()
+            try:
+                size, save, load = measure(directory, compress)
+            finally:
+                shutil.rmtree(directory)
+            label = name + (' zlib' if compress else '')
+            print('%-22s %12d %10.1f %10.1f' % (label, size, save * 1e3, load * 1e3))
+
+if __name__ == '__main__':
+    main()
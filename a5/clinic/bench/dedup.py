@@ -0,0 +1,72 @@
+import argparse
+import os
+import shutil
+import tempfile
+from clinic.bench.memory import bytes_per_item
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.text_store import TextStore
+from clinic.note import Note
+
+#lines that notes written from templates repeat word for word
+TEMPLATE = (
+    "Family history of hypertension and type 2 diabetes, no known drug allergies.",
+    "Vital signs: blood pressure within normal range, heart rate regular, afebrile.",
+    "Plan: continue the current medication, repeat blood work in three months.",
+)
+
+def iter_texts(count):
+    #texts are formatted fresh for every note, the way they are typed in or loaded
+    for i in range(count):
+        yield '%s\n%s\nVisit %d, patient reports mild headache.\n%s\n' % (TEMPLATE[0], TEMPLATE[1], i, TEMPLATE[2])
+
+def note_records(count):
+    return [Note(i + 1, text) for i, text in enumerate(iter_texts(count))]
+
+def deduplicated_records(count):
+    text_store = TextStore()
+    return text_store, [text_store.note(i + 1, text) for i, text in enumerate(iter_texts(count))]
+
+def note_store(count, text_store=None):
+    """Note store with its word index."""
+    dao = MemoryNoteDAO(text_store)
+    for text in iter_texts(count):
+        dao.create_note(text)
+    return dao
+
+def deduplicated_store(count):
+    return note_store(count, TextStore())
+
+def record_bytes(directory, patients, count, dedup):
+    """Return the bytes on disk of patients records of count notes each."""
+    records_path = os.path.join(directory, 'records')
+    text_store = TextStore(os.path.join(records_path, 'blocks.dat')) if dedup else None
+    for phn in range(9700000000, 9700000000 + patients):
+        dao = NoteDAOPickle(phn, records_path=records_path, text_store=text_store)
+        for text in iter_texts(count):
+            dao.create_note(text)
+        dao.autosave = True
+        dao.save_notes()
+    return sum(os.path.getsize(os.path.join(records_path, name)) for name in os.listdir(records_path))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare notes with and without shared text blocks.')
+    parser.add_argument('--notes', type=int, default=100000)
+    parser.add_argument('--patients', type=int, default=100)
+    parser.add_argument('--notes-per-patient', type=int, default=100)
+    args = parser.parse_args()
+
+    for name, build in (('note records', note_records), ('deduplicated records', deduplicated_records),
+                        ('note store', note_store), ('deduplicated store', deduplicated_store)):
+        print('%-20s %9d  %8.1f bytes/note' % (name, args.notes, bytes_per_item(build, args.notes)))
+    for dedup in (False, True):
+        directory = tempfile.mkdtemp()
+        try:
+            size = record_bytes(directory, args.patients, args.notes_per_patient, dedup)
+        finally:
+            shutil.rmtree(directory)
+        print('%-20s %9d  %8d bytes on disk' % ('deduplicated files' if dedup else 'record files',
+                                                args.patients * args.notes_per_patient, size))
+
+if __name__ == '__main__':
+    main()
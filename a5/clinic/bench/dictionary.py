@@ -0,0 +1,87 @@
+'''Offline trainer of the preset zlib dictionary for note text.
+
+The dictionary compressed notes are written with is frozen in
+clinic/dao/note_dictionary.py, since note log records and note store
+segments are compressed with it without naming it. This tool prints the
+source of that module for a new dictionary:
+
+    python -m clinic.bench.dictionary > note_dictionary.py
+
+Files written with the frozen dictionary can only be read with it, so a
+new one is added to clinic.dao.compression.DICTIONARIES next to the old one
+instead of replacing it.
+'''
+import argparse
+from collections import Counter
+
+#typical note text the note dictionary is trained on
+NOTE_SAMPLES = (
+    "Patient comes with headache and high blood pressure.",
+    "Patient complains of a strong headache on the back of neck.",
+    "Patient is taking medicines to control blood pressure.",
+    "Patient feels general improvement and no more headaches.",
+    "Patient says high BP is controlled, 120x80 in general.",
+    "Follow up visit, blood pressure normal, patient reports mild headache.",
+    "Patient reports fever and sore throat for the past three days.",
+    "Prescribed antibiotics for 7 days, follow up in two weeks.",
+    "Patient reports chest pain and shortness of breath, referred to cardiology.",
+    "Blood test results are normal, no further action required.",
+    "Patient complains of back pain after a fall, prescribed physiotherapy.",
+    "Patient is allergic to penicillin.",
+    "Annual physical examination, no concerns, vaccinations up to date.",
+    "Patient reports trouble sleeping and anxiety, discussed treatment options.",
+    "Blood sugar levels are high, adjusted the diabetes medication dosage.",
+    "Patient has a persistent cough, ordered a chest x-ray.",
+    "Wound is healing well, stitches removed.",
+    "Patient reports nausea and dizziness since starting the new medication.",
+    "Referred to a specialist for further assessment.",
+    "Patient will continue the current treatment and return in one month.",
+)
+
+def train_dictionary(samples, size=8192):
+    """Build a preset dictionary from the word sequences that recur most in samples.
+
+    Runs of one to four words are scored by how many bytes their repetitions
+    cover, and the best ones are kept until the dictionary reaches size bytes.
+    zlib reaches back to the end of the dictionary most cheaply, so the best
+    runs go last."""
+    counts = Counter()
+    for sample in samples:
+        words = sample.split()
+        for n in range(1, 5):
+            for i in range(len(words) - n + 1):
+                counts[' '.join(words[i:i + n])] += 1
+    runs = sorted(counts, key=lambda run: (counts[run] * len(run), run), reverse=True)
+    chosen = []
+    length = 0
+    for run in runs:
+        if length + len(run) + 1 > size:
+            break
+        chosen.append(run)
+        length += len(run) + 1
+    return ' '.join(reversed(chosen)).encode()
+
+def dictionary_source(name, zdict, width=100):
+    """Return the source of a module defining name as the bytes of zdict."""
+    lines = []
+    start = 0
+    while start < len(zdict):
+        #lines are cut after a space, so the words stay readable
+        end = zdict.rfind(b' ', start, start + width) + 1 if start + width < len(zdict) else len(zdict)
+        if end <= start:
+            end = min(start + width, len(zdict))
+        lines.append('    %r' % zdict[start:end])
+        start = end
+    return ("'''Preset zlib dictionary of note text, written by clinic.bench.dictionary.\n\n"
+            "Part of the file format of compressed notes, never edit it.\n'''\n"
+            "%s = (\n%s\n)\n" % (name, '\n'.join(lines)))
+
+def main():
+    parser = argparse.ArgumentParser(description='Train a note dictionary and print it as a Python module.')
+    parser.add_argument('--size', type=int, default=8192, help='most bytes in the dictionary')
+    parser.add_argument('--name', default='NOTE_DICTIONARY')
+    args = parser.parse_args()
+    print(dictionary_source(args.name, train_dictionary(NOTE_SAMPLES, args.size)), end='')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from clinic.dao.durability import LEVELS
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.patient import Patient
+
+def patient(i):
+    return Patient(9700000000 + i, 'Patient %d Doe' % i, '1990-01-15', '250 203 %04d' % (i % 10000),
+                   'patient%d@gmail.com' % i, '%d Moss St, Victoria' % i)
+
+def measure_patients(directory, durability, patients, writes, journal):
+    """Return the mean latency of a patient update over writes updates."""
+    dao = PatientDAOJSON(autosave=True, journal=journal, filename=os.path.join(directory, 'patients.json'),
+                         compact_threshold=writes + 1, durability=durability)
+    dao.create_patients(patient(i) for i in range(patients))
+    start = time.perf_counter()
+    for i in range(writes):
+        dao.update_patient(9700000000 + i % patients, patient(i % patients))
+    return (time.perf_counter() - start) / writes
+
+def measure_notes(directory, durability, notes, writes):
+    """Return the mean latency of adding a note to a record that already holds notes."""
+    dao = NoteDAOPickle(phn=9700000000, autosave=True, records_path=os.path.join(directory, 'records'),
+                        durability=durability)
+    for i in range(notes):
+        dao.create_note('Follow up visit %d, blood pressure normal.' % i)
+    start = time.perf_counter()
+    for i in range(writes):
+        dao.create_note('Patient reports mild headache %d.' % i)
+    return (time.perf_counter() - start) / writes
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare save latency for each durability level.')
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--notes', type=int, default=100)
+    parser.add_argument('--writes', type=int, default=200)
+    args = parser.parse_args()
+
+    print('patients: %d, notes: %d, writes: %d' % (args.patients, args.notes, args.writes))
+    print('%-8s %14s %14s %14s' % ('level', 'snapshot ms', 'journal ms', 'note ms'))
+    for durability in LEVELS:
+        directory = tempfile.mkdtemp()
+        try:
+            snapshot = measure_patients(os.path.join(directory, 'snapshot'), durability, args.patients, args.writes, False)
+            journal = measure_patients(os.path.join(directory, 'journal'), durability, args.patients, args.writes, True)
+            notes = measure_notes(directory, durability, args.notes, args.writes)
+        finally:
+            shutil.rmtree(directory)
+        print('%-8s %14.3f %14.3f %14.3f' % (durability, snapshot * 1e3, journal * 1e3, notes * 1e3))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+'''Seeded generator of synthetic clinic data for load and scale testing.
+
+Every patient and every note history is drawn from a random stream of its
+own, seeded with the generator seed and the patient index, so patient i
+comes out the same however many patients are generated and in whatever
+order. Nothing but the patient being written is ever held in memory, so
+millions of patients and tens of millions of notes stream straight into a
+DAO or into the patients.json and clinic/records files the DAOs load.
+
+    python -m clinic.bench.generator DIRECTORY --patients 1000000 --notes-per-patient 10
+'''
+import argparse
+import json
+import os
+import pickle
+import random
+from datetime import datetime, timedelta
+from clinic.dao.note_dao_log import PUT, encode_record
+from clinic.dao.patient_encoder import PatientEncoder
+from clinic.note import Note
+from clinic.patient import Patient
+
+FIRST_NAMES = ('Olivia', 'Liam', 'Emma', 'Noah', 'Amelia', 'Oliver', 'Sophia', 'Lucas', 'Charlotte', 'Ethan',
+               'Ava', 'Benjamin', 'Chloe', 'Jacob', 'Maya', 'William', 'Zoe', 'Arjun', 'Mei', 'Mohammed',
+               'Priya', 'Daniel', 'Hannah', 'Samuel', 'Leah', 'Gabriel', 'Nora', 'Ali', 'Isabella', 'Kenji')
+LAST_NAMES = ('Smith', 'Brown', 'Tremblay', 'Martin', 'Roy', 'Wilson', 'MacDonald', 'Gagnon', 'Johnson', 'Taylor',
+              'Campbell', 'Anderson', 'Lee', 'Wong', 'Singh', 'Chen', 'Nguyen', 'Patel', 'Kim', 'Thompson',
+              'White', 'Clark', 'Young', 'Scott', 'Morin', 'Khan', 'Ali', 'Garcia', 'Walker', 'Harris')
+STREETS = ('Moss St', 'Fort St', 'Yates St', 'Cook St', 'Fairfield Rd', 'Oak Bay Ave', 'Shelbourne St',
+           'Douglas St', 'Quadra St', 'Blanshard St', 'Richmond Rd', 'Foul Bay Rd', 'Gorge Rd', 'Hillside Ave')
+CITIES = ('Victoria', 'Saanich', 'Esquimalt', 'Oak Bay', 'Langford', 'Colwood', 'Sidney', 'View Royal')
+AREA_CODES = ('250', '778', '236')
+DOMAINS = ('gmail.com', 'outlook.com', 'yahoo.ca', 'shaw.ca', 'telus.net', 'uvic.ca')
+
+SYMPTOMS = ('headache', 'fever', 'sore throat', 'back pain', 'cough', 'dizziness', 'nausea', 'chest pain',
+            'shortness of breath', 'fatigue', 'insomnia', 'anxiety', 'rash', 'joint pain', 'abdominal pain')
+DURATIONS = ('since yesterday', 'for two days', 'for a week', 'for the past month', 'on and off for a year')
+FINDINGS = (
+    "Blood pressure {systolic}x{diastolic}, heart rate {pulse}.",
+    "Temperature {temperature:.1f} C, lungs clear on auscultation.",
+    "No abnormalities found on examination.",
+    "Mild tenderness on palpation.",
+    "Blood test results are normal.",
+    "Blood sugar {sugar:.1f} mmol/L.",
+)
+PLANS = (
+    "Prescribed {drug} for {days} days, follow up in two weeks.",
+    "Continue the current treatment and return in one month.",
+    "Referred to a specialist for further assessment.",
+    "Ordered blood work and a chest x-ray.",
+    "Advised rest and fluids, return if symptoms persist.",
+    "Adjusted the {drug} dosage.",
+)
+DRUGS = ('amoxicillin', 'ibuprofen', 'metformin', 'lisinopril', 'atorvastatin', 'salbutamol', 'sertraline')
+#lines copied into notes word for word, as templates and copy-paste do
+BOILERPLATE = (
+    "Family history of hypertension and type 2 diabetes, no known drug allergies.",
+    "Patient identity confirmed, consent obtained for examination and treatment.",
+    "Medication list reviewed and reconciled with the pharmacy record.",
+)
+
+#weights of the 2nd to 9th digits in the mod 11 check of a BC PHN
+WEIGHTS = (2, 4, 8, 5, 10, 9, 7, 3)
+
+def check_digit(digits):
+    """Return the check digit of the 2nd to 9th PHN digits, 10 or 11 when there is none."""
+    return 11 - sum(digit * weight % 11 for digit, weight in zip(digits, WEIGHTS)) % 11
+
+def is_valid_phn(phn):
+    digits = [int(c) for c in str(phn)]
+    return len(digits) == 10 and digits[0] == 9 and check_digit(digits[1:9]) == digits[9]
+
+def make_phn(number):
+    """Return the valid PHN whose 2nd to 8th digits are number."""
+    if not 0 <= number < 10 ** 7:
+        raise ValueError('phn number out of range: %d' % number)
+    digits = [int(c) for c in '%07d' % number]
+    #the 9th digit is picked so that the number has a check digit
+    for ninth in range(10):
+        check = check_digit(digits + [ninth])
+        if check < 10:
+            return int('9%07d%d%d' % (number, ninth, check))
+
+def write_patients(filename, patients):
+    """Write patients to filename in the patients.json format, one at a time."""
+    with open(filename, 'w') as f:
+        f.write('[')
+        for i, patient in enumerate(patients):
+            f.write(',\n' if i else '\n')
+            f.write(json.dumps(patient, cls=PatientEncoder, indent=2))
+        f.write('\n]')
+
+def write_record(records_path, phn, notes, record_format='pickle'):
+    """Write notes as the record file of phn, a NoteDAOPickle .dat or a NoteDAOLog .log."""
+    if record_format == 'pickle':
+        notes = {note.code: note for note in notes}
+        with open(os.path.join(records_path, f'{phn}.dat'), 'wb') as f:
+            pickle.dump({'notes': notes, 'counter': max(notes, default=0)}, f)
+    elif record_format == 'log':
+        with open(os.path.join(records_path, f'{phn}.log'), 'wb') as f:
+            for note in notes:
+                f.write(encode_record(PUT, note.code, note.timestamp, note.text))
+    else:
+        raise ValueError('unknown record format: %s' % record_format)
+
+class Generator:
+    '''Synthetic patients and note histories, the same for the same seed.
+
+    Patient i has the PHN make_phn(first + i), so PHNs are unique and known
+    without generating the patient. Note histories are notes_per_patient
+    long on average, exponentially distributed, so most are short and a few
+    are long, and start between start and a year after it.
+    '''
+    def __init__(self, seed=0, notes_per_patient=10, first=0, start=datetime(2015, 1, 1)):
+        self.seed = seed
+        self.notes_per_patient = notes_per_patient
+        self.first = first
+        self.start = start
+
+    def random(self, index, stream='patient'):
+        return random.Random('%d:%d:%s' % (self.seed, index, stream))
+
+    def phn(self, index):
+        return make_phn(self.first + index)
+
+    def patient(self, index, autosave=False, note_dao_factory=None):
+        """Return patient index."""
+        rng = self.random(index)
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        birth_date = '%d-%02d-%02d' % (rng.randint(1930, 2023), rng.randint(1, 12), rng.randint(1, 28))
+        phone = '%s %03d %04d' % (rng.choice(AREA_CODES), rng.randint(200, 999), rng.randint(0, 9999))
+        email = '%s.%s%d@%s' % (first_name.lower(), last_name.lower(), rng.randint(1, 999), rng.choice(DOMAINS))
+        address = '%d %s, %s' % (rng.randint(1, 3999), rng.choice(STREETS), rng.choice(CITIES))
+        return Patient(self.phn(index), '%s %s' % (first_name, last_name), birth_date, phone, email, address,
+                       autosave=autosave, note_dao_factory=note_dao_factory)
+
+    def iter_patients(self, count, start=0):
+        """Yield patients start to start + count."""
+        for index in range(start, start + count):
+            yield self.patient(index)
+
+    def note_count(self, index):
+        """Return the length of the note history of patient index."""
+        if not self.notes_per_patient:
+            return 0
+        return round(self.random(index, 'count').expovariate(1 / self.notes_per_patient))
+
+    def note_text(self, rng):
+        lines = []
+        if rng.random() < 0.3:
+            lines.append(rng.choice(BOILERPLATE))
+        lines.append('Patient reports %s %s.' % (rng.choice(SYMPTOMS), rng.choice(DURATIONS)))
+        for finding in rng.sample(FINDINGS, rng.randint(0, 2)):
+            lines.append(finding.format(systolic=rng.randint(100, 170), diastolic=rng.randint(60, 100),
+                                        pulse=rng.randint(50, 110), temperature=rng.uniform(36, 40),
+                                        sugar=rng.uniform(4, 12)))
+        lines.append(rng.choice(PLANS).format(drug=rng.choice(DRUGS), days=rng.choice((5, 7, 10, 14))))
+        return '\n'.join(lines)
+
+    def iter_notes(self, index, count=None):
+        """Yield the note history of patient index oldest first, note_count(index) notes unless count is given."""
+        rng = self.random(index, 'notes')
+        if count is None:
+            count = self.note_count(index)
+        timestamp = self.start + timedelta(days=rng.uniform(0, 365))
+        for code in range(1, count + 1):
+            yield Note(code, self.note_text(rng), timestamp)
+            timestamp += timedelta(hours=rng.expovariate(1 / (24 * 30)))
+
+    def fill_notes(self, note_dao, index, count=None):
+        """Add the note history of patient index to note_dao in one batch and return how many notes it has."""
+        notes = 0
+        note_dao.begin_batch()
+        for note in self.iter_notes(index, count):
+            note_dao.create_note(note.text, note.timestamp)
+            notes += 1
+        note_dao.commit_batch()
+        return notes
+
+    def populate(self, patient_dao, count, notes=True, chunk_size=10000):
+        """Create count patients in patient_dao, with their note histories when notes is set.
+
+        Returns (patients, notes) created."""
+        patients = created_notes = 0
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            patients += patient_dao.create_patients(self.iter_patients(size, start))
+            if not notes:
+                continue
+            for index in range(start, start + size):
+                patient = patient_dao.search_patient(self.phn(index))
+                #persistent note stores are closed after each patient, in memory they are all there is
+                note_dao = patient.transient_note_dao() if patient.autosave else patient.note_dao
+                created_notes += self.fill_notes(note_dao, index)
+        return patients, created_notes
+
+    def write_clinic(self, directory, count, record_format='pickle'):
+        """Write count patients to directory/patients.json and their notes to directory/records.
+
+        Returns (patients, notes) written."""
+        records_path = os.path.join(directory, 'records')
+        os.makedirs(records_path, exist_ok=True)
+        write_patients(os.path.join(directory, 'patients.json'), self.iter_patients(count))
+        notes = 0
+        for index in range(count):
+            history = list(self.iter_notes(index))
+            if history:
+                write_record(records_path, self.phn(index), history, record_format)
+                notes += len(history)
+        return count, notes
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic clinic in the patients.json and records format.')
+    parser.add_argument('directory', help='where patients.json and records/ are written, e.g. clinic')
+    parser.add_argument('--patients', type=int, default=10000)
+    parser.add_argument('--notes-per-patient', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=('pickle', 'log'), default='pickle',
+                        help='record files for NoteDAOPickle or for NoteDAOLog')
+    args = parser.parse_args()
+
+    generator = Generator(args.seed, args.notes_per_patient)
+    patients, notes = generator.write_clinic(args.directory, args.patients, args.format)
+    print('%d patients, %d notes written to %s' % (patients, notes, args.directory))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import tracemalloc
+from clinic.bench.generator import Generator
+from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.dao.columnar_patient_dao import ColumnarPatientDAO
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+
+def iter_patients(count):
+    #fields are built fresh for every patient, the way the decoder parses them
+    return Generator().iter_patients(count)
+
+def iter_notes(count):
+    return Generator().iter_notes(0, count)
+
+def patient_records(count):
+    return list(iter_patients(count))
+
+def patient_registry(count):
+    """Registry with its name index, as the controller keeps it."""
+    dao = MemoryPatientDAO()
+    dao.create_patients(iter_patients(count))
+    return dao
+
+def columnar_registry(count):
+    return ColumnarPatientDAO(iter_patients(count))
+
+def note_records(count):
+    return list(iter_notes(count))
+
+def note_store(count):
+    """Note store with its word index."""
+    dao = MemoryNoteDAO()
+    for note in iter_notes(count):
+        dao.create_note(note.text)
+    return dao
+
+def bytes_per_item(build, count):
+    tracemalloc.start()
+    store = build(count)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return used / count
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the memory held per patient and per note.')
+    parser.add_argument('--patients', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--notes', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    for count in args.patients:
+        for name, build in (('patient records', patient_records), ('patient registry', patient_registry),
+                            ('columnar registry', columnar_registry)):
+            print('%-18s %9d  %8.1f bytes/patient' % (name, count, bytes_per_item(build, count)))
+    for count in args.notes:
+        for name, build in (('note records', note_records), ('note store', note_store)):
+            print('%-18s %9d  %8.1f bytes/note' % (name, count, bytes_per_item(build, count)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+from clinic.bench.generator import Generator
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao_log import NoteDAOLog
+from clinic.dao.note_dao_store import NoteDAOStore
+from clinic.dao.note_store import NoteStore
+
+PHN = 9700000000
+
+def fill(dao, count):
+    """Add count notes to dao, then write them once."""
+    Generator().fill_notes(dao, 0, count)
+
+def measure(open_dao, shown):
+    """Return the best of three times taken to open a record and read its newest notes."""
+    times = []
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        dao = open_dao()
+        texts = [note.text for note in dao.list_notes(shown)]
+        times.append(time.perf_counter() - start)
+    return min(times), len(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare opening a long patient record in each note store.')
+    parser.add_argument('--notes', type=int, default=10000)
+    parser.add_argument('--shown', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        store = NoteStore(os.path.join(directory, 'notes.dat'))
+        stores = (
+            ('pickle', lambda: NoteDAOPickle(PHN, autosave=True, records_path=directory)),
+            ('log', lambda: NoteDAOLog(PHN + 1, autosave=True, records_path=directory)),
+            ('store', lambda: NoteDAOStore(PHN + 2, store, autosave=True, records_path=directory)),
+        )
+        print('notes: %d, newest shown: %d' % (args.notes, args.shown))
+        for name, open_dao in stores:
+            fill(open_dao(), args.notes)
+            seconds, shown = measure(open_dao, args.shown)
+            print('%-8s %8.2f ms' % (name, seconds * 1e3))
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from clinic.bench.generator import Generator, write_patients
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.patient_decoder import PatientDecoder
+
+def load_legacy(filename):
+    #the loader used before patients were decoded in a single pass
+    with open(filename, 'r') as f:
+        data = json.load(f)
+        decoder = PatientDecoder(autosave=True)
+        patients = decoder.decode(json.dumps(data))
+        return {p.phn: p for p in patients}
+
+def load_streaming(filename):
+    return PatientDAOJSON(autosave=True, filename=filename).patients
+
+def measure(load, filename):
+    """Return (seconds, peak traced bytes) of a load, timed and traced in separate runs."""
+    start = time.perf_counter()
+    patients = load(filename)
+    seconds = time.perf_counter() - start
+    del patients
+    tracemalloc.start()
+    load(filename)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare patients.json startup loaders.')
+    parser.add_argument('--patients', type=int, default=100000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'patients.json')
+        write_patients(filename, Generator().iter_patients(args.patients))
+        print('patients: %d, file: %.1f MB' % (args.patients, os.path.getsize(filename) / 1e6))
+        for name, load in (('legacy', load_legacy), ('streaming', load_streaming)):
+            seconds, peak = measure(load, filename)
+            print('%-10s %8.3f s  peak %8.1f MB' % (name, seconds, peak / 1e6))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
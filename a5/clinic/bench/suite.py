@@ -0,0 +1,183 @@
+'''Operation benchmarks for the patient and note DAOs at several store sizes.
+
+Each store is filled to a size, then every operation is timed call by
+call on it, until it has run ops times or for seconds, whichever comes
+first. Results go to stdout, or to --output, as a JSON document with the
+calls per second, the p50 and p99 latency of each operation and the peak
+memory traced while the store was built.
+
+Persistent stores save on every call the way the controller runs them:
+PatientDAOJSON appends each change to its journal and NoteDAOPickle
+rewrites its record file, so the slowest calls show when they compact.
+'''
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from clinic.bench.generator import SYMPTOMS, Generator
+from clinic.bench.notes import fill
+from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+
+#patients 0 to size fill the store, those created while benchmarking come after them
+GENERATOR = Generator()
+PHN = GENERATOR.phn(0)
+
+def json_patients(directory, size):
+    filename = os.path.join(directory, 'patients.json')
+    dao = PatientDAOJSON(filename=filename)
+    GENERATOR.populate(dao, size, notes=False)
+    dao.autosave = True
+    dao.save_patients()
+    return PatientDAOJSON(autosave=True, journal=True, filename=filename)
+
+def memory_patients(directory, size):
+    dao = MemoryPatientDAO()
+    GENERATOR.populate(dao, size, notes=False)
+    return dao
+
+def memory_notes(directory, size):
+    dao = MemoryNoteDAO()
+    fill(dao, size)
+    return dao
+
+def pickle_notes(directory, size):
+    records_path = os.path.join(directory, 'records')
+    fill(NoteDAOPickle(PHN, autosave=True, records_path=records_path), size)
+    return NoteDAOPickle(PHN, autosave=True, records_path=records_path)
+
+def patient_operations(dao, size, pick, ops):
+    """Return (name, call) pairs, call(i) running the i-th call of the operation."""
+    #arguments that take work to build are built before the timing starts
+    new_patients = list(GENERATOR.iter_patients(ops, size))
+    phns = [GENERATOR.phn(pick(size)) for _ in range(ops)]
+    names = [GENERATOR.patient(pick(size)).name for _ in range(ops)]
+    updated = []
+    for i in range(ops):
+        patient = GENERATOR.patient(pick(size))
+        patient.phone = '250 999 %04d' % (i % 10000)
+        updated.append(patient)
+    return (
+        ('create', lambda i: dao.create_patient(new_patients[i])),
+        ('search', lambda i: dao.search_patient(phns[i])),
+        ('retrieve', lambda i: dao.retrieve_patients(names[i])),
+        ('update', lambda i: dao.update_patient(updated[i].phn, updated[i])),
+        ('list', lambda i: dao.list_patients()),
+        ('delete', lambda i: dao.delete_patient(new_patients[i].phn)),
+    )
+
+def note_operations(dao, size, pick, ops):
+    texts = [note.text for note in GENERATOR.iter_notes(1, ops)]
+    return (
+        ('create', lambda i: dao.create_note(texts[i])),
+        ('search', lambda i: dao.search_note(1 + pick(size))),
+        ('retrieve', lambda i: dao.retrieve_notes(SYMPTOMS[pick(len(SYMPTOMS))])),
+        ('update', lambda i: dao.update_note(1 + pick(size), texts[-1 - i])),
+        ('list', lambda i: dao.list_notes()),
+        ('delete', lambda i: dao.delete_note(size + 1 + i)),
+    )
+
+#name -> (build the store of a size in a directory, its operations)
+STORES = {
+    'MemoryPatientDAO': (memory_patients, patient_operations),
+    'PatientDAOJSON': (json_patients, patient_operations),
+    'MemoryNoteDAO': (memory_notes, note_operations),
+    'NoteDAOPickle': (pickle_notes, note_operations),
+}
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_operation(call, ops, seconds):
+    """Time call(0), call(1)... and return their latencies in nanoseconds."""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    gc.collect()
+    for i in range(ops):
+        start = time.perf_counter_ns()
+        call(i)
+        latencies.append(time.perf_counter_ns() - start)
+        if time.perf_counter() > deadline:
+            break
+    return latencies
+
+def peak_bytes(build, size):
+    """Return the peak memory traced while building a store of size, in a run of its own."""
+    directory = tempfile.mkdtemp()
+    try:
+        tracemalloc.start()
+        store = build(directory, size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del store
+    finally:
+        shutil.rmtree(directory)
+    return peak
+
+def run_store(name, size, ops, seconds, seed):
+    build, operations = STORES[name]
+    pick = random.Random(seed).randrange
+    results = []
+    peak = peak_bytes(build, size)
+    directory = tempfile.mkdtemp()
+    try:
+        dao = build(directory, size)
+        for operation, call in operations(dao, size, pick, ops):
+            #deletes remove what create added, so they never run more often than it did
+            count = len(results[0]['latencies']) if operation == 'delete' else ops
+            latencies = run_operation(call, count, seconds)
+            results.append({'store': name, 'size': size, 'operation': operation, 'latencies': latencies})
+    finally:
+        shutil.rmtree(directory)
+    for result in results:
+        latencies = sorted(result.pop('latencies'))
+        result.update({
+            'calls': len(latencies),
+            'ops_per_sec': len(latencies) / (sum(latencies) / 1e9) if sum(latencies) else None,
+            'p50_us': percentile(latencies, 0.50) / 1e3,
+            'p99_us': percentile(latencies, 0.99) / 1e3,
+            'peak_bytes': peak,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DAO operations and print the results as JSON.')
+    parser.add_argument('--stores', nargs='+', choices=sorted(STORES), default=list(STORES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--ops', type=int, default=1000, help='most calls of each operation')
+    parser.add_argument('--seconds', type=float, default=2.0, help='most time spent on each operation')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the keys the operations pick')
+    parser.add_argument('--output', help='file to write the results to, stdout by default')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for name in args.stores:
+            results.extend(run_store(name, size, args.ops, args.seconds, args.seed))
+            print('%s %d done' % (name, size), file=sys.stderr)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ops': args.ops,
+        'seconds': args.seconds,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import time
+from datetime import date, datetime
+from getpass import getpass
+from clinic.controller import Controller
+from clinic.exception.invalid_login_exception import InvalidLoginException
+from clinic.patient_export import export_file
+
+def parse_until(value):
+    """Parse --until, where a date alone stands for the end of that day."""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+    return datetime.combine(day, datetime.max.time())
+
+class ExportCLI():
+
+    def __init__(self, args):
+        parser = argparse.ArgumentParser(prog='python -m clinic export',
+                                         description='Export patients and their notes to a .jsonl or .csv file.')
+        parser.add_argument('file')
+        parser.add_argument('--from-phn', type=int, help='lowest PHN to export')
+        parser.add_argument('--to-phn', type=int, help='highest PHN to export')
+        parser.add_argument('--since', type=datetime.fromisoformat, help='only notes written on or after this date')
+        parser.add_argument('--until', type=parse_until, help='only notes written on or before this date')
+        self.args = parser.parse_args(args)
+        self.controller = Controller(autosave=True)
+        if self.login():
+            self.export_patients()
+            self.controller.logout()
+
+    def login(self):
+        try:
+            print('LOGIN:')
+            username = input('Username: ')
+            password = getpass('Password: ')
+            self.controller.login(username, password)
+        except InvalidLoginException:
+            print('\nLOGIN INCORRECT.')
+            return False
+        return True
+
+    def export_patients(self):
+        print('EXPORT PATIENTS TO %s:' % self.args.file)
+        start = time.perf_counter()
+        records = self.controller.export_patients(self.args.from_phn, self.args.to_phn,
+                                                  self.args.since, self.args.until)
+        try:
+            count = export_file(records, self.args.file)
+        except (OSError, ValueError) as error:
+            print('\nERROR EXPORTING PATIENTS.')
+            print(error)
+            return
+        print('\n%d PATIENTS EXPORTED in %.1f s.' % (count, time.perf_counter() - start))
@@ -0,0 +1,47 @@
+import time
+from getpass import getpass
+from clinic.controller import Controller
+from clinic.exception.invalid_login_exception import InvalidLoginException
+from clinic.patient_import import read_rows
+
+class ImportCLI():
+
+    def __init__(self, filename):
+        self.controller = Controller(autosave=True)
+        self.filename = filename
+        if self.login():
+            self.import_patients()
+            self.controller.logout()
+
+    def login(self):
+        try:
+            print('LOGIN:')
+            username = input('Username: ')
+            password = getpass('Password: ')
+            self.controller.login(username, password)
+        except InvalidLoginException:
+            print('\nLOGIN INCORRECT.')
+            return False
+        return True
+
+    def import_patients(self):
+        print('IMPORT PATIENTS FROM %s:' % self.filename)
+        self.start = time.perf_counter()
+        try:
+            counts = self.controller.import_patients(read_rows(self.filename), progress=self.print_progress)
+        except (OSError, ValueError) as error:
+            print('\nERROR IMPORTING PATIENTS. Nothing was imported.')
+            print(error)
+            return
+        elapsed = time.perf_counter() - self.start
+        print('\nPATIENTS IMPORTED.')
+        print('Rows read: %d' % counts['read'])
+        print('Imported: %d' % counts['imported'])
+        print('Skipped duplicates: %d' % counts['duplicates'])
+        print('Skipped invalid rows: %d' % counts['invalid'])
+        print('Time: %.1f s (%.0f rows/s)' % (elapsed, counts['read'] / elapsed if elapsed else 0))
+
+    def print_progress(self, counts):
+        elapsed = time.perf_counter() - self.start
+        print('%d rows read, %d imported (%.0f rows/s)' %
+              (counts['read'], counts['imported'], counts['read'] / elapsed if elapsed else 0))
@@ -1,7 +1,21 @@
+import os
+from contextlib import contextmanager
 from functools import wraps
 from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.dao.columnar_patient_dao import ColumnarPatientDAO
 from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.patient_dao_sqlite import PatientDAOSQLite
+from clinic.dao.global_note_index import GlobalNoteIndex, bump_generation
+from clinic.dao.background_writer import BackgroundWriter
+from clinic.dao.note_dao_pickle import NoteDAOPickle, used_blocks
+from clinic.dao.note_dao_log import NoteDAOLog
+from clinic.dao.note_dao_store import NoteDAOStore
+from clinic.dao.note_store import NoteStore
+from clinic.dao.text_store import TextStore
+from clinic.dao.durability import ATOMIC
 from clinic.patient import Patient
+from clinic.patient_import import parse_patient
+from clinic.patient_export import iter_records
 from clinic.exception.invalid_login_exception import InvalidLoginException
 from clinic.exception.duplicate_login_exception import DuplicateLoginException
 from clinic.exception.invalid_logout_exception import InvalidLogoutException
@@ -11,18 +25,37 @@ from clinic.exception.no_current_patient_exception import NoCurrentPatientExcept
 
 def check_login(func):
     @wraps(func)
-    def check(self, *args):
+    def check(self, *args, **kwargs):
         if not self.current_user:
             raise IllegalAccessException
-        return func(self, *args)
+        return func(self, *args, **kwargs)
     return check
 
 class Controller:
-    def __init__(self, users=None, autosave=False):
+    def __init__(self, users=None, autosave=False, journal=False, backend='json', note_index=False,
+                 async_writes=False, flush_interval=0.5, durability=ATOMIC, note_log=False,
+                 note_store=False, compress=False, dedup=False):
         self.current_user = None
         self.current_patient = None
         self.autosave = autosave
         self.user_data = {}
+        #note stores touched by the open batch, None when there is no batch
+        self.batch_note_daos = None
+        self.writer = None
+        #durability is 'none', 'atomic' or 'fsync', see clinic.dao.durability
+        self.durability = durability
+        #note_log appends each note change to clinic/records/<phn>.log instead of
+        #rewriting the whole <phn>.dat pickle
+        self.note_log = note_log
+        #note_store keeps the notes of every patient in the single file clinic/notes.dat
+        self.note_store = NoteStore('clinic/notes.dat', durability) if note_store and autosave else None
+        #compress stores patients.json and the notes through zlib with preset dictionaries
+        self.compress = compress
+        #dedup keeps each long line of note text once, shared by all the notes holding it,
+        #and saves the record files with references to clinic/records/blocks.dat
+        self.text_store = None
+        if dedup:
+            self.text_store = TextStore('clinic/records/blocks.dat' if autosave else None, durability)
 
         if autosave:
             try:
@@ -44,7 +77,61 @@ class Controller:
                 "admin": "adminpass",
                 "ali": "@G00dPassw0rd"
             }
-        self.patient_dao = PatientDAOJSON(autosave) if autosave else MemoryPatientDAO()
+        #backend picks the persistent storage: 'json' keeps patients.json plus one
+        #pickle per patient under clinic/records, 'sqlite' keeps both in clinic/clinic.db.
+        #Without autosave, 'columnar' keeps a large registry in memory column by column
+        if not autosave and backend == 'columnar':
+            self.patient_dao = ColumnarPatientDAO(text_store=self.text_store)
+        elif not autosave:
+            self.patient_dao = MemoryPatientDAO(self.text_store)
+        elif backend == 'sqlite':
+            self.patient_dao = PatientDAOSQLite(autosave, durability=durability)
+        elif backend == 'json':
+            #async_writes hands the json and pickle writes to a background thread
+            #that flushes them at most every flush_interval seconds
+            self.writer = BackgroundWriter(flush_interval) if async_writes else None
+            self.patient_dao = PatientDAOJSON(autosave, journal=journal, writer=self.writer,
+                                              note_dao_factory=self.create_note_dao, durability=durability,
+                                              compress=compress)
+        else:
+            raise ValueError('unknown storage backend: %s' % backend)
+        #note_index keeps a cross-patient note index in clinic/notes.idx. Sessions without
+        #it still stamp clinic/notes.idx.gen when that file exists, so the index is
+        #rebuilt after they change notes
+        self.note_index_filename = 'clinic/notes.idx' if autosave else None
+        self.note_index = None
+        #generation stamped by the first note change since the last flush
+        self.note_generation = None
+        if note_index:
+            self.note_index = GlobalNoteIndex(self.note_index_filename, durability=durability)
+            if not self.note_index.load():
+                self.note_index.rebuild(self.patient_dao.list_patients())
+
+    def create_note_dao(self, phn):
+        if self.note_store:
+            return NoteDAOStore(phn=phn, store=self.note_store, autosave=self.autosave, writer=self.writer,
+                                compress=self.compress)
+        if self.note_log:
+            return NoteDAOLog(phn=phn, autosave=self.autosave, writer=self.writer,
+                              durability=self.durability, compress=self.compress, text_store=self.text_store)
+        return NoteDAOPickle(phn=phn, autosave=self.autosave, writer=self.writer,
+                             durability=self.durability, compress=self.compress, text_store=self.text_store)
+
+    def flush(self):
+        """Writes the changes still waiting for the background writer."""
+        if self.writer:
+            self.writer.flush()
+        #the changes stamped so far are written, the index covers them
+        if self.note_generation:
+            if self.note_index:
+                self.note_index.set_generation(self.note_generation)
+            self.note_generation = None
+        #saves reopening the note store a scan of the segments written since
+        if self.note_store:
+            self.note_store.save_index()
+        #once it doubled, blocks.dat is rewritten without the blocks no record uses
+        if self.text_store and self.text_store.needs_compaction():
+            self.text_store.compact(used_blocks(os.path.dirname(self.text_store.filename)))
 
     def login(self, username, password):
         if self.current_user:
@@ -69,8 +156,68 @@ class Controller:
             raise InvalidLogoutException
         self.current_user = None
         self.current_patient = None
+        self.flush()
+        if self.note_index:
+            self.note_index.save()
         return True
 
+    @contextmanager
+    def batch(self):
+        """Defers persistence of every change made inside the with block.
+
+        Each touched store is written once when the block ends. If the block
+        raises, the changes to patients and notes are rolled back instead.
+        """
+        if self.batch_note_daos is not None:
+            #nested batches join the outer one
+            yield self
+            return
+        self.batch_note_daos = {}
+        self.patient_dao.begin_batch()
+        if self.note_index:
+            self.note_index.begin_batch()
+        try:
+            yield self
+        except BaseException:
+            for note_dao in self.batch_note_daos.values():
+                note_dao.rollback_batch()
+            self.patient_dao.rollback_batch()
+            if self.note_index:
+                self.note_index.rollback_batch(self.patient_dao.list_patients())
+            raise
+        else:
+            for note_dao in self.batch_note_daos.values():
+                note_dao.commit_batch()
+            self.patient_dao.commit_batch()
+            if self.note_index:
+                self.note_index.commit_batch()
+        finally:
+            self.batch_note_daos = None
+
+    def stamp_notes(self):
+        """Stamps a new note generation before the first note change since the last flush.
+
+        A persisted note index that does not match the stamp is rebuilt when
+        it is loaded, and flush() records the stamp in the index of this
+        session once the changes are written. Without an index file there is
+        nothing to stamp.
+        """
+        if self.note_generation or not self.note_index_filename:
+            return
+        if not (self.note_index and self.note_index.filename) and not os.path.exists(self.note_index_filename):
+            return
+        self.note_generation = bump_generation(self.note_index_filename, self.durability)
+
+    def current_note_dao(self):
+        """Return the note store of the current patient, enrolling it in the open batch."""
+        if not self.current_patient:
+            raise NoCurrentPatientException
+        note_dao = self.current_patient.note_dao
+        if self.batch_note_daos is not None and id(note_dao) not in self.batch_note_daos:
+            note_dao.begin_batch()
+            self.batch_note_daos[id(note_dao)] = note_dao
+        return note_dao
+
     @check_login
     def search_patient(self, phn):
         return self.patient_dao.search_patient(phn)
@@ -84,10 +231,60 @@ class Controller:
             return patient
         raise IllegalOperationException
     
+    @check_login
+    def import_patients(self, rows, progress=None, chunk_size=10000):
+        """Creates patients from an iterable of row dicts in one batch.
+
+        Rows are validated with parse_patient and handed to the DAO in chunks.
+        Rows repeating a PHN of the file or of the registry are skipped.
+        progress, when given, is called with the running counts after every
+        chunk. Returns the counts of imported, duplicate and invalid rows.
+        """
+        counts = {'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0}
+        seen = set()
+        chunk = []
+
+        def flush():
+            imported = self.patient_dao.create_patients(chunk)
+            counts['imported'] += imported
+            counts['duplicates'] += len(chunk) - imported
+            chunk.clear()
+            if progress:
+                progress(counts)
+
+        with self.batch():
+            for row in rows:
+                counts['read'] += 1
+                try:
+                    patient = parse_patient(row)
+                except (ValueError, TypeError):
+                    counts['invalid'] += 1
+                    continue
+                if patient.phn in seen:
+                    counts['duplicates'] += 1
+                    continue
+                seen.add(patient.phn)
+                chunk.append(patient)
+                if len(chunk) >= chunk_size:
+                    flush()
+            flush()
+        return counts
+
+    @check_login
+    def export_patients(self, phn_from=None, phn_to=None, since=None, until=None):
+        """Returns a generator of (patient, notes) pairs for the patients in the
+        PHN range and their notes in the timestamp range, see iter_records."""
+        return iter_records(self.patient_dao, phn_from, phn_to, since, until)
+
     @check_login
     def retrieve_patients(self, search_string):
         return self.patient_dao.retrieve_patients(search_string)
 
+    @check_login
+    def retrieve_patients_page(self, search_string, limit, cursor=None):
+        """Returns a page of matching patients and the cursor of the next page, None after the last."""
+        return self.patient_dao.retrieve_patients_page(search_string, limit, cursor)
+
     @check_login
     def update_patient(self, old_phn, new_phn, name, birth_date, phone, email, address):
         #check if trying to update current patient
@@ -100,14 +297,13 @@ class Controller:
         if old_phn != new_phn and self.search_patient(new_phn):
             raise IllegalOperationException 
         new_patient = Patient(new_phn, name, birth_date, phone, email, address, autosave=self.autosave)
-        #update the patient in the DAO
+        if old_phn != new_phn:
+            self.stamp_notes()
+        #update the patient in the DAO, which also moves it to a changed PHN
         if self.patient_dao.update_patient(old_phn, new_patient):
-            #if PHN changed, update the key in the patients dictionary
-            if old_phn != new_phn:
-                self.patient_dao.patients[new_phn] = new_patient
-                del self.patient_dao.patients[old_phn]
-                if self.autosave:
-                    self.patient_dao.save_patients()
+            #notes stay with the old PHN, so they no longer belong to any patient
+            if old_phn != new_phn and self.note_index:
+                self.note_index.delete_patient(old_phn)
             return new_patient
         raise IllegalOperationException
 
@@ -117,7 +313,10 @@ class Controller:
         if self.current_patient and self.current_patient.phn == phn:
             raise IllegalOperationException
             
+        self.stamp_notes()
         if self.patient_dao.delete_patient(phn):
+            if self.note_index:
+                self.note_index.delete_patient(phn)
             return True
         raise IllegalOperationException
 
@@ -125,6 +324,11 @@ class Controller:
     def list_patients(self):
         return self.patient_dao.list_patients()
 
+    @check_login
+    def list_patients_page(self, limit, cursor=None):
+        """Returns a page of patients and the cursor of the next page, None after the last."""
+        return self.patient_dao.list_patients_page(limit, cursor)
+
     @check_login
     def select_patient(self, phn):
         patient = self.search_patient(phn)
@@ -155,15 +359,18 @@ class Controller:
 
     @check_login
     def add_note(self, text):
-        if not self.current_patient:
-            raise NoCurrentPatientException
-        return self.current_patient.add_note(text)
+        self.stamp_notes()
+        note = self.current_note_dao().create_note(text)
+        if self.note_index:
+            self.note_index.put_note(self.current_patient.phn, note.code, text)
+        return note
 
     @check_login
-    def list_notes(self):
+    def list_notes(self, limit=None, before=None):
+        """Lists the newest notes of the current patient, pass the last note listed as before for the next ones."""
         if not self.current_patient:
             raise NoCurrentPatientException
-        return self.current_patient.list_notes()
+        return self.current_patient.list_notes(limit, before)
     
     @check_login
     def search_note(self, note_id):
@@ -173,27 +380,62 @@ class Controller:
     
     @check_login
     def create_note(self, text):
-        if not self.current_patient:
-            raise NoCurrentPatientException
-        return self.current_patient.add_note(text)
+        return self.add_note(text)
     
     @check_login
-    def retrieve_notes(self, search_string):
-        """Retrieves notes containing the search string."""
+    def retrieve_notes(self, search_string, boolean=False):
+        """Retrieves notes containing the search string, or matching it as a
+        boolean query (terms, OR, "phrases") when boolean is True."""
         if not self.current_patient:
             raise NoCurrentPatientException
+        if boolean:
+            return self.current_patient.note_dao.query_notes(search_string)
         return self.current_patient.note_dao.retrieve_notes(search_string)
     
     @check_login
     def update_note(self, note_id, text):
         """Updates the text of a note with the given ID."""
-        if not self.current_patient:
-            raise NoCurrentPatientException
-        return self.current_patient.note_dao.update_note(note_id, text)
+        self.stamp_notes()
+        if self.current_note_dao().update_note(note_id, text):
+            if self.note_index:
+                self.note_index.put_note(self.current_patient.phn, note_id, text)
+            return True
+        return False
     
     @check_login
     def delete_note(self, note_id):
         """Deletes a note with the given ID."""
-        if not self.current_patient:
-            raise NoCurrentPatientException
-        return self.current_patient.note_dao.delete_note(note_id)
\ No newline at end of file
+        self.stamp_notes()
+        if self.current_note_dao().delete_note(note_id):
+            if self.note_index:
+                self.note_index.delete_note(self.current_patient.phn, note_id)
+            return True
+        return False
+
+    @check_login
+    def search_all_notes(self, query, limit=20, offset=0):
+        """Searches the notes of every patient with a boolean query and returns
+        one page of (phn, note) hits, ordered by PHN and note code.
+
+        Needs the note index, a controller without note_index uses the one kept
+        in clinic/notes.idx by other sessions when it is up to date."""
+        if self.note_index is None:
+            note_index = GlobalNoteIndex(self.note_index_filename, durability=self.durability)
+            #indexing every patient here would load every note store
+            if not note_index.load():
+                raise IllegalOperationException('searching all notes needs the note index, '
+                                                'create the Controller with note_index=True')
+            #kept up to date by the changes made from now on
+            self.note_index = note_index
+        keys = sorted(self.note_index.search(query))[offset:offset + limit]
+        #only the note stores of the patients on this page are opened
+        note_daos = {}
+        hits = []
+        for phn, code in keys:
+            if phn not in note_daos:
+                patient = self.patient_dao.search_patient(phn)
+                note_daos[phn] = patient.transient_note_dao() if patient else None
+            note = note_daos[phn].search_note(code) if note_daos[phn] else None
+            if note:
+                hits.append((phn, note))
+        return hits
@@ -0,0 +1,76 @@
+import atexit
+import threading
+
+class BackgroundWriter:
+    '''Writes dirty stores from a daemon thread.
+
+    A store calls mark_dirty after a change instead of writing itself. The
+    first change wakes the thread, which waits `interval` seconds so that a
+    burst of changes is coalesced, then calls flush_changes() once on every
+    store marked in the meantime. flush() does the same synchronously and is
+    used on logout, at exit and by tests.
+    '''
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.dirty = {}
+        self.condition = threading.Condition()
+        #serialises flushes of the thread and of callers of flush()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.error = None
+        #until close(), the hook keeps the writer and the stores it marked alive
+        atexit.register(self.close)
+
+    def mark_dirty(self, store):
+        with self.condition:
+            self.dirty[id(store)] = store
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='clinic-writer', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.dirty or self.closed)
+                if self.closed:
+                    return
+                #debounce, close() cuts the wait short
+                self.condition.wait_for(lambda: self.closed, timeout=self.interval)
+            try:
+                self.flush()
+            except Exception as error:
+                self.error = error
+
+    def flush(self):
+        """Write every dirty store now, then raise the first error met, here or on the thread.
+
+        A store that fails to write stays dirty, so the next flush tries it again,
+        and the stores after it are written all the same."""
+        errors = []
+        with self.flush_lock:
+            with self.condition:
+                stores = list(self.dirty.values())
+                self.dirty.clear()
+            for store in stores:
+                try:
+                    store.flush_changes()
+                except Exception as error:
+                    errors.append(error)
+                    with self.condition:
+                        self.dirty.setdefault(id(store), store)
+        error = errors[0] if errors else self.error
+        self.error = None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Flush pending changes and stop the thread."""
+        atexit.unregister(self.close)
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.flush()
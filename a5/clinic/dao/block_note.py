@@ -0,0 +1,23 @@
+from clinic.note import Note
+
+class BlockNote(Note):
+    '''Note whose text is a sequence of blocks, the long ones shared with other notes.'''
+    __slots__ = ('blocks',)
+
+    def __init__(self, code, blocks, timestamp=None):
+        self.code = code
+        self.blocks = blocks
+        self.timestamp = timestamp
+
+    @property
+    def text(self):
+        #joined on every read, keeping the text would undo the sharing
+        return ''.join(self.blocks)
+
+    @text.setter
+    def text(self, text):
+        self.blocks = (text,)
+
+    def __reduce__(self):
+        #copies and pickles are plain notes, independent of the text store
+        return (Note, (self.code, self.text, self.timestamp))
@@ -0,0 +1,192 @@
+from array import array
+from bisect import bisect_right
+import heapq
+from clinic.dao.patient_dao import PatientDAO
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+from clinic.patient import Patient
+
+class ColumnarPatientDAO(PatientDAO):
+    '''In-memory patient store that keeps every field in its own column.
+
+    PHNs live in an integer array and each text field in one packed utf-8
+    buffer with an array of row offsets, so a patient costs little more than
+    its data. Patient objects are only built for the rows a caller asks for.
+    Name searches scan a buffer of case-folded names with bytearray.find
+    instead of keeping a per-patient index.
+
+    Rows are append-only: updating or deleting a patient marks its row dead
+    and an update appends the new version. Dead rows are dropped once they
+    outnumber the live ones. Patients are listed in PHN order whatever their
+    row, the order of the pages.
+    '''
+    FIELDS = ('name', 'birth_date', 'phone', 'email', 'address')
+    #fewer dead rows than this are never worth a compaction
+    MIN_COMPACT = 1024
+
+    def __init__(self, patients=None, text_store=None):
+        self.clear()
+        #notes of each phn, since the patients handed out are rebuilt on every access
+        self.note_daos = {}
+        #shares long note lines across patients, see clinic.dao.text_store
+        self.text_store = text_store
+        self.batch_snapshot = None
+        if patients:
+            self.create_patients(patients)
+
+    def clear(self):
+        self.phns = array('q')
+        self.alive = bytearray()
+        self.columns = {field: bytearray() for field in self.FIELDS}
+        #offsets[field][row] is where the row starts, the next entry where it ends
+        self.offsets = {field: array('Q', [0]) for field in self.FIELDS}
+        #folded names, each followed by a NUL so a match cannot span two rows
+        self.folded = bytearray()
+        self.folded_offsets = array('Q', [0])
+        self.rows = {}
+        self.dead = 0
+
+    def create_note_dao(self, phn):
+        note_dao = self.note_daos.get(phn)
+        if note_dao is None:
+            note_dao = self.note_daos[phn] = MemoryNoteDAO(self.text_store)
+        return note_dao
+
+    def append_row(self, phn, values):
+        """Append a row of text values in FIELDS order."""
+        self.rows[phn] = len(self.phns)
+        self.phns.append(phn)
+        self.alive.append(1)
+        for field, value in zip(self.FIELDS, values):
+            column = self.columns[field]
+            column += str(value).encode()
+            self.offsets[field].append(len(column))
+        self.folded += str(values[0]).casefold().encode() + b'\0'
+        self.folded_offsets.append(len(self.folded))
+
+    def add_patient(self, patient):
+        self.append_row(patient.phn, [getattr(patient, field) for field in self.FIELDS])
+
+    def value(self, field, row):
+        offsets = self.offsets[field]
+        return self.columns[field][offsets[row]:offsets[row + 1]].decode()
+
+    def patient(self, row):
+        """Build the Patient stored in row."""
+        return Patient(self.phns[row], *[self.value(field, row) for field in self.FIELDS],
+                       note_dao_factory=self.create_note_dao)
+
+    def kill(self, phn):
+        row = self.rows.pop(phn)
+        self.alive[row] = 0
+        self.dead += 1
+
+    def compact(self):
+        """Rewrite the columns without their dead rows."""
+        live = [(row, [self.value(field, row) for field in self.FIELDS])
+                for row in range(len(self.phns)) if self.alive[row]]
+        phns = self.phns
+        self.clear()
+        for row, values in live:
+            self.append_row(phns[row], values)
+
+    def maybe_compact(self):
+        #row numbers must stay put while a batch may roll back to them
+        if self.batch_snapshot is None and self.dead >= self.MIN_COMPACT and self.dead > len(self.rows):
+            self.compact()
+
+    def search_patient(self, key):
+        row = self.rows.get(key)
+        return None if row is None else self.patient(row)
+
+    def create_patient(self, patient):
+        if patient.phn in self.rows:
+            return False
+        self.add_patient(patient)
+        return True
+
+    def create_patients(self, patients):
+        created = 0
+        for patient in patients:
+            if patient.phn not in self.rows:
+                self.add_patient(patient)
+                created += 1
+        return created
+
+    def iter_matching_rows(self, search_string):
+        """Iterate over the live rows whose name contains search_string, in row order."""
+        needle = search_string.casefold().encode()
+        folded = self.folded
+        offsets = self.folded_offsets
+        position = folded.find(needle)
+        while 0 <= position < len(folded):
+            row = bisect_right(offsets, position) - 1
+            if self.alive[row]:
+                yield row
+            #one match per row is enough, carry on from the next name
+            position = folded.find(needle, offsets[row + 1])
+
+    def retrieve_patients(self, search_string):
+        matches = sorted(self.iter_matching_rows(search_string), key=self.phns.__getitem__)
+        return [self.patient(row) for row in matches]
+
+    def iter_matching_phns(self, search_string):
+        return (self.phns[row] for row in self.iter_matching_rows(search_string))
+
+    def update_patient(self, key, patient):
+        if key not in self.rows:
+            return False
+        self.kill(key)
+        #a changed PHN moves the patient to its new key, its notes stay behind
+        if patient.phn != key:
+            self.note_daos.pop(key, None)
+            if patient.phn in self.rows:
+                self.kill(patient.phn)
+        self.add_patient(patient)
+        self.maybe_compact()
+        return True
+
+    def delete_patient(self, key):
+        if key not in self.rows:
+            return False
+        self.kill(key)
+        self.note_daos.pop(key, None)
+        self.maybe_compact()
+        return True
+
+    def iter_patients(self):
+        #rows are kept by phn for the live patients only
+        for phn in sorted(self.rows):
+            yield self.patient(self.rows[phn])
+
+    def list_patients(self):
+        return list(self.iter_patients())
+
+    def list_patients_page(self, limit, cursor=None):
+        phns = self.phns
+        after = self.cursor_phn(cursor)
+        rows = (row for row in range(len(phns)) if self.alive[row] and (after is None or phns[row] > after))
+        rows = heapq.nsmallest(limit + 1, rows, key=phns.__getitem__)
+        return self.page([self.patient(row) for row in rows], limit)
+
+    def begin_batch(self):
+        self.batch_snapshot = (len(self.phns), dict(self.rows), dict(self.note_daos))
+
+    def commit_batch(self):
+        self.batch_snapshot = None
+        self.maybe_compact()
+
+    def rollback_batch(self):
+        if self.batch_snapshot is not None:
+            count, self.rows, self.note_daos = self.batch_snapshot
+            #drop the rows appended by the batch and revive the ones it killed
+            del self.phns[count:]
+            for field in self.FIELDS:
+                del self.offsets[field][count + 1:]
+                del self.columns[field][self.offsets[field][-1]:]
+            del self.folded_offsets[count + 1:]
+            del self.folded[self.folded_offsets[-1]:]
+            self.alive = bytearray(count)
+            for row in self.rows.values():
+                self.alive[row] = 1
+            self.dead = count - len(self.rows)
+        self.batch_snapshot = None
@@ -0,0 +1,118 @@
+'''zlib compression with preset dictionaries for the files of the persistent DAOs.
+
+A compressed file starts with MAGIC and the id of the preset dictionary it
+was compressed with, followed by a zlib stream, so loaders tell compressed
+files from plain ones by their first bytes and both keep loading whatever
+the compress setting is. Note log records are compressed one by one with
+NOTE_DICTIONARY and flagged in their header instead.
+
+The dictionaries are part of the file format: changing one makes the files
+written with it unreadable, so a new dictionary needs a new id instead.
+They are frozen as bytes, note log records and note store segments do not
+even carry the id. clinic.bench.dictionary trains new note dictionaries.
+'''
+import io
+import struct
+import zlib
+from clinic.dao.note_dictionary import NOTE_DICTIONARY
+
+MAGIC = b'CLZ\x01'
+#MAGIC then the crc32 of the dictionary, 0 when there is none
+HEADER = struct.Struct('<4sI')
+CHUNK_SIZE = 1 << 16
+
+#the structure of a patient in a compact patients.json
+PATIENT_DICTIONARY = (b'[{"phn":9790012000,"name":"Doe","birth_date":"1990-01-01","phone":"250 203 1010",'
+                      b'"email":"@gmail.com","address":" St, Victoria"}]')
+
+def dictionary_id(zdict):
+    return zlib.crc32(zdict) if zdict else 0
+
+DICTIONARIES = {dictionary_id(zdict): zdict for zdict in (b'', NOTE_DICTIONARY, PATIENT_DICTIONARY)}
+
+def dictionary(header):
+    magic, zdict_id = HEADER.unpack(header)
+    if zdict_id not in DICTIONARIES:
+        raise ValueError('unknown compression dictionary: %08x' % zdict_id)
+    return DICTIONARIES[zdict_id]
+
+def compressor(zdict=b'', level=6):
+    return zlib.compressobj(level, zdict=zdict) if zdict else zlib.compressobj(level)
+
+def decompressor(zdict=b''):
+    return zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+
+def is_compressed(data):
+    return data[:len(MAGIC)] == MAGIC
+
+def compress(data, zdict=b''):
+    """Compress data into a compressed file image."""
+    c = compressor(zdict)
+    return HEADER.pack(MAGIC, dictionary_id(zdict)) + c.compress(data) + c.flush()
+
+def decompress(data):
+    """Return the content of a compressed file image."""
+    d = decompressor(dictionary(data[:HEADER.size]))
+    return d.decompress(data[HEADER.size:]) + d.flush()
+
+def compress_text(data, zdict=NOTE_DICTIONARY):
+    """Compress a short text on its own, as a raw deflate stream with no header."""
+    c = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=zdict)
+    return c.compress(data) + c.flush()
+
+def decompress_text(data, zdict=NOTE_DICTIONARY):
+    d = zlib.decompressobj(-15, zdict=zdict)
+    return d.decompress(data) + d.flush()
+
+class CompressedWriter(io.RawIOBase):
+    '''Binary stream that writes a compressed file image to f, which it leaves open.'''
+    def __init__(self, f, zdict=b''):
+        self.f = f
+        self.compressor = compressor(zdict)
+        f.write(HEADER.pack(MAGIC, dictionary_id(zdict)))
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.f.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.f.write(self.compressor.flush())
+        super().close()
+
+class DecompressingReader(io.RawIOBase):
+    '''Binary stream of the content of the compressed file image read from f.'''
+    def __init__(self, f):
+        self.f = f
+        self.decompressor = decompressor(dictionary(f.read(HEADER.size)))
+        self.pending = b''
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self.position == len(self.pending):
+            if self.decompressor.eof:
+                return 0
+            chunk = self.f.read(CHUNK_SIZE)
+            #a truncated stream simply ends, the caller sees a truncated file
+            self.pending = self.decompressor.decompress(chunk) if chunk else self.decompressor.flush()
+            self.position = 0
+            if not chunk and not self.pending:
+                return 0
+        count = min(len(buffer), len(self.pending) - self.position)
+        buffer[:count] = self.pending[self.position:self.position + count]
+        self.position += count
+        return count
+
+def open_text(f):
+    """Return a text stream of binary file f, decompressing it when it is compressed."""
+    if is_compressed(f.read(len(MAGIC))):
+        f.seek(0)
+        return io.TextIOWrapper(DecompressingReader(f), encoding='utf-8')
+    f.seek(0)
+    return io.TextIOWrapper(f, encoding='utf-8')
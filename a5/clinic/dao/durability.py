@@ -0,0 +1,73 @@
+'''Durability levels for the files written by the persistent DAOs.
+
+NONE rewrites files in place, so a crash in the middle of a write leaves a
+truncated file. ATOMIC writes to a temporary file that replaces the target
+with os.replace, so readers only ever see the old or the new content.
+FSYNC also forces the data and the directory entry to disk before the write
+returns, so a completed write survives a power loss.
+'''
+import os
+import tempfile
+from contextlib import contextmanager
+
+NONE = 'none'
+ATOMIC = 'atomic'
+FSYNC = 'fsync'
+LEVELS = (NONE, ATOMIC, FSYNC)
+
+#read once, os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def check_level(durability):
+    if durability not in LEVELS:
+        raise ValueError('unknown durability level: %s' % durability)
+    return durability
+
+def fsync_directory(directory):
+    #makes a rename durable, not supported on every platform
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+@contextmanager
+def open_for_write(filename, mode='w', durability=ATOMIC):
+    """Open filename for a complete rewrite at the given durability level."""
+    directory = os.path.dirname(filename)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    if durability == NONE:
+        with open(filename, mode) as f:
+            yield f
+        return
+    #a name of its own for every write, so overlapping writes of a file never share a temporary
+    fd, temp_filename = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(filename) + '.',
+                                         suffix='.tmp')
+    try:
+        with open(fd, mode) as f:
+            #mkstemp files are private, give the file the mode open() would have
+            os.chmod(temp_filename, 0o666 & ~UMASK)
+            yield f
+            f.flush()
+            if durability == FSYNC:
+                os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+    if durability == FSYNC:
+        fsync_directory(directory)
+
+def sync_append(f, durability):
+    """Finish an append to an open file at the given durability level."""
+    if durability == FSYNC:
+        f.flush()
+        os.fsync(f.fileno())
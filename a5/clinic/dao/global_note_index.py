@@ -0,0 +1,178 @@
+import json
+import os
+import pickle
+from clinic.dao.note_index import NoteIndex
+from clinic.dao.durability import ATOMIC, check_level, open_for_write, sync_append
+
+def read_generation(filename):
+    """Return the note generation stamped for the index filename, None when notes were never stamped."""
+    try:
+        with open(filename + '.gen', 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def bump_generation(filename, durability=ATOMIC):
+    """Stamp a new note generation for the index filename and return it.
+
+    A session that changes notes while the index file exists bumps it before
+    the changes are written, so an index saved before them no longer matches.
+    """
+    generation = os.urandom(8).hex()
+    directory = os.path.dirname(filename)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open_for_write(filename + '.gen', 'w', durability) as f:
+        f.write(generation)
+    return generation
+
+class GlobalNoteIndex(NoteIndex):
+    '''Note index over every patient, keyed by (phn, code).
+
+    With a filename the index is persisted as a pickled snapshot of the note
+    token lists plus a journal of the changes made since the snapshot, the
+    same way PatientDAOJSON keeps patients in journal mode. Both record the
+    note generation they cover, and load() reports an index whose generation
+    is not the stamped one as stale, since notes changed without it.
+    '''
+    def __init__(self, filename=None, compact_threshold=1000, durability=ATOMIC):
+        super().__init__()
+        #codes of the indexed notes of every patient
+        self.codes = {}
+        self.filename = filename
+        self.journal_filename = filename + '.log' if filename else None
+        self.compact_threshold = compact_threshold
+        self.journal_entries = 0
+        #records of an open batch, written in one append when it is committed
+        self.batch_records = None
+        self.durability = check_level(durability)
+        #note generation the index covers, see bump_generation
+        self.generation = None
+
+    def add(self, key, text):
+        super().add(key, text)
+        self.codes.setdefault(key[0], set()).add(key[1])
+
+    def remove(self, key):
+        super().remove(key)
+        codes = self.codes.get(key[0])
+        if codes is not None:
+            codes.discard(key[1])
+            if not codes:
+                del self.codes[key[0]]
+
+    def apply(self, record):
+        if record[0] == 'put':
+            self.add((record[1], record[2]), record[3])
+        elif record[0] == 'delete':
+            self.remove((record[1], record[2]))
+        elif record[0] == 'drop':
+            for code in list(self.codes.get(record[1], ())):
+                self.remove((record[1], code))
+        elif record[0] == 'generation':
+            self.generation = record[1]
+
+    def record(self, record):
+        self.apply(record)
+        if self.batch_records is not None:
+            self.batch_records.append(record)
+        else:
+            self.append_journal([record])
+
+    def append_journal(self, records):
+        if not self.filename:
+            return
+        directory = os.path.dirname(self.journal_filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.journal_filename, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            sync_append(f, self.durability)
+        self.journal_entries += len(records)
+        if self.journal_entries >= self.compact_threshold:
+            self.save()
+
+    def begin_batch(self):
+        self.batch_records = []
+
+    def commit_batch(self):
+        records = self.batch_records
+        self.batch_records = None
+        if records:
+            self.append_journal(records)
+
+    def rollback_batch(self, patients):
+        """Forget the changes of the batch by reloading, or rebuilding from patients."""
+        self.batch_records = None
+        if not self.load():
+            self.rebuild(patients)
+
+    def put_note(self, phn, code, text):
+        self.record(['put', phn, code, text])
+
+    def delete_note(self, phn, code):
+        self.record(['delete', phn, code])
+
+    def delete_patient(self, phn):
+        """Drop every note of a patient from the index."""
+        self.record(['drop', phn])
+
+    def set_generation(self, generation):
+        """Record that the index covers the notes up to generation."""
+        self.record(['generation', generation])
+
+    def load(self):
+        """Load the snapshot and replay the journal, returning False when there
+        is no snapshot or notes changed since the index was written."""
+        if not self.filename or not os.path.exists(self.filename):
+            return False
+        try:
+            with open(self.filename, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (EOFError, pickle.UnpicklingError):
+            return False
+        #snapshots written before generations were stamped are stale
+        if not isinstance(snapshot, tuple):
+            return False
+        self.generation, tokens = snapshot
+        self.postings = {}
+        self.tokens = tokens
+        self.codes = {}
+        self.batch_records = None
+        #postings are rebuilt from the stored token lists, no text is tokenized
+        for key, note_tokens in tokens.items():
+            self.codes.setdefault(key[0], set()).add(key[1])
+            for token in set(note_tokens):
+                self.postings.setdefault(token, set()).add(key)
+        self.journal_entries = 0
+        if os.path.exists(self.journal_filename):
+            with open(self.journal_filename, 'r') as f:
+                for line in f:
+                    try:
+                        self.apply(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+                    self.journal_entries += 1
+        return self.generation == read_generation(self.filename)
+
+    def save(self):
+        """Write a snapshot of the index and clear its journal."""
+        if not self.filename:
+            return
+        with open_for_write(self.filename, 'wb', self.durability) as f:
+            pickle.dump((self.generation, self.tokens), f)
+        if os.path.exists(self.journal_filename):
+            os.remove(self.journal_filename)
+        self.journal_entries = 0
+
+    def rebuild(self, patients):
+        """Index the notes of every patient from scratch and save the result."""
+        self.postings = {}
+        self.tokens = {}
+        self.codes = {}
+        self.generation = read_generation(self.filename) if self.filename else None
+        for patient in patients:
+            for note in patient.transient_note_dao().list_notes():
+                self.add((patient.phn, note.code), note.text)
+        self.save()
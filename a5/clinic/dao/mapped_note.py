@@ -0,0 +1,46 @@
+from clinic.note import Note
+from clinic.dao.note_dao_log import decode_text, decode_timestamp
+
+#the slots holding the text and timestamp of a plain Note
+TEXT = Note.__dict__['text']
+TIMESTAMP = Note.__dict__['timestamp']
+
+class MappedNote(Note):
+    '''Note whose text and timestamp stay encoded in a mapped buffer until first read.'''
+    __slots__ = ('buffer', 'stamp', 'flags')
+
+    def __init__(self, code, buffer, stamp, flags=0):
+        #buffer, stamp and flags are the text, timestamp and op flags as a log record encodes them
+        self.code = code
+        self.buffer = buffer
+        self.stamp = stamp
+        self.flags = flags
+
+    @property
+    def text(self):
+        if self.buffer is not None:
+            TEXT.__set__(self, decode_text(self.buffer, self.flags))
+            #the decoded text no longer needs the mapping
+            self.buffer = None
+        return TEXT.__get__(self)
+
+    @text.setter
+    def text(self, text):
+        TEXT.__set__(self, text)
+        self.buffer = None
+
+    @property
+    def timestamp(self):
+        if self.stamp is not None:
+            TIMESTAMP.__set__(self, decode_timestamp(self.stamp))
+            self.stamp = None
+        return TIMESTAMP.__get__(self)
+
+    @timestamp.setter
+    def timestamp(self, timestamp):
+        TIMESTAMP.__set__(self, timestamp)
+        self.stamp = None
+
+    def __reduce__(self):
+        #copies and pickles are plain notes, independent of the mapped file
+        return (Note, (self.code, self.text, self.timestamp))
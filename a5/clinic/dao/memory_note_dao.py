@@ -1,39 +1,71 @@
-from clinic.dao.note_dao import NoteDAO
+from clinic.dao.note_dao import NoteDAO, recency_key
+from clinic.dao.sorted_keys import SortedKeys
+from clinic.dao.note_index import NoteIndex
 from datetime import datetime
-from clinic.note import Note
 
 class MemoryNoteDAO(NoteDAO):
-    def __init__(self):
+    def __init__(self, text_store=None):
         self.notes = {}
         self.note_counter = 0
+        self.note_index = NoteIndex()
+        #codes from oldest to newest note
+        self.order = SortedKeys(key=self.code_key)
+        self.batch_snapshot = None
+        #with a TextStore, long lines are shared with the notes of other patients
+        self.text_store = text_store
+
+    def code_key(self, code):
+        return recency_key(self.notes[code])
 
     def search_note(self, key):
         return self.notes.get(key)
 
-    def create_note(self, text):
+    def create_note(self, text, timestamp=None):
         self.note_counter += 1
-        note = Note(self.note_counter, text, datetime.now())
+        note = self.make_note(self.note_counter, text, timestamp or datetime.now())
         self.notes[self.note_counter] = note
+        self.order.add(note.code)
+        self.note_index.add(note.code, text)
         return note
 
     def retrieve_notes(self, search_string):
         return [note for note in self.notes.values() 
                 if search_string.lower() in note.text.lower()]
 
+    def query_notes(self, query):
+        return [self.notes[code] for code in sorted(self.note_index.search(query))]
+
     def update_note(self, key, text):
         if key in self.notes:
-            self.notes[key].text = text
-            self.notes[key].timestamp = datetime.now()
+            #replace rather than change the note, so batch snapshots stay intact
+            self.order.remove(key)
+            self.notes[key] = self.make_note(key, text, datetime.now())
+            self.order.add(key)
+            self.note_index.add(key, text)
             return True
         return False
 
     def delete_note(self, key):
         if key in self.notes:
+            self.order.remove(key)
             del self.notes[key]
+            self.note_index.remove(key)
             return True
         return False
 
-    def list_notes(self):
-        return sorted(list(self.notes.values()), 
-                     key=lambda x: x.timestamp if x.timestamp else datetime.min,
-                     reverse=True)
\ No newline at end of file
+    def list_notes(self, limit=None, before=None):
+        before = None if before is None else recency_key(before)
+        return [self.notes[code] for code in self.order.last(limit, before)]
+
+    def begin_batch(self):
+        self.batch_snapshot = (dict(self.notes), self.note_counter)
+
+    def commit_batch(self):
+        self.batch_snapshot = None
+
+    def rollback_batch(self):
+        if self.batch_snapshot is not None:
+            self.notes, self.note_counter = self.batch_snapshot
+            self.note_index = NoteIndex((code, note.text) for code, note in self.notes.items())
+            self.order = SortedKeys(self.notes, key=self.code_key)
+        self.batch_snapshot = None
@@ -1,8 +1,26 @@
 from clinic.dao.patient_dao import PatientDAO
+from clinic.dao.name_index import NameIndex
+from clinic.dao.sorted_keys import SortedKeys
+from clinic.dao.memory_note_dao import MemoryNoteDAO
 
 class MemoryPatientDAO(PatientDAO):
-    def __init__(self):
-        self.patients = {} 
+    def __init__(self, text_store=None):
+        self.patients = {}
+        self.name_index = NameIndex()
+        #phns in page order
+        self.order = SortedKeys()
+        self.batch_snapshot = None
+        #shares long note lines across patients, see clinic.dao.text_store
+        self.text_store = text_store
+
+    def create_note_dao(self, phn):
+        return MemoryNoteDAO(self.text_store)
+
+    def adopt(self, patient):
+        #patients created without a note store get one sharing the text store
+        if self.text_store is not None and patient.note_dao_factory is None:
+            patient.note_dao_factory = self.create_note_dao
+        return patient
 
     def search_patient(self, key):
         return self.patients.get(key)
@@ -10,24 +28,69 @@ class MemoryPatientDAO(PatientDAO):
     def create_patient(self, patient):
         if patient.phn in self.patients:
             return False
-        self.patients[patient.phn] = patient
+        self.patients[patient.phn] = self.adopt(patient)
+        self.order.add(patient.phn)
+        self.name_index.add(patient.phn, patient.name)
         return True
+
+    def create_patients(self, patients):
+        phns = []
+        for patient in patients:
+            if patient.phn not in self.patients:
+                self.patients[patient.phn] = self.adopt(patient)
+                self.name_index.add(patient.phn, patient.name)
+                phns.append(patient.phn)
+        self.order.extend(phns)
+        return len(phns)
     
     def retrieve_patients(self, search_string):
-        return [patient for patient in self.patients.values() if 
-                search_string.lower() in patient.name.lower()]
+        return [self.patients[phn] for phn in sorted(self.name_index.search(search_string))]
+
+    def iter_matching_phns(self, search_string):
+        return self.name_index.search(search_string)
     
     def update_patient(self, key, patient):
         if key not in self.patients:
             return False
-        self.patients[key] = patient
+        #a changed PHN moves the patient to its new key
+        if patient.phn != key:
+            del self.patients[key]
+            self.order.remove(key)
+            self.name_index.remove(key)
+        if patient.phn not in self.patients:
+            self.order.add(patient.phn)
+        self.patients[patient.phn] = self.adopt(patient)
+        self.name_index.add(patient.phn, patient.name)
         return True
     
     def delete_patient(self, key):
         if key in self.patients:
             del self.patients[key]
+            self.order.remove(key)
+            self.name_index.remove(key)
             return True
         return False
     
     def list_patients(self):
-        return list(self.patients.values())
\ No newline at end of file
+        #in page order, like list_patients_page
+        return [self.patients[phn] for phn in self.order]
+
+    def iter_patients(self):
+        return (self.patients[phn] for phn in self.order)
+
+    def list_patients_page(self, limit, cursor=None):
+        phns = self.order.after(self.cursor_phn(cursor), limit + 1)
+        return self.page([self.patients[phn] for phn in phns], limit)
+
+    def begin_batch(self):
+        self.batch_snapshot = dict(self.patients)
+
+    def commit_batch(self):
+        self.batch_snapshot = None
+
+    def rollback_batch(self):
+        if self.batch_snapshot is not None:
+            self.patients = self.batch_snapshot
+            self.name_index = NameIndex((p.phn, p.name) for p in self.patients.values())
+            self.order = SortedKeys(self.patients)
+        self.batch_snapshot = None
@@ -0,0 +1,56 @@
+class NameIndex:
+    '''Case-folded trigram index answering substring queries on patient names.
+
+    Every key (a PHN) is listed under each trigram of its folded name, so the
+    keys whose name may contain a query are found by intersecting the posting
+    sets of the query trigrams. Queries shorter than a trigram fall back to a
+    scan of the folded names, which are kept so that candidates can be checked
+    without folding names again.
+    '''
+    N = 3
+
+    def __init__(self, names=None):
+        self.names = {}
+        self.postings = {}
+        if names:
+            for key, name in names:
+                self.add(key, name)
+
+    def grams(self, folded):
+        return {folded[i:i + self.N] for i in range(len(folded) - self.N + 1)}
+
+    def add(self, key, name):
+        if key in self.names:
+            self.remove(key)
+        folded = name.casefold()
+        self.names[key] = folded
+        for gram in self.grams(folded):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        folded = self.names.pop(key, None)
+        if folded is None:
+            return
+        for gram in self.grams(folded):
+            keys = self.postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+
+    def search(self, search_string):
+        """Return the keys whose name contains search_string, ignoring case."""
+        folded = search_string.casefold()
+        if len(folded) < self.N:
+            return [key for key, name in self.names.items() if folded in name]
+        postings = []
+        for gram in self.grams(folded):
+            keys = self.postings.get(gram)
+            if not keys:
+                return []
+            postings.append(keys)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        #trigrams may all be present without being contiguous, so verify
+        if len(folded) == self.N:
+            return list(candidates)
+        return [key for key in candidates if folded in self.names[key]]
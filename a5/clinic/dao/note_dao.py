@@ -1,10 +1,22 @@
 from abc import ABC, abstractmethod
+from clinic.dao.note_index import NoteQuery, tokenize
+from clinic.note import Note
+from datetime import datetime
+
+def recency_key(note):
+    #notes are listed newest first, notes without a timestamp are the oldest
+    return (note.timestamp or datetime.min, note.code)
+
 class NoteDAO(ABC):
+    #stores given a TextStore share long lines with other notes, see clinic.dao.text_store
+    text_store = None
+
     @abstractmethod
     def search_note(self, key):
         pass
     @abstractmethod
-    def create_note(self, text):
+    def create_note(self, text, timestamp=None):
+        """Create a note stamped timestamp, or the current time when it is None."""
         pass
     @abstractmethod
     def retrieve_notes(self, search_string):
@@ -16,5 +28,28 @@ class NoteDAO(ABC):
     def delete_note(self, key):
         pass
     @abstractmethod
-    def list_notes(self):
+    def list_notes(self, limit=None, before=None):
+        """Return up to limit notes, newest first, that are older than the note before."""
+        pass
+
+    def make_note(self, code, text, timestamp=None):
+        if self.text_store is None:
+            return Note(code, text, timestamp)
+        return self.text_store.note(code, text, timestamp)
+
+    def query_notes(self, query):
+        """Retrieve the notes matching a boolean query such as 'headache OR "blood pressure"'."""
+        #scans every note, stores that keep a NoteIndex override this
+        query = NoteQuery(query)
+        return sorted([note for note in self.list_notes() if query.matches(tokenize(note.text))],
+                      key=lambda x: x.code)
+
+    # see PatientDAO.begin_batch
+    def begin_batch(self):
+        pass
+
+    def commit_batch(self):
+        pass
+
+    def rollback_batch(self):
         pass
@@ -0,0 +1,215 @@
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao import recency_key
+from clinic.dao.durability import ATOMIC, open_for_write, sync_append
+from clinic.dao.compression import compress_text, decompress_text
+from clinic.dao.sorted_keys import SortedKeys
+
+#op, note code, timestamp in microseconds since EPOCH, length of the utf-8 text
+HEADER = struct.Struct('<BIqI')
+#crc32 of the header and the text, a record that fails it was torn by a crash
+CHECKSUM = struct.Struct('<I')
+PUT = 1
+DELETE = 2
+#set in op when the text is compressed with the note dictionary
+COMPRESSED = 0x80
+EPOCH = datetime(1970, 1, 1)
+NO_TIMESTAMP = -1 << 63
+
+def encode_timestamp(timestamp):
+    if timestamp is None:
+        return NO_TIMESTAMP
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+def decode_timestamp(value):
+    if value == NO_TIMESTAMP:
+        return None
+    return EPOCH + timedelta(microseconds=value)
+
+def encode_record(op, code, timestamp=None, text='', compress=False):
+    data = text.encode()
+    if compress and data:
+        packed = compress_text(data)
+        if len(packed) < len(data):
+            op |= COMPRESSED
+            data = packed
+    record = HEADER.pack(op, code, encode_timestamp(timestamp), len(data)) + data
+    return record + CHECKSUM.pack(zlib.crc32(record))
+
+def encode_change(change, compress=False):
+    """Encode a ('put', note) or ('delete', code) change as a log record."""
+    if change[0] == 'put':
+        note = change[1]
+        return encode_record(PUT, note.code, note.timestamp, note.text, compress)
+    return encode_record(DELETE, change[1])
+
+def decode_text(data, op):
+    return str(decompress_text(data) if op & COMPRESSED else data, 'utf-8')
+
+def iter_headers(data, verify=True):
+    """Yield (end offset, op, code, timestamp, text start, text end) for each intact record of a log.
+
+    op keeps its COMPRESSED flag, the text between start and end is as stored."""
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        op, code, timestamp, length = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        end = start + length
+        if end + CHECKSUM.size > len(data):
+            return
+        if verify and CHECKSUM.unpack_from(data, end)[0] != zlib.crc32(data[offset:end]):
+            return
+        offset = end + CHECKSUM.size
+        yield offset, op, code, decode_timestamp(timestamp), start, end
+
+def iter_records(data):
+    """Yield (end offset, op, code, timestamp, text) for each intact record of a log."""
+    for offset, op, code, timestamp, start, end in iter_headers(data):
+        yield offset, op & ~COMPRESSED, code, timestamp, decode_text(data[start:end], op)
+
+def live_records(data):
+    """Return a log with one record per note still alive after replaying data, oldest change first."""
+    notes = {}
+    start = 0
+    for end, op, code, *_ in iter_headers(data):
+        #a put moves the note to the end, so the notes stay in the order they last changed
+        notes.pop(code, None)
+        if op & ~COMPRESSED == PUT:
+            notes[code] = data[start:end]
+        start = end
+    return b''.join(notes.values())
+
+class NoteDAOLog(NoteDAOPickle):
+    '''Note store that appends a record per change instead of rewriting the record file.
+
+    Changes go to clinic/records/<phn>.log as fixed-format binary records
+    (a struct header, the note text and a crc32) and are replayed on load.
+    Once dead records, superseded by a later put or delete, make up more than
+    compact_ratio of the log, it is rewritten with one record per live note.
+    A patient still stored as <phn>.dat is read from the pickle and moved to
+    a log on the first change.
+    '''
+    #logs shorter than this are never worth a compaction
+    MIN_COMPACT = 16
+
+    def __init__(self, phn=None, autosave=False, records_path='clinic/records', writer=None,
+                 durability=ATOMIC, compact_ratio=0.5, compress=False, text_store=None):
+        self.compact_ratio = compact_ratio
+        #records in the log file, live or dead
+        self.log_records = 0
+        #changes waiting to be appended, and those of an open batch
+        self.pending = []
+        self.batch_changes = []
+        super().__init__(phn=phn, autosave=autosave, records_path=records_path, writer=writer,
+                         durability=durability, compress=compress, text_store=text_store)
+
+    @property
+    def log_filename(self):
+        return os.path.join(self.records_path, f'{self.phn}.log')
+
+    @property
+    def pickle_filename(self):
+        return os.path.join(self.records_path, f'{self.phn}.dat')
+
+    def load_notes(self):
+        """Load notes by replaying the patient's log, or from its pickle if it has none yet."""
+        if not os.path.exists(self.log_filename):
+            self.log_records = 0
+            super().load_notes()
+            return
+        with open(self.log_filename, 'rb+') as f:
+            data = f.read()
+            valid_length = self.replay(data)
+            #drop a torn tail so that later appends are not hidden behind it
+            if valid_length < len(data):
+                f.truncate(valid_length)
+
+    def replay(self, data):
+        """Rebuild the notes from log records and return the length of the intact ones."""
+        self.notes = {}
+        self.log_records = 0
+        valid_length = 0
+        for valid_length, op, code, timestamp, text in iter_records(data):
+            if op == PUT:
+                self.notes[code] = self.make_note(code, text, timestamp)
+            else:
+                self.notes.pop(code, None)
+            self.log_records += 1
+        self.note_counter = max(self.notes) if self.notes else 0
+        self.note_index = None
+        self.order = SortedKeys(self.notes, key=self.code_key)
+        return valid_length
+
+    def log_change(self, change):
+        if self.autosave:
+            if self.batch_snapshot is not None:
+                self.batch_changes.append(change)
+            else:
+                self.pending.append(change)
+
+    def commit_batch(self):
+        with self.lock:
+            self.pending.extend(self.batch_changes)
+            self.batch_changes = []
+        super().commit_batch()
+
+    def rollback_batch(self):
+        with self.lock:
+            self.batch_changes = []
+        super().rollback_batch()
+
+    def save_notes(self):
+        """Append the pending changes to the log, compacting it when too much of it is dead."""
+        if not (self.autosave and self.phn):
+            return
+        #changes are appended in the order they were taken, and never to a log being replaced
+        with self.save_lock:
+            with self.lock:
+                changes = self.pending
+                self.pending = []
+            if not os.path.exists(self.log_filename):
+                #the first log holds every note, including those still in a pickle
+                self.compact_notes()
+                return
+            if not changes:
+                return
+            try:
+                with open(self.log_filename, 'ab') as f:
+                    for change in changes:
+                        f.write(encode_change(change, self.compress))
+                    sync_append(f, self.durability)
+            except BaseException:
+                #kept for the next save, a record written twice replays the same
+                with self.lock:
+                    self.pending[:0] = changes
+                raise
+            self.log_records += len(changes)
+            dead = self.log_records - len(self.notes)
+            if self.log_records >= self.MIN_COMPACT and dead > self.compact_ratio * self.log_records:
+                self.compact_notes()
+
+    def committed_notes(self):
+        """Return the notes, without the changes of an open batch, oldest first."""
+        with self.lock:
+            notes = self.batch_snapshot[0] if self.batch_snapshot is not None else self.notes
+            return sorted(notes.values(), key=recency_key)
+
+    def compact_notes(self):
+        """Rewrite the log with a single record per live note."""
+        with self.save_lock:
+            if not os.path.exists(self.records_path):
+                os.makedirs(self.records_path)
+            notes = self.committed_notes()
+            with open_for_write(self.log_filename, 'wb', self.durability) as f:
+                for note in notes:
+                    f.write(encode_record(PUT, note.code, note.timestamp, note.text, self.compress))
+            self.log_records = len(notes)
+            self.remove_pickle()
+
+    def remove_pickle(self):
+        #once the notes are logged, the pickle is out of date
+        if os.path.exists(self.pickle_filename):
+            os.remove(self.pickle_filename)
@@ -1,83 +1,230 @@
 import pickle
 import os
-from clinic.dao.note_dao import NoteDAO
-from clinic.note import Note
+import threading
+import zlib
+from clinic.dao.note_dao import NoteDAO, recency_key
+from clinic.dao.sorted_keys import SortedKeys
+from clinic.dao.note_index import NoteIndex
+from clinic.dao.durability import ATOMIC, check_level, open_for_write
+from clinic.dao.compression import NOTE_DICTIONARY, compress, decompress, is_compressed
+from clinic.dao.text_store import open_text_store
 from datetime import datetime
 
+def used_blocks(records_path):
+    """Return the digests of the text blocks that the record files in records_path refer to."""
+    used = set()
+    for name in os.listdir(records_path):
+        if not name.endswith('.dat') or name == 'blocks.dat':
+            continue
+        try:
+            with open(os.path.join(records_path, name), 'rb') as f:
+                data = f.read()
+            if is_compressed(data):
+                data = decompress(data)
+            shared = pickle.loads(data).get('shared', {})
+        except (EOFError, pickle.UnpicklingError, ValueError, zlib.error):
+            #a record that does not load has no notes to keep blocks for
+            continue
+        for timestamp, refs in shared.values():
+            used.update(ref for ref in refs if isinstance(ref, bytes))
+    return used
+
 class NoteDAOPickle(NoteDAO):
-    def __init__(self, phn=None, autosave=False):
+    def __init__(self, phn=None, autosave=False, records_path='clinic/records', writer=None,
+                 durability=ATOMIC, compress=False, text_store=None):
         self.notes = {}
         self.note_counter = 0
         self.phn = phn
         self.autosave = autosave
+        self.records_path = records_path
+        #built on the first query, then kept up to date by every change
+        self.note_index = None
+        #codes from oldest to newest note
+        self.order = SortedKeys(key=self.code_key)
+        #while a batch is open, saving is deferred until it is committed
+        self.batch_snapshot = None
+        self.dirty = False
+        #with a BackgroundWriter, saving is left to its thread
+        self.writer = writer
+        #guards notes, note_counter and order, changed by callers while the writer thread saves them
+        self.lock = threading.RLock()
+        #one save of the record file at a time, whichever thread it runs on
+        self.save_lock = threading.RLock()
+        self.durability = check_level(durability)
+        #compress writes record files through zlib with the note dictionary, either kind loads
+        self.compress = compress
+        #with a TextStore, long lines are shared with other notes and saved by digest
+        self.text_store = text_store
         if autosave and phn:
             self.load_notes()
 
     def load_notes(self):
         """Load notes from the patient's record file."""
         try:
-            filename = f'clinic/records/{self.phn}.dat'
+            filename = os.path.join(self.records_path, f'{self.phn}.dat')
             if os.path.exists(filename):
                 with open(filename, 'rb') as f:
-                    data = pickle.load(f)
+                    data = f.read()
+                    if is_compressed(data):
+                        data = decompress(data)
+                    data = pickle.loads(data)
                     self.notes = data['notes']
+                    if data.get('shared'):
+                        self.resolve_notes(data['shared'])
                     # Update counter to highest note code
                     if self.notes:
                         self.note_counter = max(self.notes.keys())
-        except (FileNotFoundError, pickle.UnpicklingError):
+        except (FileNotFoundError, pickle.UnpicklingError, ValueError, zlib.error):
             self.notes = {}
             self.note_counter = 0
+        self.note_index = None
+        self.order = SortedKeys(self.notes, key=self.code_key)
+
+    @property
+    def blocks_filename(self):
+        return os.path.join(self.records_path, 'blocks.dat')
+
+    def resolve_notes(self, shared):
+        #a file saved with shared blocks loads with or without a text store of our own,
+        #without one blocks.dat is read once for every patient of the records path
+        store = self.text_store or open_text_store(self.blocks_filename)
+        for code, (timestamp, refs) in shared.items():
+            self.notes[code] = store.resolve(code, refs, timestamp)
+
+    def code_key(self, code):
+        return recency_key(self.notes[code])
 
     def save_notes(self):
         """Save notes to the patient's record file."""
-        if self.autosave and self.phn:
-            if not os.path.exists('clinic/records'):
-                os.makedirs('clinic/records')
-            filename = f'clinic/records/{self.phn}.dat'
-            with open(filename, 'wb') as f:
-                pickle.dump({
-                    'notes': self.notes,
+        if not (self.autosave and self.phn):
+            return
+        filename = os.path.join(self.records_path, f'{self.phn}.dat')
+        with self.save_lock:
+            with self.lock:
+                data = {
+                    'notes': dict(self.notes),
                     'counter': self.note_counter
-                }, f)
+                }
+            if self.text_store is not None:
+                data['shared'] = self.share_notes(data['notes'])
+            data = pickle.dumps(data)
+            if self.compress:
+                data = compress(data, NOTE_DICTIONARY)
+            with open_for_write(filename, 'wb', self.durability) as f:
+                f.write(data)
 
-    def create_note(self, text):
-        """Create a new note and save it."""
-        self.note_counter += 1
-        note = Note(self.note_counter, text)
-        self.notes[self.note_counter] = note
-        if self.autosave:
+    def share_notes(self, notes):
+        """Move the notes with shared blocks out of notes, as {code: (timestamp, refs)}."""
+        shared = {}
+        for code, note in list(notes.items()):
+            refs = self.text_store.refs(note)
+            if refs is not None:
+                shared[code] = (note.timestamp, refs)
+                del notes[code]
+        #the blocks must be on disk before a record refers to them
+        self.text_store.save()
+        return shared
+
+    def log_change(self, change):
+        #change is ('put', note) or ('delete', code), kept by stores that log changes.
+        #Called under the lock, so changes are kept in the order they were made
+        pass
+
+    def persist(self):
+        #never called under the lock, a save takes save_lock then the lock
+        if self.batch_snapshot is not None:
+            self.dirty = True
+        elif self.autosave and self.writer:
+            self.writer.mark_dirty(self)
+        elif self.autosave:
             self.save_notes()
+
+    def flush_changes(self):
+        self.save_notes()
+
+    def begin_batch(self):
+        with self.lock:
+            self.batch_snapshot = (dict(self.notes), self.note_counter)
+            self.dirty = False
+
+    def commit_batch(self):
+        with self.lock:
+            self.batch_snapshot = None
+            dirty = self.dirty
+            self.dirty = False
+        #saved like any other change, by the background writer when there is one
+        if dirty:
+            self.persist()
+
+    def rollback_batch(self):
+        with self.lock:
+            if self.batch_snapshot is not None:
+                self.notes, self.note_counter = self.batch_snapshot
+                self.note_index = None
+                self.order = SortedKeys(self.notes, key=self.code_key)
+            self.batch_snapshot = None
+            self.dirty = False
+
+    def create_note(self, text, timestamp=None):
+        """Create a new note and save it."""
+        with self.lock:
+            self.note_counter += 1
+            note = self.make_note(self.note_counter, text, timestamp or datetime.now())
+            self.notes[self.note_counter] = note
+            self.order.add(note.code)
+            self.index_note(note.code, text)
+            self.log_change(('put', note))
+        self.persist()
         return note
 
     def update_note(self, key, text):
         """Update an existing note and save changes."""
-        if key in self.notes:
-            note = Note(key, text)
+        with self.lock:
+            if key not in self.notes:
+                return False
+            note = self.make_note(key, text, datetime.now())
+            self.order.remove(key)
             self.notes[key] = note
-            if self.autosave:
-                self.save_notes()
-            return True
-        return False
+            self.order.add(key)
+            self.index_note(key, text)
+            self.log_change(('put', note))
+        self.persist()
+        return True
 
     def delete_note(self, key):
         """Delete a note and save changes."""
-        if key in self.notes:
+        with self.lock:
+            if key not in self.notes:
+                return False
+            self.order.remove(key)
             del self.notes[key]
-            if self.autosave:
-                self.save_notes()
-            return True
-        return False
+            if self.note_index is not None:
+                self.note_index.remove(key)
+            self.log_change(('delete', key))
+        self.persist()
+        return True
 
     def search_note(self, key):
         """Search for a note by its key."""
         return self.notes.get(key)
 
-    def list_notes(self):
-        """Return a list of all notes in reverse chronological order."""
-        return sorted(self.notes.values(), key=lambda x: x.code, reverse=True)
+    def list_notes(self, limit=None, before=None):
+        """Return a list of notes in reverse chronological order, up to limit notes older than before."""
+        before = None if before is None else recency_key(before)
+        return [self.notes[code] for code in self.order.last(limit, before)]
 
     def retrieve_notes(self, search_string):
         """Retrieve all notes containing the search string."""
         return sorted([note for note in self.notes.values() 
                       if search_string.lower() in note.text.lower()],
-                     key=lambda x: x.code)
\ No newline at end of file
+                     key=lambda x: x.code)
+
+    def index_note(self, key, text):
+        if self.note_index is not None:
+            self.note_index.add(key, text)
+
+    def query_notes(self, query):
+        """Retrieve the notes matching a boolean query, using the token index."""
+        if self.note_index is None:
+            self.note_index = NoteIndex((code, note.text) for code, note in self.notes.items())
+        return [self.notes[code] for code in sorted(self.note_index.search(query))]
@@ -0,0 +1,84 @@
+from datetime import datetime
+from clinic.dao.note_dao import NoteDAO
+from clinic.dao.sqlite_schema import create_tables
+from clinic.note import Note
+
+class NoteDAOSQLite(NoteDAO):
+    def __init__(self, connection, phn):
+        self.connection = connection
+        self.phn = phn
+        create_tables(connection)
+        row = connection.execute('SELECT MAX(code) FROM notes WHERE phn = ?', (phn,)).fetchone()
+        self.note_counter = row[0] or 0
+        self.batch_counter = None
+
+    def row_to_note(self, row):
+        if row is None:
+            return None
+        code, text, timestamp = row
+        return Note(code, text, datetime.fromisoformat(timestamp) if timestamp else None)
+
+    def search_note(self, key):
+        row = self.connection.execute(
+            'SELECT code, text, timestamp FROM notes WHERE phn = ? AND code = ?',
+            (self.phn, key)).fetchone()
+        return self.row_to_note(row)
+
+    def create_note(self, text, timestamp=None):
+        self.note_counter += 1
+        note = Note(self.note_counter, text, timestamp or datetime.now())
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO notes (phn, code, text, timestamp) VALUES (?, ?, ?, ?)',
+                (self.phn, note.code, note.text, note.timestamp.isoformat()))
+        return note
+
+    def retrieve_notes(self, search_string):
+        rows = self.connection.execute(
+            'SELECT code, text, timestamp FROM notes '
+            'WHERE phn = ? AND instr(lower(text), lower(?)) > 0 ORDER BY code',
+            (self.phn, search_string))
+        return [self.row_to_note(row) for row in rows]
+
+    def update_note(self, key, text):
+        with self.connection:
+            cursor = self.connection.execute(
+                'UPDATE notes SET text = ?, timestamp = ? WHERE phn = ? AND code = ?',
+                (text, datetime.now().isoformat(), self.phn, key))
+        return cursor.rowcount == 1
+
+    def delete_note(self, key):
+        with self.connection:
+            cursor = self.connection.execute(
+                'DELETE FROM notes WHERE phn = ? AND code = ?', (self.phn, key))
+        return cursor.rowcount == 1
+
+    def begin_batch(self):
+        self.batch_counter = self.note_counter
+        self.connection.begin_batch()
+
+    def commit_batch(self):
+        self.batch_counter = None
+        self.connection.commit_batch()
+
+    def rollback_batch(self):
+        if self.batch_counter is not None:
+            self.note_counter = self.batch_counter
+        self.batch_counter = None
+        self.connection.rollback_batch()
+
+    def list_notes(self, limit=None, before=None):
+        #notes without a timestamp sort as the oldest, like NULLs in a descending order
+        if before is None:
+            condition, parameters = '', ()
+        elif before.timestamp is None:
+            condition, parameters = 'AND timestamp IS NULL AND code < ? ', (before.code,)
+        else:
+            timestamp = before.timestamp.isoformat()
+            condition = 'AND (timestamp < ? OR (timestamp = ? AND code < ?) OR timestamp IS NULL) '
+            parameters = (timestamp, timestamp, before.code)
+        rows = self.connection.execute(
+            'SELECT code, text, timestamp FROM notes WHERE phn = ? ' + condition +
+            'ORDER BY timestamp DESC, code DESC LIMIT ?',
+            (self.phn,) + parameters + (-1 if limit is None else limit,))
+        return [self.row_to_note(row) for row in rows]
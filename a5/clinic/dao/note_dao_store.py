@@ -0,0 +1,76 @@
+from clinic.dao.note_dao_log import NoteDAOLog, encode_change, encode_record, HEADER, CHECKSUM, PUT, COMPRESSED
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.mapped_note import MappedNote
+from clinic.dao.sorted_keys import SortedKeys
+
+class NoteDAOStore(NoteDAOLog):
+    '''Notes of one patient kept in a NoteStore shared by every patient.
+
+    Changes are logged like NoteDAOLog does, but to the patient's segments
+    of the shared store instead of a file of its own. A patient still stored
+    as <phn>.dat is read from the pickle and moved to the store on the first
+    change.
+
+    Loading only reads the record headers from the mapped store. Note texts
+    and timestamps stay in the mapping until a note first needs them. Records
+    are always written in the order the notes last changed, so listing order
+    comes from the file without decoding a single timestamp.
+    '''
+    def __init__(self, phn=None, store=None, autosave=False, records_path='clinic/records', writer=None,
+                 compress=False):
+        self.store = store
+        super().__init__(phn=phn, autosave=autosave, records_path=records_path, writer=writer,
+                         compress=compress)
+
+    def load_notes(self):
+        if self.phn not in self.store:
+            NoteDAOPickle.load_notes(self)
+            return
+        notes = {}
+        records = 0
+        unpack = HEADER.unpack_from
+        for view in self.store.views(self.phn):
+            #segments were checked when they were written or scanned, so records
+            #are read without verifying their checksums
+            offset = 0
+            while offset < len(view):
+                op, code, stamp, length = unpack(view, offset)
+                start = offset + HEADER.size
+                offset = start + length + CHECKSUM.size
+                #a put moves the note to the end, keeping notes in the order they last changed
+                notes.pop(code, None)
+                if op & ~COMPRESSED == PUT:
+                    notes[code] = MappedNote(code, view[start:start + length], stamp, op & COMPRESSED)
+                records += 1
+        self.notes = notes
+        self.log_records = records
+        self.note_counter = max(notes) if notes else 0
+        self.note_index = None
+        self.order = SortedKeys(notes, key=self.code_key, presorted=True)
+
+    def save_notes(self):
+        """Append the pending changes to the patient's segments of the store."""
+        if not (self.autosave and self.phn):
+            return
+        with self.save_lock:
+            with self.lock:
+                changes = self.pending
+                self.pending = []
+            if self.phn not in self.store:
+                #the first segment holds every note, including those still in a pickle
+                self.compact_notes()
+            elif changes:
+                try:
+                    self.store.append(self.phn, b''.join(encode_change(change, self.compress)
+                                                         for change in changes))
+                except BaseException:
+                    with self.lock:
+                        self.pending[:0] = changes
+                    raise
+
+    def compact_notes(self):
+        with self.save_lock:
+            notes = self.committed_notes()
+            self.store.append(self.phn, b''.join(encode_record(PUT, note.code, note.timestamp, note.text,
+                                                               self.compress) for note in notes))
+            self.remove_pickle()
@@ -0,0 +1,91 @@
+'''Preset zlib dictionary of note text, written by clinic.bench.dictionary.
+
+Part of the file format of compressed notes, never edit it.
+'''
+NOTE_DICTIONARY = (
+    b'healing high BP no more of back ordered patient results the new trouble Referred Wound is a strong '
+    b'adjusted allergic and high and sore anxiety, back continue diabetes general. high is of of neck. '
+    b'options. pain pain and physical pressure referred removed. sleeping starting stitches the back the '
+    b'past to date. 120x80 in Follow up are high, back pain concerns, discussed dizziness fever and '
+    b'follow up for headache. is taking medicines ordered a required. return in says high shortness up in '
+    b'two up visit, Blood Blood test Prescribed and return chest chest pain comes with headaches. high BP '
+    b'is high blood is healing levels are medication nausea and no further normal, no of breath, one '
+    b'month. pain after past three persistent prescribed specialist throat for to to control two weeks. '
+    b'Blood sugar Patient has Referred to allergic to and no more antibiotics are normal, assessment. '
+    b'cardiology. controlled, for 7 days, for further headache on improvement in general. is allergic '
+    b'medication. of a strong on the back penicillin. referred to results are sore throat the back of the '
+    b'current three days. up to date. Patient says Patient will a persistent a specialist adjusted the '
+    b'and anxiety, chest x-ray. continue the days, follow examination, follow up in for the past headache '
+    b'and medicines to no concerns, of back pain pain after a reports mild says high BP shortness of '
+    b'sleeping and starting the sugar levels test results the diabetes vaccinations visit, blood Patient '
+    b'comes Patient feels Patient has a Referred to a after a fall, and dizziness and return in and '
+    b'shortness back of neck. control blood feels general healing well, in one month. in two weeks. '
+    b'reports chest reports fever return in one treatment and will continue with headache 7 days, follow '
+    b'a chest x-ray. and high blood are normal, no blood pressure chest pain and complains of a cough, '
+    b'ordered fever and sore further further action high, adjusted is allergic to is controlled, mild '
+    b'headache. normal, on the back of physiotherapy. reports nausea since starting specialist for the '
+    b'past three throat for the to cardiology. to penicillin. well, stitches Annual physical and sore '
+    b'throat antibiotics for back pain after blood days, follow up dizziness since examination, no '
+    b'headache on the improvement and more headaches. new medication. normal, patient ordered a chest '
+    b'patient reports reports trouble says high BP is sore throat for strong headache the to a specialist '
+    b'up visit, blood vaccinations up Follow up visit, Wound is healing a specialist for action required. '
+    b'and shortness of breath, referred cough, ordered a fall, prescribed follow up in two has a '
+    b'persistent headache is healing well, levels are high, past three days. pressure normal, starting '
+    b'the new sugar levels are taking medicines test results are to control blood trouble sleeping up in '
+    b'two weeks. 7 days, follow up BP is controlled, Patient is taking Patient says high a strong '
+    b'headache and return in one antibiotics for 7 back pain after a complains of back current treatment '
+    b'headache and high no further action persistent cough, reports fever and stitches removed. the back '
+    b'of neck. will continue the with headache and 120x80 in general. Blood sugar levels Blood test '
+    b'results Patient comes with a fall, prescribed anxiety, discussed are high, adjusted complains '
+    b'controlled, 120x80 days, follow up in for 7 days, follow for the past three high, adjusted the '
+    b'improvement and no medication dosage. no more headaches. normal, no further of back pain after pain '
+    b'after a fall, pain and shortness pressure. reports chest pain reports nausea and since starting the '
+    b'strong headache on treatment treatment options. vaccinations up to Patient is allergic a persistent '
+    b'cough, and dizziness since and sore throat for breath, referred to comes with headache diabetes '
+    b'medication discussed treatment further assessment. general improvement is taking medicines of '
+    b'breath, referred results are normal, sore throat for the taking medicines to the new medication. '
+    b'throat for the past to a specialist for Patient is Patient says high BP a strong headache on '
+    b'continue the current headache on the back high blood pressure. medicines to control nausea and '
+    b'dizziness of a strong headache patient reports mild return in one month. shortness of breath, the '
+    b'past three days. treatment and return trouble sleeping and Patient feels general Patient reports '
+    b'chest Patient reports fever Patient will continue adjusted the diabetes and complains of a strong '
+    b'controlled, 120x80 in current treatment and fever and sore throat is controlled, 120x80 pain and '
+    b'shortness of physical examination, sleeping and anxiety, the current treatment visit, blood '
+    b'pressure Blood sugar levels are Blood test results are Follow up visit, blood Patient complains of '
+    b'a Patient is allergic to Patient reports nausea Prescribed antibiotics Wound is healing well, and '
+    b'anxiety, discussed and no more headaches. are high, adjusted the are normal, no further blood '
+    b'pressure normal, complains of back pain concerns, vaccinations cough, ordered a chest healing well, '
+    b'stitches high BP is controlled, is taking medicines to of breath, referred to ordered a chest '
+    b'x-ray. reports chest pain and reports fever and sore reports mild headache. results are normal, no '
+    b'since starting the new specialist for further strong headache on the sugar levels are high, with '
+    b'headache and high Patient reports trouble allergic to penicillin. antibiotics for 7 days, comes '
+    b'with headache and control blood pressure. for further assessment. general improvement and has a '
+    b'persistent cough, headache and high blood improvement and no more normal, patient reports referred '
+    b'to cardiology. the diabetes medication treatment and return in well, stitches removed. BP is '
+    b'controlled, 120x80 Patient has a persistent Referred to a specialist a specialist for further after '
+    b'a fall, prescribed and high blood pressure. and shortness of breath, chest pain and shortness '
+    b'complains of dizziness since starting further action required. is controlled, 120x80 in physical '
+    b'examination, no pressure normal, patient reports trouble sleeping test results are normal, up '
+    b'visit, blood pressure vaccinations up to date. Patient complains of back Patient reports fever and '
+    b'Patient will continue the concerns, vaccinations up examination, no concerns, feels general '
+    b'improvement is healing well, stitches levels are high, adjusted no concerns, vaccinations normal, '
+    b'no further action persistent cough, ordered prescribed physiotherapy. the current treatment and '
+    b'will continue the current Patient reports chest pain Patient reports nausea and Prescribed '
+    b'antibiotics for general improvement and no is allergic to penicillin. medicines to control blood '
+    b'nausea and dizziness since to control blood pressure. Patient comes with headache Patient is taking '
+    b'medicines a persistent cough, ordered diabetes medication dosage. high, adjusted the diabetes no '
+    b'further action required. persistent cough, ordered a taking medicines to control Annual physical '
+    b'examination, Prescribed antibiotics for 7 and dizziness since starting anxiety, discussed treatment '
+    b'concerns, vaccinations up to current treatment and return discussed treatment options. dizziness '
+    b'since starting the no concerns, vaccinations up normal, patient reports mild reports nausea and '
+    b'dizziness reports trouble sleeping and starting the new medication. feels general improvement and '
+    b'shortness of breath, referred trouble sleeping and anxiety, visit, blood pressure normal, blood '
+    b'pressure normal, patient blood pressure. continue the current treatment controlled, 120x80 in '
+    b'general. patient reports mild headache. Annual physical examination, no breath, referred to '
+    b'cardiology. fall, prescribed physiotherapy. healing well, stitches removed. sleeping and anxiety, '
+    b'discussed the diabetes medication dosage. Patient reports trouble sleeping adjusted the diabetes '
+    b'medication and anxiety, discussed treatment pressure normal, patient reports Patient feels general '
+    b'improvement a fall, prescribed physiotherapy. Patient complains physical examination, no concerns, '
+    b'specialist for further assessment. reports anxiety, discussed treatment options. examination, no '
+    b'concerns, vaccinations Patient complains of Patient reports Patient'
+)
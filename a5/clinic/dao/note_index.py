@@ -0,0 +1,87 @@
+import re
+import sys
+
+TOKEN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Split text into case-folded word tokens."""
+    return [sys.intern(token) for token in TOKEN.findall(text.casefold())]
+
+class NoteQuery:
+    '''Boolean query over note tokens.
+
+    Terms are ANDed, OR separates alternatives and double quotes group a
+    phrase, e.g. 'headache OR "blood pressure" medication'. Each alternative
+    is kept as a list of token tuples, a tuple longer than one being a phrase.
+    '''
+    def __init__(self, query):
+        self.alternatives = []
+        items = []
+        for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+            if word == 'OR':
+                if items:
+                    self.alternatives.append(items)
+                items = []
+            elif word == 'AND':
+                continue
+            else:
+                tokens = tuple(tokenize(phrase or word))
+                if tokens:
+                    items.append(tokens)
+        if items:
+            self.alternatives.append(items)
+
+    def matches(self, tokens):
+        """Tell whether a note with the given token list satisfies the query."""
+        return any(all(contains(tokens, item) for item in items) for items in self.alternatives)
+
+def contains(tokens, item):
+    if len(item) == 1:
+        return item[0] in tokens
+    size = len(item)
+    return any(tuple(tokens[i:i + size]) == item for i in range(len(tokens) - size + 1))
+
+class NoteIndex:
+    '''Inverted index from note tokens to note keys.
+
+    The token list of every note is kept too, so that a note can be removed
+    from its postings and phrases can be checked without the note text.
+    '''
+    def __init__(self, notes=None):
+        self.postings = {}
+        self.tokens = {}
+        if notes:
+            for key, text in notes:
+                self.add(key, text)
+
+    def add(self, key, text):
+        if key in self.tokens:
+            self.remove(key)
+        tokens = tuple(tokenize(text))
+        self.tokens[key] = tokens
+        for token in set(tokens):
+            self.postings.setdefault(token, set()).add(key)
+
+    def remove(self, key):
+        tokens = self.tokens.pop(key, None)
+        if tokens is None:
+            return
+        for token in set(tokens):
+            keys = self.postings[token]
+            keys.discard(key)
+            if not keys:
+                del self.postings[token]
+
+    def search(self, query):
+        """Return the set of keys of the notes matching a boolean query string."""
+        if not isinstance(query, NoteQuery):
+            query = NoteQuery(query)
+        found = set()
+        for items in query.alternatives:
+            postings = [self.postings.get(token, set()) for item in items for token in set(item)]
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+            phrases = [item for item in items if len(item) > 1]
+            found.update(key for key in candidates
+                         if all(contains(self.tokens[key], phrase) for phrase in phrases))
+        return found
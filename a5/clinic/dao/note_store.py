@@ -0,0 +1,168 @@
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+from clinic.dao.durability import NONE, ATOMIC, check_level, open_for_write, sync_append
+from clinic.dao.note_dao_log import live_records
+
+#phn, payload length, crc32 of the payload
+SEGMENT = struct.Struct('<qII')
+
+class NoteStore:
+    '''Notes of every patient in one data file, with an index from PHN to file offsets.
+
+    The file is a sequence of segments. Each segment holds a batch of note
+    log records (see clinic.dao.note_dao_log) for one patient, so a patient's
+    notes are the replay of its segments in file order. Writes append a
+    segment and record its offset in the index, reads seek straight to the
+    segments of one patient.
+
+    The index is saved next to the data file with the data length it covers,
+    so opening the store only scans the segments appended after the last
+    save. Once there are more than compact_factor segments per patient the
+    file is rewritten with a single segment of live notes per patient.
+
+    Reads through views() come straight from a read-only mapping of the file,
+    so only the pages holding what is actually decoded are ever read.
+    '''
+    #stores with fewer segments than this are never worth a compaction
+    MIN_COMPACT = 1024
+
+    def __init__(self, filename='clinic/notes.dat', durability=ATOMIC, compact_factor=4):
+        self.filename = filename
+        self.index_filename = filename + '.idx'
+        self.durability = check_level(durability)
+        self.compact_factor = compact_factor
+        #offsets of the segments of each phn, in file order
+        self.index = {}
+        self.segments = 0
+        #end of the last intact segment, and a mapping of the file that may stop before it
+        self.length = 0
+        self.map = None
+        self.lock = threading.RLock()
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        if not os.path.exists(filename):
+            open(filename, 'wb').close()
+        self.file = open(filename, 'r+b')
+        self.load_index()
+
+    def load_index(self):
+        """Load the saved index and scan the segments appended after it."""
+        length = os.path.getsize(self.filename)
+        covered = 0
+        self.index = {}
+        try:
+            if os.path.exists(self.index_filename):
+                with open(self.index_filename, 'rb') as f:
+                    covered, index = pickle.load(f)
+                if covered <= length:
+                    self.index = index
+                else:
+                    covered = 0
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            covered = 0
+        self.segments = sum(len(offsets) for offsets in self.index.values())
+        self.scan(covered, length)
+
+    def scan(self, offset, length):
+        self.file.seek(offset)
+        while offset + SEGMENT.size <= length:
+            phn, size, checksum = SEGMENT.unpack(self.file.read(SEGMENT.size))
+            payload = self.file.read(size)
+            if len(payload) < size or zlib.crc32(payload) != checksum:
+                break
+            self.index.setdefault(phn, []).append(offset)
+            self.segments += 1
+            offset += SEGMENT.size + size
+        #drop a torn tail so that later appends are not hidden behind it
+        if offset < length:
+            self.file.truncate(offset)
+        self.length = offset
+
+    def save_index(self):
+        with self.lock:
+            self.file.flush()
+            data = (self.file.seek(0, os.SEEK_END), self.index)
+            with open_for_write(self.index_filename, 'wb', self.durability) as f:
+                pickle.dump(data, f)
+
+    def __contains__(self, phn):
+        return phn in self.index
+
+    def read(self, phn):
+        """Return the log records of phn, its segments joined in file order."""
+        payloads = []
+        with self.lock:
+            for offset in self.index.get(phn, ()):
+                self.file.seek(offset)
+                size = SEGMENT.unpack(self.file.read(SEGMENT.size))[1]
+                payloads.append(self.file.read(size))
+        return b''.join(payloads)
+
+    def mapping(self):
+        """Return a mapping of the whole file, remapped when the file has grown."""
+        with self.lock:
+            if self.length and (self.map is None or len(self.map) < self.length):
+                #views of the old mapping keep it open for as long as they are used
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self.map
+
+    def views(self, phn):
+        """Return the segment payloads of phn as memoryviews of the mapped file, without copying."""
+        offsets = self.index.get(phn)
+        if not offsets:
+            return []
+        with self.lock:
+            view = memoryview(self.mapping())
+            views = []
+            for offset in offsets:
+                size = SEGMENT.unpack_from(view, offset)[1]
+                views.append(view[offset + SEGMENT.size:offset + SEGMENT.size + size])
+            return views
+
+    def append(self, phn, payload):
+        """Append a segment of log records for phn."""
+        with self.lock:
+            offset = self.file.seek(0, os.SEEK_END)
+            self.file.write(SEGMENT.pack(phn, len(payload), zlib.crc32(payload)) + payload)
+            self.file.flush()
+            sync_append(self.file, self.durability)
+            self.length = offset + SEGMENT.size + len(payload)
+            self.index.setdefault(phn, []).append(offset)
+            self.segments += 1
+            if self.segments >= self.MIN_COMPACT and self.segments > self.compact_factor * len(self.index):
+                self.compact()
+
+    def compact(self):
+        """Rewrite the file with one segment per patient holding only its live notes."""
+        with self.lock:
+            index = {}
+            #offsets of the saved index are about to go stale, scan the new file if we crash
+            if os.path.exists(self.index_filename):
+                os.remove(self.index_filename)
+            #never rewrite in place, the segments are read while the new file is written
+            durability = ATOMIC if self.durability == NONE else self.durability
+            with open_for_write(self.filename, 'wb', durability) as f:
+                for phn in self.index:
+                    payload = live_records(self.read(phn))
+                    if payload:
+                        index[phn] = [f.tell()]
+                        f.write(SEGMENT.pack(phn, len(payload), zlib.crc32(payload)) + payload)
+            self.file.close()
+            self.file = open(self.filename, 'r+b')
+            self.index = index
+            self.segments = len(index)
+            self.length = self.file.seek(0, os.SEEK_END)
+            self.map = None
+            self.save_index()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.save_index()
+                self.file.close()
+            self.map = None
@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+import base64
+import heapq
+import json
 class PatientDAO(ABC):
     @abstractmethod
     def search_patient(self, key):
@@ -19,3 +22,69 @@ class PatientDAO(ABC):
     def list_patients(self):
         pass
 
+    def iter_patients(self):
+        """Iterate over every patient, for stores that can do so without building a list."""
+        return iter(self.list_patients())
+
+    def iter_matching_phns(self, search_string):
+        """Iterate over the PHNs of the patients whose name contains search_string, in any order."""
+        #scans every patient, stores that keep a name index override this
+        folded = search_string.casefold()
+        return (patient.phn for patient in self.iter_patients() if folded in patient.name.casefold())
+
+    def create_patients(self, patients):
+        """Create many patients, skipping those whose phn is taken, and return how many were created."""
+        return sum(1 for patient in patients if self.create_patient(patient))
+
+    # pages are ordered by page_key and a cursor is an opaque token of the last
+    # patient of the previous page, so patients created or deleted between two
+    # calls never make a page repeat or skip the others. Stores with an index
+    # in page order should override the page methods.
+    def page_key(self, phn):
+        return phn
+
+    def page(self, patients, limit):
+        """Cut limit + 1 patients down to a page and the cursor of the next one."""
+        if limit < 1:
+            raise ValueError('page limit must be positive')
+        if len(patients) > limit:
+            return patients[:limit], base64.urlsafe_b64encode(json.dumps(patients[limit - 1].phn).encode()).decode()
+        return patients, None
+
+    def cursor_phn(self, cursor):
+        """Return the PHN of the last patient before the page of cursor, None for the first page."""
+        if cursor is None:
+            return None
+        try:
+            return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (AttributeError, ValueError):
+            raise ValueError('invalid page cursor: %r' % (cursor,)) from None
+
+    def list_patients_page(self, limit, cursor=None):
+        """Return up to limit patients after cursor, and the cursor of the next page or None."""
+        after = None if cursor is None else self.page_key(self.cursor_phn(cursor))
+        patients = (patient for patient in self.iter_patients()
+                    if after is None or self.page_key(patient.phn) > after)
+        return self.page(heapq.nsmallest(limit + 1, patients, key=lambda p: self.page_key(p.phn)), limit)
+
+    def retrieve_patients_page(self, search_string, limit, cursor=None):
+        """Return up to limit patients matching search_string after cursor, in page order."""
+        after = None if cursor is None else self.page_key(self.cursor_phn(cursor))
+        #only the PHNs of the matches are ranked, the page alone is looked up
+        phns = (phn for phn in self.iter_matching_phns(search_string)
+                if after is None or self.page_key(phn) > after)
+        phns = heapq.nsmallest(limit + 1, phns, key=self.page_key)
+        return self.page([self.search_patient(phn) for phn in phns], limit)
+
+    # batches defer persistence of the changes made between begin_batch and
+    # commit_batch, rollback_batch undoes them instead. Stores that write
+    # nothing per change can keep these no-ops.
+    def begin_batch(self):
+        pass
+
+    def commit_batch(self):
+        pass
+
+    def rollback_batch(self):
+        pass
+
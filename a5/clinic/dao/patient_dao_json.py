@@ -2,98 +2,285 @@ from clinic.patient import Patient
 from clinic.dao.patient_dao import PatientDAO
 from clinic.dao.patient_encoder import PatientEncoder
 from clinic.dao.patient_decoder import PatientDecoder
+from clinic.dao.name_index import NameIndex
+from clinic.dao.sorted_keys import SortedKeys
+from clinic.dao.compression import PATIENT_DICTIONARY, CompressedWriter, open_text
+from clinic.dao.durability import ATOMIC, check_level, open_for_write, sync_append
+import io
 import json
 import os
+import threading
+import zlib
+
+#patients listed first, in this order, the others follow by PHN
+PHN_PRIORITY = {
+    9798884444: 1,  # Ali
+    9792226666: 2,  # Jin
+    9790012000: 3,  # John
+    9790014444: 4,  # Mary
+    9792225555: 5   # Joe
+}
+
+def sort_key(phn):
+    return (PHN_PRIORITY.get(phn, phn), phn)
 
 class PatientDAOJSON(PatientDAO):
-    def __init__(self, autosave=False):
+    def __init__(self, autosave=False, journal=False, filename='clinic/patients.json', compact_threshold=1000,
+                 writer=None, note_dao_factory=None, durability=ATOMIC, compress=False):
         self.patients = {}
+        self.name_index = NameIndex()
+        #phns in listing order, kept sorted as patients come and go
+        self.order = SortedKeys(key=sort_key)
         self.autosave = autosave
+        #in journal mode each mutation is appended to a log next to the snapshot
+        #instead of rewriting the whole snapshot file
+        self.journal = journal
+        self.filename = filename
+        self.journal_filename = os.path.splitext(filename)[0] + '.log'
+        self.compact_threshold = compact_threshold
+        self.journal_entries = 0
+        #while a batch is open, changes are kept here instead of being written
+        self.batch_snapshot = None
+        self.batch_records = None
+        #with a BackgroundWriter, changes wait in pending_records until it flushes them
+        self.writer = writer
+        self.pending_records = []
+        #guards patients, order and the name index, changed by callers while the writer thread saves them
+        self.lock = threading.RLock()
+        self.note_dao_factory = note_dao_factory
+        #how hard saves try to survive a crash, see clinic.dao.durability
+        self.durability = check_level(durability)
+        #compress writes the snapshot as compact json through zlib, either kind loads
+        self.compress = compress
         if autosave:
             self.load_patients()
 
     def load_patients(self):
         try:
-            if os.path.exists('clinic/patients.json'):
-                with open('clinic/patients.json', 'r') as f:
-                    data = json.load(f)
-                    decoder = PatientDecoder(autosave=self.autosave)
-                    patients = decoder.decode(json.dumps(data))
-                    self.patients = {p.phn: p for p in patients}
-        except (FileNotFoundError, json.JSONDecodeError):
+            if os.path.exists(self.filename):
+                with open(self.filename, 'rb') as f, open_text(f) as text:
+                    #patients are built while the file is parsed, in a single pass
+                    decoder = PatientDecoder(autosave=self.autosave, note_dao_factory=self.note_dao_factory)
+                    self.patients = {p.phn: p for p in decoder.iter_decode(text)}
+        except (FileNotFoundError, ValueError, zlib.error):
             self.patients = {}
+        self.replay_journal()
+        self.reindex()
+
+    def reindex(self):
+        self.name_index = NameIndex((p.phn, p.name) for p in self.patients.values())
+        self.order = SortedKeys(self.patients, key=sort_key)
+
+    def replay_journal(self):
+        """Apply the changes logged since the last snapshot."""
+        self.journal_entries = 0
+        if not os.path.exists(self.journal_filename):
+            return
+        decoder = PatientDecoder(autosave=self.autosave, note_dao_factory=self.note_dao_factory)
+        valid_length = 0
+        with open(self.journal_filename, 'rb+') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    record = json.loads(line)
+                except ValueError:
+                    #a torn last line means the process died mid-append, drop it
+                    #so that later appends are not hidden behind it
+                    f.truncate(valid_length)
+                    break
+                if record['op'] == 'put':
+                    patient = decoder.create_patient(record['patient'])
+                    self.patients[patient.phn] = patient
+                elif record['op'] == 'delete':
+                    self.patients.pop(record['phn'], None)
+                valid_length += len(line)
+                self.journal_entries += 1
 
     def save_patients(self):
         if self.autosave:
-            if not os.path.exists('clinic'):
-                os.makedirs('clinic')
-            with open('clinic/patients.json', 'w') as f:
-                patients_list = sorted(self.patients.values(), 
-                                    key=lambda x: x.phn,
-                                    reverse=True)
-                json.dump(patients_list, f, cls=PatientEncoder, indent=2)
+            #copy under the lock, the background writer may be saving while patients change
+            #patients are written in listing order, which is already kept sorted
+            with self.lock:
+                patients_list = [self.patients[phn] for phn in self.order]
+            if self.compress:
+                with open_for_write(self.filename, 'wb', self.durability) as f:
+                    with io.TextIOWrapper(CompressedWriter(f, PATIENT_DICTIONARY), encoding='utf-8') as text:
+                        self.write_compact(patients_list, text)
+            else:
+                with open_for_write(self.filename, 'w', self.durability) as f:
+                    json.dump(patients_list, f, cls=PatientEncoder, indent=2)
+            #the snapshot now holds every logged change
+            if os.path.exists(self.journal_filename):
+                os.remove(self.journal_filename)
+            self.journal_entries = 0
+
+    def write_compact(self, patients_list, f, chunk_size=10000):
+        #json.dump always runs the pure python encoder, encode() of a chunk runs the C one
+        encoder = PatientEncoder(separators=(',', ':'))
+        f.write('[')
+        for i in range(0, len(patients_list), chunk_size):
+            if i:
+                f.write(',')
+            f.write(encoder.encode(patients_list[i:i + chunk_size])[1:-1])
+        f.write(']')
+
+    def compact_patients(self):
+        """Fold the journal back into the snapshot file."""
+        self.save_patients()
+
+    def append_journal(self, records):
+        """Append change records to the journal, compacting it when it grows too long."""
+        directory = os.path.dirname(self.journal_filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.journal_filename, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, cls=PatientEncoder) + '\n')
+            sync_append(f, self.durability)
+        self.journal_entries += len(records)
+        if self.journal_entries >= self.compact_threshold:
+            self.compact_patients()
+
+    def persist(self, records):
+        #records are idempotent ('put' a patient or 'delete' a phn) so replaying
+        #a journal over a snapshot that already contains them is harmless
+        if self.batch_records is not None:
+            self.batch_records.extend(records)
+            return
+        if not self.autosave:
+            return
+        if self.writer:
+            with self.lock:
+                self.pending_records.extend(records)
+            self.writer.mark_dirty(self)
+        elif self.journal:
+            self.append_journal(records)
+        else:
+            self.save_patients()
+
+    def flush_changes(self):
+        """Write the changes left pending for the background writer."""
+        with self.lock:
+            records = self.pending_records
+            self.pending_records = []
+        if not records:
+            return
+        try:
+            if self.journal:
+                self.append_journal(records)
+            else:
+                self.save_patients()
+        except BaseException:
+            #kept for the next flush, ahead of the changes made since
+            with self.lock:
+                self.pending_records[:0] = records
+            raise
+
+    def copy_patient(self, patient):
+        return Patient(patient.phn, patient.name, patient.birth_date, patient.phone,
+                       patient.email, patient.address, autosave=self.autosave,
+                       note_dao_factory=self.note_dao_factory)
+
+    def begin_batch(self):
+        with self.lock:
+            self.batch_snapshot = dict(self.patients)
+            self.batch_records = []
+
+    def commit_batch(self):
+        with self.lock:
+            records = self.batch_records
+            self.batch_snapshot = None
+            self.batch_records = None
+        #one write for the whole batch
+        if records:
+            self.persist(records)
+
+    def rollback_batch(self):
+        with self.lock:
+            if self.batch_snapshot is not None:
+                self.patients = self.batch_snapshot
+                self.reindex()
+            self.batch_snapshot = None
+            self.batch_records = None
 
     def list_patients(self):
-        #create a custom sorting key function
-        def custom_sort_key(patient):
-            #define priority order based on PHN
-            phn_priority = {
-                9798884444: 1,  # Ali
-                9792226666: 2,  # Jin
-                9790012000: 3,  # John
-                9790014444: 4,  # Mary
-                9792225555: 5   # Joe
-            }
-            return phn_priority.get(patient.phn, patient.phn)
-        #sort patients using the custom sorting key
-        return sorted(self.patients.values(), key=custom_sort_key)
-    
+        return [self.patients[phn] for phn in self.order]
+
+    def iter_patients(self):
+        #in listing order, so the first k patients cost O(k)
+        return (self.patients[phn] for phn in self.order)
+
+    def page_key(self, phn):
+        return sort_key(phn)
+
+    def list_patients_page(self, limit, cursor=None):
+        with self.lock:
+            patients = [self.patients[phn] for phn in self.order.after(self.cursor_phn(cursor), limit + 1)]
+        return self.page(patients, limit)
+
     def search_patient(self, phn):
         return self.patients.get(phn)
 
     def create_patient(self, patient):
-        if patient.phn in self.patients:
-            return False
-        new_patient = Patient(
-            patient.phn,
-            patient.name,
-            patient.birth_date,
-            patient.phone,
-            patient.email,
-            patient.address,
-            autosave=self.autosave
-        )
-        self.patients[patient.phn] = new_patient
-        if self.autosave:
-            self.save_patients()
+        new_patient = self.copy_patient(patient)
+        with self.lock:
+            if patient.phn in self.patients:
+                return False
+            self.patients[patient.phn] = new_patient
+            self.order.add(patient.phn)
+            self.name_index.add(patient.phn, patient.name)
+        self.persist([{'op': 'put', 'patient': new_patient}])
         return True
-    
+
+    def create_patients(self, patients):
+        records = []
+        with self.lock:
+            for patient in patients:
+                if patient.phn in self.patients:
+                    continue
+                new_patient = self.copy_patient(patient)
+                self.patients[patient.phn] = new_patient
+                self.name_index.add(patient.phn, patient.name)
+                records.append({'op': 'put', 'patient': new_patient})
+            self.order.extend(record['patient'].phn for record in records)
+        #a single write for all of them
+        if records:
+            self.persist(records)
+        return len(records)
+
     def retrieve_patients(self, search_string):
-        return sorted([patient for patient in self.patients.values() 
-                    if search_string.lower() in patient.name.lower()],
-                    key=lambda x: x.phn)
+        return [self.patients[phn] for phn in sorted(self.name_index.search(search_string))]
+
+    def iter_matching_phns(self, search_string):
+        return self.name_index.search(search_string)
 
     def update_patient(self, key, patient):
-        if key not in self.patients:
-            return False
-        new_patient = Patient(
-            patient.phn,
-            patient.name,
-            patient.birth_date,
-            patient.phone,
-            patient.email,
-            patient.address,
-            autosave=self.autosave
-        )
-        self.patients[key] = new_patient
-        if self.autosave:
-            self.save_patients()
+        new_patient = self.copy_patient(patient)
+        records = []
+        #a changed PHN moves the patient to its new key
+        with self.lock:
+            if key not in self.patients:
+                return False
+            if patient.phn != key:
+                del self.patients[key]
+                self.order.remove(key)
+                self.name_index.remove(key)
+                records.append({'op': 'delete', 'phn': key})
+            if patient.phn not in self.patients:
+                self.order.add(patient.phn)
+            self.patients[patient.phn] = new_patient
+            self.name_index.add(patient.phn, patient.name)
+        records.append({'op': 'put', 'patient': new_patient})
+        self.persist(records)
         return True
 
     def delete_patient(self, key):
-        if key in self.patients:
+        with self.lock:
+            if key not in self.patients:
+                return False
             del self.patients[key]
-            if self.autosave:
-                self.save_patients()
-            return True
-        return False
\ No newline at end of file
+            self.order.remove(key)
+            self.name_index.remove(key)
+        self.persist([{'op': 'delete', 'phn': key}])
+        return True
@@ -0,0 +1,100 @@
+from clinic.patient import Patient
+from clinic.dao.patient_dao import PatientDAO
+from clinic.dao.note_dao_sqlite import NoteDAOSQLite
+from clinic.dao.sqlite_schema import connect
+from clinic.dao.durability import ATOMIC
+
+class PatientDAOSQLite(PatientDAO):
+    def __init__(self, autosave=False, filename='clinic/clinic.db', wal=True, durability=ATOMIC):
+        self.autosave = autosave
+        self.filename = filename if autosave else ':memory:'
+        self.connection = connect(self.filename, wal, durability)
+
+    def create_note_dao(self, phn):
+        #notes of every patient share the connection of the registry
+        return NoteDAOSQLite(self.connection, phn)
+
+    def row_to_patient(self, row):
+        if row is None:
+            return None
+        phn, name, birth_date, phone, email, address = row
+        return Patient(phn, name, birth_date, phone, email, address,
+                       autosave=self.autosave, note_dao_factory=self.create_note_dao)
+
+    def search_patient(self, key):
+        row = self.connection.execute(
+            'SELECT phn, name, birth_date, phone, email, address FROM patients WHERE phn = ?',
+            (key,)).fetchone()
+        return self.row_to_patient(row)
+
+    def create_patient(self, patient):
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO patients (phn, name, birth_date, phone, email, address) VALUES (?, ?, ?, ?, ?, ?)',
+                (patient.phn, patient.name, patient.birth_date, patient.phone, patient.email, patient.address))
+        return cursor.rowcount == 1
+
+    def create_patients(self, patients):
+        changes = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO patients (phn, name, birth_date, phone, email, address) VALUES (?, ?, ?, ?, ?, ?)',
+                ((p.phn, p.name, p.birth_date, p.phone, p.email, p.address) for p in patients))
+        return self.connection.total_changes - changes
+
+    def retrieve_patients(self, search_string):
+        rows = self.connection.execute(
+            'SELECT phn, name, birth_date, phone, email, address FROM patients '
+            'WHERE instr(lower(name), lower(?)) > 0 ORDER BY phn',
+            (search_string,))
+        return [self.row_to_patient(row) for row in rows]
+
+    def retrieve_patients_page(self, search_string, limit, cursor=None):
+        after = self.cursor_phn(cursor)
+        rows = self.connection.execute(
+            'SELECT phn, name, birth_date, phone, email, address FROM patients '
+            'WHERE instr(lower(name), lower(?)) > 0 AND (? IS NULL OR phn > ?) ORDER BY phn LIMIT ?',
+            (search_string, after, after, limit + 1))
+        return self.page([self.row_to_patient(row) for row in rows], limit)
+
+    def update_patient(self, key, patient):
+        #a changed PHN moves the patient to its new key
+        with self.connection:
+            cursor = self.connection.execute(
+                'UPDATE patients SET phn = ?, name = ?, birth_date = ?, phone = ?, email = ?, address = ? WHERE phn = ?',
+                (patient.phn, patient.name, patient.birth_date, patient.phone, patient.email, patient.address, key))
+        return cursor.rowcount == 1
+
+    def delete_patient(self, key):
+        with self.connection:
+            cursor = self.connection.execute('DELETE FROM patients WHERE phn = ?', (key,))
+        return cursor.rowcount == 1
+
+    def begin_batch(self):
+        self.connection.begin_batch()
+
+    def commit_batch(self):
+        self.connection.commit_batch()
+
+    def rollback_batch(self):
+        self.connection.rollback_batch()
+
+    def iter_patients(self):
+        #rows are fetched from the cursor as they are consumed
+        rows = self.connection.execute(
+            'SELECT phn, name, birth_date, phone, email, address FROM patients ORDER BY phn')
+        return (self.row_to_patient(row) for row in rows)
+
+    def list_patients(self):
+        rows = self.connection.execute(
+            'SELECT phn, name, birth_date, phone, email, address FROM patients ORDER BY phn')
+        return [self.row_to_patient(row) for row in rows]
+
+    def list_patients_page(self, limit, cursor=None):
+        #the primary key keeps patients in phn order, so a page is an index range
+        after = self.cursor_phn(cursor)
+        rows = self.connection.execute(
+            'SELECT phn, name, birth_date, phone, email, address FROM patients '
+            'WHERE ? IS NULL OR phn > ? ORDER BY phn LIMIT ?',
+            (after, after, limit + 1))
+        return self.page([self.row_to_patient(row) for row in rows], limit)
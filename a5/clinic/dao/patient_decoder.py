@@ -1,9 +1,11 @@
 import json
+from json.decoder import WHITESPACE
 from clinic.patient import Patient
 
 class PatientDecoder(json.JSONDecoder):
     def __init__(self, *args, **kwargs):
         self.autosave = kwargs.pop('autosave', False)
+        self.note_dao_factory = kwargs.pop('note_dao_factory', None)
         json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
     
     def object_hook(self, dct):
@@ -24,9 +26,54 @@ class PatientDecoder(json.JSONDecoder):
             data['phone'],
             data['email'],
             data['address'],
-            autosave=self.autosave
+            autosave=self.autosave,
+            note_dao_factory=self.note_dao_factory
         )
 
+    def iter_decode(self, f, chunk_size=1 << 16):
+        """Yield patients one at a time from a file holding a JSON list of patients."""
+        def read_more(buffer, position):
+            chunk = f.read(chunk_size)
+            return buffer[position:] + chunk, 0, not chunk
+
+        buffer, position, eof = '', 0, False
+        started = False
+        first = True
+        expect_value = True
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                if eof:
+                    raise json.JSONDecodeError('Unterminated list of patients', buffer, position)
+                buffer, position, eof = read_more(buffer, position)
+                continue
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise json.JSONDecodeError('Expecting a list of patients', buffer, position)
+                started = True
+                position += 1
+            elif char == ']' and (first or not expect_value):
+                return
+            elif not expect_value:
+                if char != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+                expect_value = True
+                position += 1
+            else:
+                try:
+                    data, end = self.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    #the next patient is cut by the end of the buffer
+                    if eof:
+                        raise
+                    buffer, position, eof = read_more(buffer, position)
+                    continue
+                yield data
+                position = end
+                first = False
+                expect_value = False
+
     def decode(self, json_str):
         data = super().decode(json_str)
         if isinstance(data, list):
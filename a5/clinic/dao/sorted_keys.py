@@ -0,0 +1,52 @@
+from bisect import bisect_left, bisect_right, insort
+
+class SortedKeys:
+    '''Keys, such as PHNs or note codes, kept in the order of a key function as they come and go.'''
+    #a sorted run appended to a sorted list merges in linear time, past this
+    #many new keys that beats inserting them one by one
+    MERGE_THRESHOLD = 64
+
+    def __init__(self, keys=(), key=None, presorted=False):
+        self.key = key
+        #presorted keys are trusted to be in order already, saving a key call for each
+        self.keys = list(keys) if presorted else sorted(keys, key=key)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sort_key(self, item):
+        return self.key(item) if self.key else item
+
+    def add(self, item):
+        insort(self.keys, item, key=self.key)
+
+    def extend(self, items):
+        items = list(items)
+        if len(items) > self.MERGE_THRESHOLD:
+            self.keys.extend(items)
+            self.keys.sort(key=self.key)
+        else:
+            for item in items:
+                self.add(item)
+
+    def remove(self, item):
+        """Remove item, which must still sort where it was added."""
+        index = bisect_left(self.keys, self.sort_key(item), key=self.key)
+        if index < len(self.keys) and self.keys[index] == item:
+            del self.keys[index]
+
+    def after(self, item, count):
+        """Return up to count keys following item, from the start when item is None."""
+        start = 0
+        if item is not None:
+            start = bisect_right(self.keys, self.sort_key(item), key=self.key)
+        return self.keys[start:start + count]
+
+    def last(self, count=None, before=None):
+        """Return up to count keys, last first, that sort before the sort key before."""
+        end = len(self.keys) if before is None else bisect_left(self.keys, before, key=self.key)
+        start = 0 if count is None else max(end - count, 0)
+        return self.keys[start:end][::-1]
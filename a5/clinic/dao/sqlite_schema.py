@@ -0,0 +1,59 @@
+import sqlite3
+import os
+from clinic.dao.durability import NONE, ATOMIC, FSYNC, check_level
+
+class ClinicConnection(sqlite3.Connection):
+    '''Connection whose `with connection:` blocks do not commit while a batch is open.'''
+    batch_depth = 0
+
+    def begin_batch(self):
+        self.batch_depth += 1
+
+    def commit_batch(self):
+        self.batch_depth = max(self.batch_depth - 1, 0)
+        if not self.batch_depth:
+            self.commit()
+
+    def rollback_batch(self):
+        self.batch_depth = 0
+        self.rollback()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.batch_depth:
+            return False
+        return super().__exit__(exc_type, exc_value, traceback)
+
+#PRAGMA synchronous setting for each durability level
+SYNCHRONOUS = {NONE: 'OFF', ATOMIC: 'NORMAL', FSYNC: 'FULL'}
+
+def connect(filename, wal=True, durability=ATOMIC):
+    """Open a clinic database, creating its tables and indexes when needed."""
+    directory = os.path.dirname(filename)
+    if directory and filename != ':memory:' and not os.path.exists(directory):
+        os.makedirs(directory)
+    connection = sqlite3.connect(filename, factory=ClinicConnection)
+    if wal and filename != ':memory:':
+        connection.execute('PRAGMA journal_mode=WAL')
+    #sqlite commits are always atomic, durability only picks how often it syncs
+    connection.execute('PRAGMA synchronous=%s' % SYNCHRONOUS[check_level(durability)])
+    create_tables(connection)
+    return connection
+
+def create_tables(connection):
+    #phone and the other free-form columns have no declared type so values keep
+    #the python type they were stored with
+    with connection:
+        connection.execute('''CREATE TABLE IF NOT EXISTS patients (
+            phn INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            birth_date,
+            phone,
+            email,
+            address)''')
+        connection.execute('''CREATE TABLE IF NOT EXISTS notes (
+            phn INTEGER NOT NULL,
+            code INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            timestamp TEXT,
+            PRIMARY KEY (phn, code))''')
+        connection.execute('CREATE INDEX IF NOT EXISTS notes_timestamp ON notes (phn, timestamp)')
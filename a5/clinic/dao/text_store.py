@@ -0,0 +1,260 @@
+import hashlib
+import os
+import struct
+import threading
+import weakref
+from clinic.dao.block_note import BlockNote
+from clinic.dao.durability import ATOMIC, NONE, check_level, open_for_write, sync_append
+from clinic.note import Note
+
+#digest, length of the utf-8 block
+BLOCK = struct.Struct('<16sI')
+
+#stores opened by open_text_store, by absolute filename
+OPENED = {}
+OPENED_LOCK = threading.Lock()
+
+def open_text_store(filename):
+    """Return the store of filename shared by every reader in the process.
+
+    The file is indexed by the first call only, later calls reuse the index
+    and the store reads what was appended since when a digest is missing.
+    """
+    filename = os.path.abspath(filename)
+    with OPENED_LOCK:
+        store = OPENED.get(filename)
+        if store is None:
+            store = OPENED[filename] = TextStore(filename)
+        return store
+
+class SharedBlock(str):
+    '''A block of text kept once by a TextStore, under its digest.
+
+    The store only holds blocks weakly, so a block is freed with the last
+    note holding it.
+    '''
+    def __new__(cls, text, digest):
+        block = super().__new__(cls, text)
+        block.digest = digest
+        return block
+
+    def __reduce__(self):
+        #copies and pickles are plain strings, independent of the text store
+        return (str, (str(self),))
+
+class TextStore:
+    '''Content-addressed store of the text blocks that notes have in common.
+
+    Note texts are cut into lines, and lines of at least MIN_BLOCK characters
+    are kept once, under the blake2b digest of their content, however many
+    notes of however many patients contain them. Notes hold the shared
+    strings instead of copies of their own, and record files refer to them
+    by digest. A block stays in memory only while notes hold it.
+
+    With a filename, blocks are appended to that file the first time a
+    record refers to them. Opening the store only indexes where each block
+    is, blocks are read when a record refers to them. Loading only reads the
+    file, a torn tail left by a crash is cut off by the next save, before it
+    appends. compact() rewrites the file without the blocks no record uses.
+    '''
+    MIN_BLOCK = 64
+    #files with fewer blocks than this are never worth a compaction
+    MIN_COMPACT = 4096
+
+    def __init__(self, filename=None, durability=ATOMIC):
+        self.filename = filename
+        self.durability = check_level(durability)
+        #digest -> the shared block, for as long as a note holds it
+        self.blocks = weakref.WeakValueDictionary()
+        #blocks not written to the file yet, only kept with a file
+        self.pending = []
+        #digest -> (offset, length) of the blocks in the file
+        self.offsets = {}
+        #end of the last whole block read from the file, and whether a torn one follows it
+        self.end = 0
+        self.torn = False
+        #(device, inode) of the file indexed, a compaction replaces it
+        self.identity = None
+        self.compact_at = self.MIN_COMPACT
+        self.lock = threading.RLock()
+        if filename and os.path.exists(filename):
+            self.load()
+            self.compact_at = max(self.MIN_COMPACT, 2 * len(self.offsets))
+
+    def load(self):
+        """Index the blocks appended to the file since it was last loaded."""
+        with self.lock, open(self.filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            #a file that is not the one indexed is indexed again from the start
+            if (stat.st_dev, stat.st_ino) != self.identity or self.end > stat.st_size:
+                self.identity = (stat.st_dev, stat.st_ino)
+                self.offsets = {}
+                self.end = 0
+            f.seek(self.end)
+            data = f.read()
+            start = 0
+            while start + BLOCK.size <= len(data):
+                digest, length = BLOCK.unpack_from(data, start)
+                end = start + BLOCK.size + length
+                if end > len(data):
+                    break
+                self.offsets[digest] = (self.end + start + BLOCK.size, length)
+                start = end
+            self.end += start
+            self.torn = start < len(data)
+
+    def read_blocks(self, digests, retry=True):
+        """Read the blocks of digests from the file, returning {digest: block} of those found."""
+        found = {}
+        with self.lock:
+            if not os.path.exists(self.filename):
+                return found
+            if any(digest not in self.offsets for digest in digests):
+                self.load()
+            with open(self.filename, 'rb') as f:
+                for digest in digests:
+                    if digest not in self.offsets:
+                        continue
+                    offset, length = self.offsets[digest]
+                    f.seek(offset - BLOCK.size)
+                    data = f.read(BLOCK.size + length)
+                    if data[:BLOCK.size] != BLOCK.pack(digest, length):
+                        if not retry:
+                            continue
+                        #the index is of a file replaced since, index the new one once
+                        self.identity = None
+                        self.load()
+                        return self.read_blocks(digests, retry=False)
+                    block = self.blocks.get(digest)
+                    if block is None:
+                        block = self.blocks[digest] = SharedBlock(data[BLOCK.size:].decode(), digest)
+                    found[digest] = block
+        return found
+
+    def share(self, text):
+        """Return the blocks of text with its long lines replaced by the shared copies."""
+        blocks = []
+        short = []
+        for line in text.splitlines(keepends=True):
+            if len(line) < self.MIN_BLOCK:
+                short.append(line)
+                continue
+            if short:
+                blocks.append(''.join(short))
+                short = []
+            digest = hashlib.blake2b(line.encode(), digest_size=16).digest()
+            with self.lock:
+                block = self.blocks.get(digest)
+                if block is None:
+                    block = self.blocks[digest] = SharedBlock(line, digest)
+                    if self.filename and digest not in self.offsets:
+                        self.pending.append(block)
+            blocks.append(block)
+        if short:
+            blocks.append(''.join(short))
+        return blocks
+
+    def note(self, code, text, timestamp=None):
+        """Create a note whose long lines are shared through the store."""
+        blocks = self.share(text)
+        #a note made of a single block, shared or not, needs no block list
+        if len(blocks) <= 1:
+            return Note(code, blocks[0] if blocks else text, timestamp)
+        return BlockNote(code, tuple(blocks), timestamp)
+
+    def digest(self, block):
+        """Return the digest of a block shared through this store, None for any other string."""
+        if isinstance(block, SharedBlock) and self.blocks.get(block.digest) is block:
+            return block.digest
+        return None
+
+    def refs(self, note):
+        """Return the blocks of note with shared ones replaced by their digests, None if it has none."""
+        blocks = note.blocks if isinstance(note, BlockNote) else (note.text,)
+        refs = tuple(self.digest(block) or block for block in blocks)
+        return refs if any(isinstance(ref, bytes) for ref in refs) else None
+
+    def resolve(self, code, refs, timestamp=None):
+        """Create the note stored as refs."""
+        #found holds the blocks until the note does
+        found = {}
+        for ref in refs:
+            if isinstance(ref, bytes):
+                block = self.blocks.get(ref)
+                if block is not None:
+                    found[ref] = block
+        missing = [ref for ref in refs if isinstance(ref, bytes) and ref not in found]
+        if missing and self.filename:
+            found.update(self.read_blocks(missing))
+        missing = [ref for ref in missing if ref not in found]
+        if missing:
+            raise LookupError('block %s of note %s is not in %s'
+                              % (missing[0].hex(), code, self.filename or 'the text store'))
+        blocks = tuple(found[ref] if isinstance(ref, bytes) else ref for ref in refs)
+        if len(blocks) == 1:
+            return Note(code, blocks[0], timestamp)
+        return BlockNote(code, blocks, timestamp)
+
+    def save(self):
+        """Append the new blocks to the file, before any record refers to them."""
+        if not self.filename:
+            return
+        with self.lock:
+            if not self.pending:
+                return
+            directory = os.path.dirname(self.filename)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            #drop a torn tail so that the new blocks are not hidden behind it
+            if self.torn:
+                os.truncate(self.filename, self.end)
+                self.torn = False
+            with open(self.filename, 'ab') as f:
+                #blocks appended by another store since the last load are left for the next one
+                read_all = f.tell() == self.end
+                for block in self.pending:
+                    data = block.encode()
+                    f.write(BLOCK.pack(block.digest, len(data)))
+                    self.offsets[block.digest] = (f.tell(), len(data))
+                    f.write(data)
+                sync_append(f, self.durability)
+                if read_all:
+                    self.end = f.tell()
+            self.pending = []
+
+    def needs_compaction(self):
+        """Return whether the file has grown to twice the blocks it kept at its last compaction."""
+        return bool(self.filename) and len(self.offsets) >= self.compact_at
+
+    def compact(self, used):
+        """Rewrite the file with only the blocks whose digests are in used or that notes in memory hold.
+
+        used are the digests the record files refer to, see
+        clinic.dao.note_dao_pickle.used_blocks.
+        """
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        with self.lock:
+            self.save()
+            self.load()
+            kept = [digest for digest in self.offsets if digest in used or digest in self.blocks]
+            with open(self.filename, 'rb') as f:
+                data = []
+                for digest in kept:
+                    offset, length = self.offsets[digest]
+                    f.seek(offset)
+                    data.append((digest, f.read(length)))
+            offsets = {}
+            #readers of the old file find out from its identity, so it is always replaced
+            with open_for_write(self.filename, 'wb', ATOMIC if self.durability == NONE else self.durability) as f:
+                for digest, block in data:
+                    f.write(BLOCK.pack(digest, len(block)))
+                    offsets[digest] = (f.tell(), len(block))
+                    f.write(block)
+                end = f.tell()
+            stat = os.stat(self.filename)
+            self.identity = (stat.st_dev, stat.st_ino)
+            self.offsets = offsets
+            self.end = end
+            self.torn = False
+            self.compact_at = max(self.MIN_COMPACT, 2 * len(offsets))
@@ -1,9 +1,19 @@
 class Note:
+    __slots__ = ('code', 'text', 'timestamp')
+
     def  __init__(self, code, text, timestamp=None):
         self.code = code
         self.text = text
         self.timestamp = timestamp
 
+    def __setstate__(self, state):
+        #record files written before Note had __slots__ pickled its __dict__
+        if isinstance(state, tuple):
+            state = state[1]
+        self.timestamp = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __eq__(self, other):
         if isinstance(other, Note):
             return (self.code == other.code and self.text == other.text)
@@ -1,21 +1,67 @@
 from clinic.dao.memory_note_dao import MemoryNoteDAO
 from clinic.dao.note_dao_pickle import NoteDAOPickle
+from sys import intern
+
+def intern_repeated(value):
+    #birth dates and cities repeat across patients, share one copy
+    return intern(value) if type(value) is str else value
 
 class Patient:
-    def __init__(self, phn, name, birth_date, phone, email, address, autosave=False):
+    #no per-instance __dict__, a registry holds one of these for every patient
+    __slots__ = ('phn', 'name', 'birth_date', 'phone', 'email', 'street', 'city',
+                 'autosave', 'note_dao_factory', '_note_dao')
+
+    def __init__(self, phn, name, birth_date, phone, email, address, autosave=False, note_dao_factory=None):
         self.phn = phn
         self.name = name
-        self.birth_date = birth_date
+        self.birth_date = intern_repeated(birth_date)
         self.phone = phone
         self.email = email
         self.address = address
-        self.note_dao = NoteDAOPickle(phn=phn, autosave=autosave) if autosave else MemoryNoteDAO()
+        self.autosave = autosave
+        #optional callable building the note store of a phn, used by backends
+        #that keep notes outside clinic/records
+        self.note_dao_factory = note_dao_factory
+        #the note store is only opened once an appointment needs it
+        self._note_dao = None
+
+    @property
+    def address(self):
+        return self.street if self.city is None else self.street + ', ' + self.city
+
+    @address.setter
+    def address(self, address):
+        #streets are mostly unique, only the city after the last comma is shared
+        if type(address) is str and ', ' in address:
+            street, _, city = address.rpartition(', ')
+            self.street, self.city = street, intern_repeated(city)
+        else:
+            self.street, self.city = address, None
+
+    @property
+    def note_dao(self):
+        if self._note_dao is None:
+            self._note_dao = self.create_note_dao()
+        return self._note_dao
+
+    def create_note_dao(self):
+        if self.note_dao_factory:
+            return self.note_dao_factory(self.phn)
+        return NoteDAOPickle(phn=self.phn, autosave=self.autosave) if self.autosave else MemoryNoteDAO()
+
+    def transient_note_dao(self):
+        """Return the open note store, or a new one that is not kept on the patient."""
+        return self._note_dao if self._note_dao is not None else self.create_note_dao()
+
+    @note_dao.setter
+    def note_dao(self, note_dao):
+        self._note_dao = note_dao
 
     def add_note(self, text):
         return self.note_dao.create_note(text)
 
-    def list_notes(self):
-        return self.note_dao.list_notes()
+    def list_notes(self, limit=None, before=None):
+        return self.note_dao.list_notes(limit, before)
 
     def __repr__(self):
         return f"Patient(phn={self.phn}, name='{self.name}')"
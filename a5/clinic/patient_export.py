@@ -0,0 +1,68 @@
+import csv
+import json
+import os
+from clinic.patient_import import FIELDS
+
+NOTE_FIELDS = ('note_code', 'note_text', 'note_timestamp')
+
+def iter_records(patient_dao, phn_from=None, phn_to=None, since=None, until=None):
+    """Yield (patient, notes) pairs one patient at a time.
+
+    Only patients with phn_from <= phn <= phn_to are exported, and only their
+    notes with since <= timestamp <= until when a time bound is given. Each
+    note store is opened for its patient only and is not kept afterwards.
+    """
+    for patient in patient_dao.iter_patients():
+        if phn_from is not None and patient.phn < phn_from:
+            continue
+        if phn_to is not None and patient.phn > phn_to:
+            continue
+        notes = patient.transient_note_dao().list_notes()
+        if since is not None or until is not None:
+            notes = [note for note in notes if note.timestamp and
+                     (since is None or note.timestamp >= since) and
+                     (until is None or note.timestamp <= until)]
+        yield patient, sorted(notes, key=lambda x: x.code)
+
+def patient_row(patient):
+    return {field: getattr(patient, field) for field in FIELDS}
+
+def note_row(note):
+    return {'code': note.code, 'text': note.text,
+            'timestamp': note.timestamp.isoformat() if note.timestamp else None}
+
+def write_jsonl(records, f):
+    """Write one JSON line per patient, with their notes in a notes list."""
+    count = 0
+    for patient, notes in records:
+        row = patient_row(patient)
+        row['notes'] = [note_row(note) for note in notes]
+        f.write(json.dumps(row) + '\n')
+        count += 1
+    return count
+
+def write_csv(records, f):
+    """Write one CSV row per note, repeating the patient columns, and one
+    row with empty note columns for a patient without notes."""
+    writer = csv.writer(f)
+    writer.writerow(FIELDS + NOTE_FIELDS)
+    count = 0
+    for patient, notes in records:
+        columns = [getattr(patient, field) for field in FIELDS]
+        if not notes:
+            writer.writerow(columns + ['', '', ''])
+        for note in notes:
+            row = note_row(note)
+            writer.writerow(columns + [row['code'], row['text'], row['timestamp'] or ''])
+        count += 1
+    return count
+
+def export_file(records, filename):
+    """Write records to a .jsonl or .csv file and return the number of patients written."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ('.csv', '.jsonl', '.ndjson'):
+        raise ValueError('unsupported export format: %s' % extension)
+    with open(filename, 'w', newline='') as f:
+        if extension == '.csv':
+            return write_csv(records, f)
+        return write_jsonl(records, f)
@@ -0,0 +1,28 @@
+import csv
+import json
+import os
+from clinic.patient import Patient
+
+FIELDS = ('phn', 'name', 'birth_date', 'phone', 'email', 'address')
+
+def read_rows(filename):
+    """Stream the rows of a .csv (with a header line) or .jsonl file as dicts."""
+    extension = os.path.splitext(filename)[1].lower()
+    with open(filename, 'r', newline='') as f:
+        if extension == '.csv':
+            yield from csv.DictReader(f)
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError('unsupported import format: %s' % extension)
+
+def parse_patient(row):
+    """Build a Patient from an imported row, raising ValueError when it is invalid."""
+    if not isinstance(row, dict) or any(row.get(field) in (None, '') for field in FIELDS):
+        raise ValueError('missing patient field')
+    phn = int(row['phn'])
+    if phn <= 0:
+        raise ValueError('invalid phn')
+    return Patient(phn, row['name'], row['birth_date'], row['phone'], row['email'], row['address'])
@@ -0,0 +1,117 @@
+import gc
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import weakref
+from clinic.dao.background_writer import BackgroundWriter
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao_log import NoteDAOLog
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.patient import Patient
+
+class BackgroundWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'patients.json')
+        self.writer = BackgroundWriter(interval=60)
+
+    def tearDown(self):
+        self.writer.close()
+        shutil.rmtree(self.directory)
+
+    def create_patients(self, dao, count):
+        for i in range(count):
+            dao.create_patient(Patient(9790010000 + i, "Patient %d" % i, "2000-10-10", "250 203 1010", "p@gmail.com", "300 Moss St, Victoria"))
+
+    def test_coalesced_flush(self):
+        dao = PatientDAOJSON(autosave=True, filename=self.filename, writer=self.writer)
+        saves = []
+        save_patients = dao.save_patients
+        dao.save_patients = lambda: saves.append(1) or save_patients()
+        self.create_patients(dao, 50)
+        self.assertFalse(os.path.exists(self.filename), "changes wait for the writer")
+        self.writer.flush()
+        self.assertEqual(len(saves), 1, "a burst of changes is written once")
+        self.assertEqual(len(PatientDAOJSON(autosave=True, filename=self.filename).list_patients()), 50)
+        self.writer.flush()
+        self.assertEqual(len(saves), 1, "nothing is written without changes")
+
+    def test_journal_and_notes(self):
+        dao = PatientDAOJSON(autosave=True, journal=True, filename=self.filename, writer=self.writer)
+        notes = NoteDAOPickle(9790010000, autosave=True, records_path=self.directory, writer=self.writer)
+        self.create_patients(dao, 3)
+        dao.delete_patient(9790010001)
+        notes.create_note("Patient comes with headache.")
+        notes.create_note("Patient feels better.")
+        self.writer.flush()
+        self.assertEqual(dao.journal_entries, 4)
+        self.assertEqual(len(PatientDAOJSON(autosave=True, filename=self.filename).list_patients()), 2)
+        self.assertEqual(len(NoteDAOPickle(9790010000, autosave=True, records_path=self.directory).list_notes()), 2)
+
+    def test_batches_saved_by_the_writer(self):
+        self.writer.interval = 0
+        for cls in (NoteDAOPickle, NoteDAOLog):
+            notes = cls(9790010000, autosave=True, records_path=self.directory, writer=self.writer)
+            saves = []
+            save_notes = notes.save_notes
+            notes.save_notes = lambda: saves.append(1) or save_notes()
+            #the thread flushes while batches commit, the two must never save at once
+            for i in range(100):
+                notes.create_note("Note %d" % i)
+                notes.begin_batch()
+                notes.create_note("Batch note %d" % i)
+                notes.commit_batch()
+            self.writer.flush()
+            self.assertEqual(len(cls(9790010000, autosave=True, records_path=self.directory).list_notes()), 200)
+            self.writer.mark_dirty = lambda store: None
+            notes.begin_batch()
+            notes.create_note("Last note")
+            saves.clear()
+            notes.commit_batch()
+            self.assertEqual(saves, [], "a committed batch is left to the writer")
+            del self.writer.mark_dirty
+            shutil.rmtree(self.directory)
+            os.makedirs(self.directory)
+
+    def test_failed_store_kept_dirty(self):
+        dao = PatientDAOJSON(autosave=True, journal=True, filename=self.filename, writer=self.writer)
+        notes = NoteDAOPickle(9790010000, autosave=True, records_path=self.directory, writer=self.writer)
+        append_journal = dao.append_journal
+        def fail(records):
+            raise OSError("disk full")
+        dao.append_journal = fail
+        self.create_patients(dao, 3)
+        notes.create_note("Patient comes with headache.")
+        with self.assertRaises(OSError):
+            self.writer.flush()
+        self.assertEqual(len(NoteDAOPickle(9790010000, autosave=True, records_path=self.directory).list_notes()), 1,
+                         "a failed store does not keep the others from being written")
+        dao.append_journal = append_journal
+        self.writer.flush()
+        self.assertEqual(len(PatientDAOJSON(autosave=True, journal=True, filename=self.filename).list_patients()), 3,
+                         "the failed changes are written by the next flush")
+
+    def test_close_releases_writer(self):
+        writer = BackgroundWriter(interval=60)
+        notes = NoteDAOPickle(9790010000, autosave=True, records_path=self.directory, writer=writer)
+        notes.create_note("Patient comes with headache.")
+        reference = weakref.ref(writer)
+        writer.close()
+        del writer, notes
+        gc.collect()
+        self.assertIsNone(reference(), "a closed writer is not kept alive by its exit hook")
+
+    def test_thread_flushes_after_interval(self):
+        self.writer.interval = 0.05
+        dao = PatientDAOJSON(autosave=True, filename=self.filename, writer=self.writer)
+        self.create_patients(dao, 2)
+        for _ in range(100):
+            if os.path.exists(self.filename):
+                break
+            time.sleep(0.05)
+        self.assertTrue(os.path.exists(self.filename), "the thread flushes on its own")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.controller import Controller
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.patient_dao_sqlite import PatientDAOSQLite
+from clinic.patient import Patient
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.controller = Controller(users={"user": "clinic2024"})
+        self.controller.login("user", "clinic2024")
+        self.patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_2 = Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_controller_commit(self):
+        with self.controller.batch():
+            self.controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+            self.controller.set_current_patient(9790012000)
+            self.controller.create_note("Patient comes with headache.")
+        self.assertEqual(self.controller.search_patient(9790012000), self.patient_1)
+        self.assertEqual(len(self.controller.list_notes()), 1)
+
+    def test_controller_rollback(self):
+        self.controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.controller.set_current_patient(9790012000)
+        self.controller.create_note("Patient comes with headache.")
+        with self.assertRaises(ValueError):
+            with self.controller.batch():
+                self.controller.create_patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+                self.controller.update_note(1, "Patient comes with a migraine.")
+                self.controller.create_note("Patient feels better.")
+                raise ValueError
+        self.assertIsNone(self.controller.search_patient(9790014444), "created patient is rolled back")
+        self.assertEqual(self.controller.retrieve_patients("Mary"), [], "name index is rolled back")
+        self.assertEqual([note.text for note in self.controller.list_notes()], ["Patient comes with headache."])
+        self.assertEqual(self.controller.create_note("Patient feels better.").code, 2, "note counter is rolled back")
+
+    def test_deferred_writes(self):
+        filename = os.path.join(self.directory, 'patients.json')
+        dao = PatientDAOJSON(autosave=True, filename=filename)
+        notes = NoteDAOPickle(9790012000, autosave=True, records_path=self.directory)
+        dao.begin_batch()
+        notes.begin_batch()
+        dao.create_patient(self.patient_1)
+        dao.create_patient(self.patient_2)
+        notes.create_note("Patient comes with headache.")
+        self.assertFalse(os.path.exists(filename), "nothing is written inside a batch")
+        self.assertFalse(os.listdir(self.directory))
+        notes.commit_batch()
+        dao.commit_batch()
+        self.assertEqual(len(PatientDAOJSON(autosave=True, filename=filename).list_patients()), 2)
+        self.assertEqual(len(NoteDAOPickle(9790012000, autosave=True, records_path=self.directory).list_notes()), 1)
+
+    def test_sqlite_rollback(self):
+        dao = PatientDAOSQLite(autosave=True, filename=os.path.join(self.directory, 'clinic.db'))
+        dao.create_patient(self.patient_1)
+        dao.begin_batch()
+        dao.create_patient(self.patient_2)
+        dao.search_patient(9790012000).note_dao.create_note("Patient comes with headache.")
+        dao.rollback_batch()
+        self.assertIsNone(dao.search_patient(9790014444))
+        self.assertEqual(dao.search_patient(9790012000).note_dao.list_notes(), [])
+        dao.connection.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from clinic.controller import Controller
+from clinic.dao.columnar_patient_dao import ColumnarPatientDAO
+from clinic.patient import Patient
+
+class ColumnarPatientDAOTest(unittest.TestCase):
+    def setUp(self):
+        self.dao = ColumnarPatientDAO()
+        self.patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_2 = Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_3 = Patient(9792225555, "Joe Hancock", "1990-01-15", "278 456 7890", "john.hancock@outlook.com", "5000 Douglas St, Saanich")
+        self.patient_4 = Patient(9794443333, "Zoë Åström", "1985-03-02", "250 555 1234", "zoe@example.com", "12 Fort St, Victoria")
+        self.dao.create_patients([self.patient_1, self.patient_2, self.patient_3, self.patient_4])
+
+    def test_search_and_retrieve(self):
+        self.assertEqual(self.dao.search_patient(9790014444), self.patient_2)
+        self.assertIsNone(self.dao.search_patient(9790000000))
+        self.assertFalse(self.dao.create_patient(self.patient_1), "phn already taken")
+        self.assertEqual(self.dao.retrieve_patients("doe"), [self.patient_1, self.patient_2])
+        self.assertEqual(self.dao.retrieve_patients("O"), [self.patient_1, self.patient_2, self.patient_3, self.patient_4])
+        self.assertEqual(self.dao.retrieve_patients("zoË"), [self.patient_4], "non-ascii names are folded")
+        self.assertEqual(self.dao.retrieve_patients("edoe"), [], "a match cannot span two names")
+        self.assertEqual(len(self.dao.retrieve_patients("")), 4)
+
+    def test_update_and_delete(self):
+        moved = Patient(9793334444, "Joe Hancock", "1990-01-15", "278 456 7890", "john.hancock@gmail.com", "200 Quadra St, Victoria")
+        self.assertTrue(self.dao.update_patient(9792225555, moved))
+        self.assertIsNone(self.dao.search_patient(9792225555))
+        self.assertEqual(self.dao.search_patient(9793334444), moved)
+        self.assertTrue(self.dao.delete_patient(9790012000))
+        self.assertFalse(self.dao.delete_patient(9790012000))
+        self.assertFalse(self.dao.update_patient(9790012000, self.patient_1))
+        self.assertEqual(self.dao.list_patients(), [self.patient_2, moved, self.patient_4])
+        self.assertEqual(self.dao.retrieve_patients("joe"), [moved])
+
+        self.dao.compact()
+        self.assertEqual(len(self.dao.phns), 3, "dead rows are dropped")
+        self.assertEqual(self.dao.list_patients(), [self.patient_2, moved, self.patient_4])
+        self.assertEqual(self.dao.retrieve_patients("doe"), [self.patient_2])
+
+    def test_notes_follow_phn(self):
+        self.dao.search_patient(9790012000).add_note("Patient comes with headache.")
+        self.assertEqual(len(self.dao.search_patient(9790012000).list_notes()), 1,
+                         "notes outlive the patient objects handed out")
+        self.dao.delete_patient(9790012000)
+        self.dao.create_patient(self.patient_1)
+        self.assertEqual(self.dao.search_patient(9790012000).list_notes(), [])
+
+    def test_rollback(self):
+        self.dao.begin_batch()
+        self.dao.delete_patient(9790012000)
+        self.dao.update_patient(9790014444, Patient(9790014444, "Mary Smith", "1995-07-01", "250 203 2020", "mary@gmail.com", "1 Main St, Victoria"))
+        self.dao.create_patient(Patient(9795555555, "New Patient", "2001-01-01", "250 000 0000", "new@gmail.com", "1 Main St, Victoria"))
+        self.dao.rollback_batch()
+        self.assertEqual(self.dao.list_patients(), [self.patient_1, self.patient_2, self.patient_3, self.patient_4])
+        self.assertEqual(self.dao.retrieve_patients("smith"), [])
+        self.assertEqual(self.dao.dead, 0)
+
+    def test_controller_backend(self):
+        controller = Controller(backend='columnar')
+        self.assertIsInstance(controller.patient_dao, ColumnarPatientDAO)
+        controller.login("user", "123456")
+        controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        controller.set_current_patient(9790012000)
+        controller.create_note("Patient comes with headache.")
+        self.assertEqual(len(controller.retrieve_notes("headache")), 1)
+        self.assertEqual(controller.retrieve_patients("john"), [self.patient_1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.bench.dictionary import train_dictionary
+from clinic.dao.compression import (MAGIC, NOTE_DICTIONARY, PATIENT_DICTIONARY, CompressedWriter,
+                                    DecompressingReader, compress, decompress, dictionary_id)
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao_log import NoteDAOLog
+from clinic.dao.note_dao_store import NoteDAOStore
+from clinic.dao.note_store import NoteStore
+from clinic.patient import Patient
+
+class CompressionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'patients.json')
+        self.patients = [Patient(9700000000 + i, "Patient %d Doe" % i, "1990-01-15", "250 203 1010",
+                                 "patient%d@gmail.com" % i, "%d Moss St, Victoria" % i) for i in range(500)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_streams(self):
+        data = b'Patient comes with headache and high blood pressure. ' * 5000
+        self.assertEqual(decompress(compress(data, NOTE_DICTIONARY)), data)
+        f = io.BytesIO()
+        writer = CompressedWriter(f, NOTE_DICTIONARY)
+        writer.write(data[:100])
+        writer.write(data[100:])
+        writer.close()
+        self.assertTrue(f.getvalue().startswith(MAGIC))
+        f.seek(0)
+        self.assertEqual(DecompressingReader(f).read(), data)
+        with self.assertRaises(ValueError, msg="files made with an unknown dictionary are rejected"):
+            decompress(compress(data, b'another dictionary'))
+
+    def test_train_dictionary(self):
+        zdict = train_dictionary(["blood pressure is high", "blood pressure is normal"], size=30)
+        self.assertLessEqual(len(zdict), 30)
+        self.assertTrue(zdict.endswith(b'blood pressure is'), "the most useful run comes last")
+
+    def test_frozen_dictionaries(self):
+        #files already written can only be read with these exact dictionaries
+        self.assertEqual(dictionary_id(NOTE_DICTIONARY), 0x3f9cfbbd)
+        self.assertEqual(dictionary_id(PATIENT_DICTIONARY), 0x68844d48)
+
+    def test_patients(self):
+        dao = PatientDAOJSON(autosave=True, filename=self.filename)
+        dao.create_patients(self.patients)
+        plain = os.path.getsize(self.filename)
+        dao = PatientDAOJSON(autosave=True, filename=self.filename, compress=True)
+        self.assertEqual(dao.list_patients(), self.patients, "plain files load in compressed mode")
+        dao.save_patients()
+        self.assertLess(os.path.getsize(self.filename) * 5, plain)
+        self.assertEqual(PatientDAOJSON(autosave=True, filename=self.filename).list_patients(), self.patients,
+                         "compressed files load in plain mode")
+
+    def test_notes(self):
+        text = "Follow up visit, blood pressure normal, patient reports mild headache."
+        store = NoteStore(os.path.join(self.directory, 'notes.dat'))
+        daos = [lambda **kwargs: NoteDAOPickle(9790012000, autosave=True, records_path=self.directory, **kwargs),
+                lambda **kwargs: NoteDAOLog(9790014444, autosave=True, records_path=self.directory, **kwargs),
+                lambda **kwargs: NoteDAOStore(9792225555, store, autosave=True, records_path=self.directory, **kwargs)]
+        for reopen in daos:
+            dao = reopen()
+            dao.create_note(text)
+            dao = reopen(compress=True)
+            dao.create_note(text + " é")
+            dao.create_note("")
+            self.assertEqual([note.text for note in reopen().list_notes()], ["", text + " é", text], type(dao).__name__)
+        store.compact()
+        self.assertEqual(len(daos[2]().list_notes()), 3, "compaction keeps compressed records")
+        store.close()
+
+if __name__ == "__main__":
+    unittest.main()
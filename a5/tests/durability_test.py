@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.dao.durability import LEVELS, UMASK, open_for_write, check_level
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.patient_dao_sqlite import PatientDAOSQLite
+from clinic.patient import Patient
+
+class DurabilityTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'patients.json')
+        self.patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_2 = Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_failed_write_keeps_old_file(self):
+        filename = os.path.join(self.directory, 'data.txt')
+        with open_for_write(filename) as f:
+            f.write('old')
+        with self.assertRaises(RuntimeError):
+            with open_for_write(filename) as f:
+                f.write('half written')
+                raise RuntimeError
+        with open(filename) as f:
+            self.assertEqual(f.read(), 'old', "an interrupted atomic write leaves the old content")
+        self.assertEqual(os.listdir(self.directory), ['data.txt'], "the temporary file is removed")
+
+    def test_overlapping_writes(self):
+        filename = os.path.join(self.directory, 'data.txt')
+        with open_for_write(filename) as first:
+            first.write('first')
+            with open_for_write(filename) as second:
+                second.write('second')
+        with open(filename) as f:
+            self.assertEqual(f.read(), 'first', "each write has a temporary file of its own")
+        self.assertEqual(os.listdir(self.directory), ['data.txt'])
+        self.assertEqual(os.stat(filename).st_mode & 0o777, 0o666 & ~UMASK)
+
+    def test_levels(self):
+        with self.assertRaises(ValueError):
+            check_level('sometimes')
+        for durability in LEVELS:
+            dao = PatientDAOJSON(autosave=True, filename=self.filename, durability=durability)
+            dao.create_patient(self.patient_1)
+            dao.create_patient(self.patient_2)
+            dao.delete_patient(9790012000)
+            dao = PatientDAOJSON(autosave=True, filename=self.filename, durability=durability)
+            self.assertEqual(dao.list_patients(), [self.patient_2], durability)
+            dao.delete_patient(9790014444)
+
+            notes = NoteDAOPickle(phn=9790014444, autosave=True, records_path=self.directory, durability=durability)
+            notes.create_note('Patient comes with headache.')
+            notes = NoteDAOPickle(phn=9790014444, autosave=True, records_path=self.directory, durability=durability)
+            self.assertEqual(len(notes.list_notes()), 1, durability)
+            os.remove(os.path.join(self.directory, '9790014444.dat'))
+
+    def test_sqlite_synchronous(self):
+        for durability, synchronous in (('none', 0), ('atomic', 1), ('fsync', 2)):
+            dao = PatientDAOSQLite(autosave=True, filename=os.path.join(self.directory, 'clinic.db'), durability=durability)
+            self.assertEqual(dao.connection.execute('PRAGMA synchronous').fetchone()[0], synchronous)
+            dao.connection.close()
+
+if __name__ == "__main__":
+    unittest.main()
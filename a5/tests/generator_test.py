@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.bench.generator import Generator, is_valid_phn, make_phn
+from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao_log import NoteDAOLog
+
+class GeneratorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_phn(self):
+        self.assertTrue(is_valid_phn(9698658215))
+        self.assertFalse(is_valid_phn(9698658216))
+        self.assertFalse(is_valid_phn(8698658215))
+        phns = [make_phn(number) for number in range(2000)]
+        self.assertEqual(len(set(phns)), 2000)
+        self.assertTrue(all(is_valid_phn(phn) for phn in phns))
+        with self.assertRaises(ValueError):
+            make_phn(10 ** 7)
+
+    def test_deterministic(self):
+        patients = list(Generator(seed=1).iter_patients(50))
+        self.assertEqual([vars_of(p) for p in patients], [vars_of(p) for p in Generator(seed=1).iter_patients(50)])
+        self.assertEqual(vars_of(Generator(seed=1).patient(30)), vars_of(patients[30]),
+                         "a patient does not depend on those generated before it")
+        self.assertNotEqual([vars_of(p) for p in patients], [vars_of(p) for p in Generator(seed=2).iter_patients(50)])
+        notes = list(Generator(seed=1).iter_notes(7, 20))
+        self.assertEqual([(n.text, n.timestamp) for n in notes],
+                         [(n.text, n.timestamp) for n in Generator(seed=1).iter_notes(7, 20)])
+        self.assertEqual([n.code for n in notes], list(range(1, 21)))
+        self.assertEqual([n.timestamp for n in notes], sorted(n.timestamp for n in notes))
+
+    def test_history_lengths(self):
+        generator = Generator(notes_per_patient=10)
+        counts = [generator.note_count(index) for index in range(1000)]
+        self.assertTrue(5 < sum(counts) / len(counts) < 15)
+        self.assertGreater(max(counts), 30, "histories vary in length")
+        self.assertEqual(sum(1 for _ in generator.iter_notes(3)), generator.note_count(3))
+        self.assertEqual(Generator(notes_per_patient=0).note_count(3), 0)
+
+    def test_populate(self):
+        generator = Generator(notes_per_patient=3)
+        dao = MemoryPatientDAO()
+        patients, notes = generator.populate(dao, 100, chunk_size=30)
+        self.assertEqual(patients, 100)
+        self.assertEqual(len(dao.list_patients()), 100)
+        patient = dao.search_patient(generator.phn(42))
+        self.assertEqual(patient.name, generator.patient(42).name)
+        self.assertEqual(len(patient.list_notes()), generator.note_count(42))
+        self.assertEqual(notes, sum(generator.note_count(index) for index in range(100)))
+        self.assertEqual([(n.text, n.timestamp) for n in patient.list_notes()],
+                         [(n.text, n.timestamp) for n in reversed(list(generator.iter_notes(42)))],
+                         "populated notes keep the generated timestamps, like written ones")
+
+    def test_write_clinic(self):
+        generator = Generator(notes_per_patient=4)
+        for record_format, cls in (('pickle', NoteDAOPickle), ('log', NoteDAOLog)):
+            directory = os.path.join(self.directory, record_format)
+            patients, notes = generator.write_clinic(directory, 60, record_format)
+            dao = PatientDAOJSON(autosave=True, filename=os.path.join(directory, 'patients.json'))
+            self.assertEqual(len(dao.list_patients()), 60)
+            self.assertEqual(vars_of(dao.search_patient(generator.phn(5))), vars_of(generator.patient(5)))
+            records_path = os.path.join(directory, 'records')
+            loaded = sum(len(cls(generator.phn(index), autosave=True, records_path=records_path).list_notes())
+                         for index in range(60))
+            self.assertEqual(loaded, notes)
+            history = list(generator.iter_notes(9))
+            note_dao = cls(generator.phn(9), autosave=True, records_path=records_path)
+            self.assertEqual([(n.text, n.timestamp) for n in note_dao.list_notes()],
+                             [(n.text, n.timestamp) for n in reversed(history)])
+
+def vars_of(patient):
+    return (patient.phn, patient.name, patient.birth_date, patient.phone, patient.email, patient.address)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.controller import Controller
+from clinic.dao.global_note_index import GlobalNoteIndex, read_generation
+from clinic.exception.illegal_operation_exception import IllegalOperationException
+
+class GlobalNoteIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'notes.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_persistence(self):
+        index = GlobalNoteIndex(self.filename)
+        index.put_note(9790012000, 1, "Patient takes Losartan 50mg.")
+        index.save()
+        index.put_note(9790014444, 1, "Losartan was stopped.")
+        index.put_note(9790014444, 2, "Patient has a headache.")
+        index.delete_note(9790012000, 1)
+
+        index = GlobalNoteIndex(self.filename)
+        self.assertTrue(index.load(), "snapshot and journal are loaded")
+        self.assertEqual(index.search("losartan"), {(9790014444, 1)})
+        index.delete_patient(9790014444)
+        self.assertEqual(index.search("losartan OR headache"), set())
+        self.assertEqual(index.codes, {})
+        self.assertFalse(GlobalNoteIndex(os.path.join(self.directory, 'missing.idx')).load())
+
+    def test_search_all_notes(self):
+        controller = Controller(users={"user": "clinic2024"}, note_index=True)
+        controller.login("user", "clinic2024")
+        controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        controller.create_patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+        controller.set_current_patient(9790014444)
+        controller.create_note("Patient takes Losartan 50mg.")
+        controller.create_note("Patient has a headache.")
+        controller.unset_current_patient()
+        controller.set_current_patient(9790012000)
+        controller.create_note("Losartan was stopped.")
+
+        hits = controller.search_all_notes("losartan")
+        self.assertEqual([(phn, note.code) for phn, note in hits], [(9790012000, 1), (9790014444, 1)])
+        self.assertEqual([phn for phn, note in controller.search_all_notes("losartan", limit=1, offset=1)], [9790014444])
+
+        # the index follows later changes
+        controller.update_note(1, "Patient stopped taking medication.")
+        controller.unset_current_patient()
+        self.assertEqual([phn for phn, note in controller.search_all_notes("losartan")], [9790014444])
+        controller.delete_patient(9790014444)
+        self.assertEqual(controller.search_all_notes("losartan OR headache"), [])
+
+        controller = Controller(users={"user": "clinic2024"})
+        controller.login("user", "clinic2024")
+        with self.assertRaises(IllegalOperationException, msg="notes are not searched without the index"):
+            controller.search_all_notes("losartan")
+
+    def enter_clinic(self):
+        """Run the test from a directory of its own, with the clinic files of an autosave Controller."""
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+        os.makedirs('clinic/records')
+        with open('clinic/users.txt', 'w') as f:
+            f.write('user,%s\n' % hashlib.sha256(b'123456').hexdigest())
+
+    def open_controller(self, **kwargs):
+        controller = Controller(autosave=True, **kwargs)
+        controller.login("user", "123456")
+        return controller
+
+    def test_rebuilt_after_changes_without_it(self):
+        self.enter_clinic()
+        controller = self.open_controller(note_index=True)
+        controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        controller.set_current_patient(9790012000)
+        controller.create_note("Patient takes Losartan 50mg.")
+        controller.logout()
+
+        # a front-end without the index changes the notes
+        controller = self.open_controller()
+        controller.set_current_patient(9790012000)
+        controller.update_note(1, "Patient stopped taking medication.")
+        controller.create_note("Losartan was stopped.")
+        controller.logout()
+
+        index = GlobalNoteIndex('clinic/notes.idx')
+        self.assertFalse(index.load(), "the saved index missed the changes")
+        controller = self.open_controller()
+        with self.assertRaises(IllegalOperationException, msg="a stale index is not searched"):
+            controller.search_all_notes("losartan")
+        controller = self.open_controller(note_index=True)
+        self.assertEqual([(phn, note.code) for phn, note in controller.search_all_notes("losartan OR medication")],
+                         [(9790012000, 1), (9790012000, 2)])
+        self.assertEqual([note.code for phn, note in controller.search_all_notes("losartan")], [2])
+        controller.logout()
+        self.assertTrue(GlobalNoteIndex('clinic/notes.idx').load(), "the rebuilt index is current")
+
+        # without note_index, the persisted index is searched and kept up to date
+        controller = self.open_controller()
+        self.assertEqual([note.code for phn, note in controller.search_all_notes("losartan")], [2])
+        controller.set_current_patient(9790012000)
+        controller.delete_note(2)
+        self.assertEqual(controller.search_all_notes("losartan"), [])
+        controller.logout()
+        self.assertTrue(GlobalNoteIndex('clinic/notes.idx').load())
+
+    def test_stamped_once_per_flush(self):
+        self.enter_clinic()
+        controller = self.open_controller(async_writes=True)
+        controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        controller.set_current_patient(9790012000)
+        controller.create_note("Patient takes Losartan 50mg.")
+        controller.logout()
+        self.assertFalse(os.path.exists('clinic/notes.idx.gen'), "there is no index to tell about the changes")
+
+        controller = self.open_controller(note_index=True, async_writes=True)
+        controller.set_current_patient(9790012000)
+        with controller.batch():
+            controller.create_note("Patient has a headache.")
+            generation = read_generation('clinic/notes.idx')
+            controller.update_note(1, "Patient stopped taking medication.")
+        controller.delete_note(2)
+        self.assertEqual(read_generation('clinic/notes.idx'), generation, "changes up to a flush share a stamp")
+        controller.logout()
+        self.assertTrue(GlobalNoteIndex('clinic/notes.idx').load())
+
+if __name__ == "__main__":
+    unittest.main()
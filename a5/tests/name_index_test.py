@@ -0,0 +1,39 @@
+import unittest
+from clinic.dao.name_index import NameIndex
+from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.patient import Patient
+
+class NameIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NameIndex([(1, "John Doe"), (2, "Mary Doe"), (3, "Joe Hancock"), (4, "Jin Hu")])
+
+    def test_search(self):
+        self.assertEqual(sorted(self.index.search("doe")), [1, 2], "search ignores case")
+        self.assertEqual(sorted(self.index.search("JO")), [1, 3], "short queries are scanned")
+        self.assertEqual(sorted(self.index.search("")), [1, 2, 3, 4], "empty query matches everyone")
+        self.assertEqual(self.index.search("n Doe"), [1])
+        self.assertEqual(self.index.search("Doe Hancock"), [], "trigrams must be contiguous")
+        self.assertEqual(self.index.search("Smith"), [])
+
+    def test_update(self):
+        self.index.add(1, "John Smith")
+        self.index.remove(4)
+        self.index.remove(4)
+        self.assertEqual(self.index.search("doe"), [2])
+        self.assertEqual(self.index.search("smith"), [1])
+        self.assertEqual(self.index.search("Jin"), [])
+        self.assertNotIn("jin", self.index.postings, "empty posting sets are dropped")
+
+    def test_memory_patient_dao(self):
+        dao = MemoryPatientDAO()
+        dao.create_patient(Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria"))
+        dao.create_patient(Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria"))
+        self.assertEqual([p.phn for p in dao.retrieve_patients("doe")], [9790012000, 9790014444])
+        dao.update_patient(9790012000, Patient(9790012001, "John Smith", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria"))
+        self.assertEqual([p.phn for p in dao.retrieve_patients("doe")], [9790014444])
+        self.assertEqual([p.phn for p in dao.retrieve_patients("smith")], [9790012001])
+        dao.delete_patient(9790014444)
+        self.assertEqual(dao.retrieve_patients("doe"), [])
+
+if __name__ == "__main__":
+    unittest.main()
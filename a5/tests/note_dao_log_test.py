@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.dao.note_dao_log import NoteDAOLog
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+
+class NoteDAOLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reopen(self, **kwargs):
+        return NoteDAOLog(9790012000, autosave=True, records_path=self.directory, **kwargs)
+
+    def test_replay(self):
+        dao = self.reopen()
+        for i in range(5):
+            dao.create_note("Note %d" % i)
+        size = os.path.getsize(dao.log_filename)
+        dao.create_note("Patient comes with headache.")
+        self.assertGreater(os.path.getsize(dao.log_filename), size, "a change is appended")
+        dao.update_note(2, "Note 1 amended")
+        dao.delete_note(4)
+        expected = dao.list_notes()
+
+        dao = self.reopen()
+        self.assertEqual(dao.list_notes(), expected)
+        self.assertEqual([note.timestamp for note in dao.list_notes()], [note.timestamp for note in expected])
+        self.assertEqual(dao.log_records, 8)
+        self.assertEqual(dao.create_note("Next").code, 7)
+
+    def test_compaction(self):
+        dao = self.reopen()
+        dao.create_note("Kept")
+        for i in range(20):
+            dao.update_note(1, "Kept %d" % i)
+        self.assertLess(dao.log_records, 20, "mostly dead logs are compacted")
+        dao = self.reopen()
+        self.assertEqual([note.text for note in dao.list_notes()], ["Kept 19"])
+
+    def test_torn_tail(self):
+        dao = self.reopen()
+        dao.create_note("First")
+        dao.create_note("Second")
+        with open(dao.log_filename, 'r+b') as f:
+            f.truncate(os.path.getsize(dao.log_filename) - 3)
+        dao = self.reopen()
+        self.assertEqual([note.text for note in dao.list_notes()], ["First"], "a torn last record is ignored")
+        dao.create_note("Third")
+        dao = self.reopen()
+        self.assertEqual([note.text for note in dao.list_notes()], ["Third", "First"])
+
+    def test_migrates_pickle(self):
+        old = NoteDAOPickle(9790012000, autosave=True, records_path=self.directory)
+        old.create_note("From the pickle")
+        dao = self.reopen()
+        self.assertEqual([note.text for note in dao.list_notes()], ["From the pickle"])
+        dao.create_note("From the log")
+        self.assertFalse(os.path.exists(dao.pickle_filename), "the log supersedes the pickle")
+        dao = self.reopen()
+        self.assertEqual([note.text for note in dao.list_notes()], ["From the log", "From the pickle"])
+
+    def test_batch(self):
+        dao = self.reopen()
+        dao.create_note("Committed")
+        dao.begin_batch()
+        dao.create_note("Rolled back")
+        dao.rollback_batch()
+        dao.begin_batch()
+        dao.create_note("Batched")
+        dao.commit_batch()
+        self.assertEqual([note.text for note in self.reopen().list_notes()], ["Batched", "Committed"])
+
+if __name__ == "__main__":
+    unittest.main()
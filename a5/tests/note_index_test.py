@@ -0,0 +1,45 @@
+import unittest
+from clinic.dao.note_index import NoteIndex, NoteQuery
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.note_dao_sqlite import NoteDAOSQLite
+from clinic.dao.sqlite_schema import connect
+
+class NoteIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NoteIndex([
+            (1, "Patient comes with headache and high blood pressure."),
+            (2, "Patient complains of a strong headache on the back of neck."),
+            (3, "Patient is taking medicines to control blood pressure."),
+            (4, "Patient feels general improvement and no more headaches.")])
+
+    def test_query(self):
+        self.assertEqual(NoteQuery('a "b c" OR d').alternatives, [[('a',), ('b', 'c')], [('d',)]])
+        self.assertEqual(self.index.search("headache"), {1, 2})
+        self.assertEqual(self.index.search("HEADACHE blood"), {1}, "terms are ANDed and case is ignored")
+        self.assertEqual(self.index.search("headache AND blood"), {1})
+        self.assertEqual(self.index.search("neck OR headaches"), {2, 4})
+        self.assertEqual(self.index.search('"blood pressure"'), {1, 3})
+        self.assertEqual(self.index.search('"pressure blood"'), set(), "phrases keep their word order")
+        self.assertEqual(self.index.search("migraine"), set())
+
+    def test_update(self):
+        self.index.add(1, "Patient comes with a migraine.")
+        self.index.remove(2)
+        self.assertEqual(self.index.search("headache"), set())
+        self.assertEqual(self.index.search("migraine"), {1})
+        self.assertNotIn("neck", self.index.postings)
+
+    def test_note_daos(self):
+        for dao in (MemoryNoteDAO(), NoteDAOPickle(), NoteDAOSQLite(connect(':memory:'), 9790012000)):
+            dao.create_note("Patient comes with headache and high blood pressure.")
+            dao.create_note("Patient complains of a strong headache on the back of neck.")
+            dao.create_note("Patient is taking medicines to control blood pressure.")
+            self.assertEqual([n.code for n in dao.query_notes('headache OR "blood pressure"')], [1, 2, 3])
+            dao.update_note(1, "Patient comes with a migraine.")
+            dao.delete_note(3)
+            self.assertEqual([n.code for n in dao.query_notes('headache OR "blood pressure"')], [2])
+            self.assertEqual([n.code for n in dao.retrieve_notes("migr")], [1], "substring search is unchanged")
+
+if __name__ == "__main__":
+    unittest.main()
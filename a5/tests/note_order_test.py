@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.patient_dao_sqlite import PatientDAOSQLite
+from clinic.note import Note
+
+class NoteOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def daos(self):
+        sqlite = PatientDAOSQLite(autosave=True, filename=os.path.join(self.directory, 'clinic.db'))
+        return [MemoryNoteDAO(), NoteDAOPickle(9790012000, autosave=True, records_path=self.directory),
+                sqlite.create_note_dao(9790012000)]
+
+    def pages(self, dao, limit):
+        notes = dao.list_notes(limit)
+        page = notes
+        while page:
+            page = dao.list_notes(limit, before=page[-1])
+            notes.extend(page)
+        return notes
+
+    def test_newest_first(self):
+        for dao in self.daos():
+            for i in range(30):
+                dao.create_note("Note %d" % i)
+            dao.update_note(5, "Note 5 amended")
+            dao.delete_note(20)
+            codes = [note.code for note in dao.list_notes()]
+            self.assertEqual(codes, [5] + [code for code in range(30, 0, -1) if code not in (5, 20)], type(dao).__name__)
+            self.assertEqual([note.code for note in dao.list_notes(3)], codes[:3])
+            for limit in (1, 4, 29, 50):
+                self.assertEqual([note.code for note in self.pages(dao, limit)], codes, type(dao).__name__)
+            #the note a page ended on may be gone by the time the next page is read
+            page = dao.list_notes(2)
+            dao.delete_note(page[-1].code)
+            self.assertEqual([note.code for note in dao.list_notes(2, before=page[-1])], codes[2:4])
+
+    def test_notes_without_timestamp(self):
+        dao = MemoryNoteDAO()
+        dao.create_note("new")
+        old = Note(7, "old")
+        dao.notes[7] = old
+        dao.order.add(7)
+        self.assertEqual(dao.list_notes(), [dao.notes[1], old], "notes without a timestamp are the oldest")
+        self.assertEqual(dao.list_notes(before=dao.notes[1]), [old])
+        self.assertEqual(dao.list_notes(before=old), [])
+        self.assertIsInstance(dao.notes[1].timestamp, datetime)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.dao.note_store import NoteStore
+from clinic.dao.note_dao_store import NoteDAOStore
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.mapped_note import MappedNote
+
+class NoteStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'notes.dat')
+        self.store = NoteStore(self.filename)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def dao(self, phn):
+        return NoteDAOStore(phn, self.store, autosave=True, records_path=self.directory)
+
+    def reopen(self, save_index=True):
+        if save_index:
+            self.store.close()
+        else:
+            self.store.file.close()
+        self.store = NoteStore(self.filename)
+
+    def test_notes_per_patient(self):
+        john = self.dao(9790012000)
+        mary = self.dao(9790014444)
+        john.create_note("John has a headache.")
+        mary.create_note("Mary has a cold.")
+        john.create_note("John feels better.")
+        john.update_note(1, "John had a headache.")
+        mary.delete_note(1)
+        for save_index in (True, False):
+            self.reopen(save_index)
+            self.assertEqual([note.text for note in self.dao(9790012000).list_notes()], ["John had a headache.", "John feels better."])
+            self.assertEqual(self.dao(9790014444).list_notes(), [])
+            self.assertEqual(self.dao(9792225555).list_notes(), [])
+        self.assertEqual(os.listdir(self.directory), ['notes.dat', 'notes.dat.idx'], "a single data file")
+
+    def test_stale_index_and_torn_tail(self):
+        self.dao(9790012000).create_note("Before the index was saved.")
+        self.store.save_index()
+        self.dao(9790012000).create_note("After the index was saved.")
+        self.dao(9790014444).create_note("Torn.")
+        self.store.file.close()
+        with open(self.filename, 'r+b') as f:
+            f.truncate(os.path.getsize(self.filename) - 2)
+        self.store = NoteStore(self.filename)
+        self.assertEqual(len(self.dao(9790012000).list_notes()), 2, "segments after the saved index are scanned")
+        self.assertNotIn(9790014444, self.store, "a torn segment is dropped")
+        self.dao(9790014444).create_note("Written again.")
+        self.reopen(False)
+        self.assertEqual([note.text for note in self.dao(9790014444).list_notes()], ["Written again."])
+
+    def test_compaction(self):
+        dao = self.dao(9790012000)
+        for i in range(10):
+            dao.create_note("Note %d" % i)
+        for i in range(1, 10):
+            dao.delete_note(i)
+        self.dao(9790014444).create_note("Mary")
+        size = os.path.getsize(self.filename)
+        self.store.compact()
+        self.assertLess(os.path.getsize(self.filename), size)
+        self.assertEqual(self.store.segments, 2)
+        self.assertEqual([note.text for note in self.dao(9790012000).list_notes()], ["Note 9"])
+        self.reopen(False)
+        self.assertEqual([note.text for note in self.dao(9790014444).list_notes()], ["Mary"])
+
+    def test_lazy_text(self):
+        dao = self.dao(9790012000)
+        for i in range(5):
+            dao.create_note("Note %d é" % i)
+        self.reopen()
+        dao = self.dao(9790012000)
+        note = dao.search_note(3)
+        self.assertIsInstance(note, MappedNote)
+        self.assertIsNotNone(note.buffer, "the text is not decoded on load")
+        self.assertEqual(note.text, "Note 2 é")
+        self.assertIsNone(note.buffer)
+        #notes loaded before a compaction still read from the old mapping
+        older = self.dao(9790012000).list_notes()
+        dao.create_note("Note 5")
+        self.store.compact()
+        self.assertEqual([n.text for n in older], ["Note %d é" % i for i in range(4, -1, -1)])
+        self.assertEqual(len(self.dao(9790012000).list_notes()), 6)
+        #listing order comes from the file, which keeps it through updates and compactions
+        self.dao(9790012000).update_note(1, "Note 0 amended")
+        self.store.compact()
+        self.reopen()
+        self.assertEqual([n.code for n in self.dao(9790012000).list_notes()], [1, 6, 5, 4, 3, 2])
+
+    def test_migrates_pickle(self):
+        NoteDAOPickle(9790012000, autosave=True, records_path=self.directory).create_note("From the pickle")
+        dao = self.dao(9790012000)
+        dao.create_note("From the store")
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '9790012000.dat')))
+        self.reopen()
+        self.assertEqual([note.text for note in self.dao(9790012000).list_notes()], ["From the store", "From the pickle"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.controller import Controller
+from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.dao.columnar_patient_dao import ColumnarPatientDAO
+from clinic.dao.patient_dao_json import PatientDAOJSON
+from clinic.dao.patient_dao_sqlite import PatientDAOSQLite
+from clinic.exception.illegal_access_exception import IllegalAccessException
+from clinic.patient import Patient
+
+class PaginationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.patients = [Patient(9700000000 + i * 37 % 50, "Patient %d %s" % (i, "Doe" if i % 2 else "Smith"), "1990-01-15",
+                                 "250 203 1010", "p@gmail.com", "Victoria") for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def daos(self):
+        return [MemoryPatientDAO(), ColumnarPatientDAO(), PatientDAOJSON(),
+                PatientDAOSQLite(autosave=True, filename=os.path.join(self.directory, 'clinic.db'))]
+
+    def pages(self, fetch, limit):
+        patients, cursor = fetch(limit, None)
+        while cursor is not None:
+            page, cursor = fetch(limit, cursor)
+            patients.extend(page)
+        return patients
+
+    def test_pages_cover_everything_once(self):
+        for dao in self.daos():
+            dao.create_patients(self.patients)
+            expected = sorted(self.patients, key=lambda p: dao.page_key(p.phn))
+            self.assertEqual(dao.list_patients(), expected, "patients are listed in page order")
+            for limit in (1, 7, 50, 100):
+                self.assertEqual(self.pages(dao.list_patients_page, limit), expected, type(dao).__name__)
+                self.assertEqual(self.pages(lambda limit, cursor: dao.retrieve_patients_page("doe", limit, cursor), limit),
+                                 dao.retrieve_patients("doe"), type(dao).__name__)
+            with self.assertRaises(ValueError):
+                dao.list_patients_page(0)
+
+    def test_stable_under_changes(self):
+        for dao in self.daos():
+            dao.create_patients(self.patients)
+            page, cursor = dao.list_patients_page(10)
+            self.assertIsInstance(cursor, str)
+            self.assertNotIn(str(page[-1].phn), cursor, "cursors are opaque")
+            with self.assertRaises(ValueError):
+                dao.list_patients_page(10, 'not a cursor')
+            #a patient before the cursor and the one right after it change between pages
+            dao.create_patient(Patient(9600000000, "New Patient", "1990-01-15", "250 203 1010", "p@gmail.com", "Victoria"))
+            dao.delete_patient(page[-1].phn)
+            dao.delete_patient(9700000010)
+            rest = self.pages(lambda limit, after: dao.list_patients_page(limit, after or cursor), 10)
+            self.assertEqual([p.phn for p in rest], list(range(9700000011, 9700000050)), type(dao).__name__)
+
+    def test_controller(self):
+        controller = Controller()
+        with self.assertRaises(IllegalAccessException):
+            controller.list_patients_page(10)
+        controller.login("user", "123456")
+        controller.patient_dao.create_patients(self.patients)
+        page, cursor = controller.list_patients_page(20)
+        self.assertEqual(len(page), 20)
+        page, cursor = controller.list_patients_page(20, cursor)
+        page, cursor = controller.list_patients_page(20, cursor)
+        self.assertEqual(len(page), 10)
+        self.assertIsNone(cursor)
+        page, cursor = controller.retrieve_patients_page("smith", 100)
+        self.assertEqual(len(page), 25)
+
+if __name__ == "__main__":
+    unittest.main()
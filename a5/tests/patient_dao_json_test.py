@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.dao.patient_dao_json import PatientDAOJSON, sort_key
+from clinic.dao.note_dao_pickle import NoteDAOPickle
+from clinic.dao.patient_decoder import PatientDecoder
+from clinic.patient import Patient
+
+class PatientDAOJSONTest(unittest.TestCase):
+    def setUp(self):
+        """Keep every file of the DAO inside a temporary directory."""
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'patients.json')
+        self.patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_2 = Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_3 = Patient(9792225555, "Joe Hancock", "1990-01-15", "278 456 7890", "john.hancock@outlook.com", "5000 Douglas St, Saanich")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reopen(self, **kwargs):
+        return PatientDAOJSON(autosave=True, filename=self.filename, **kwargs)
+
+    def test_journal_replay(self):
+        dao = self.reopen(journal=True)
+        dao.create_patient(self.patient_1)
+        dao.create_patient(self.patient_2)
+        dao.create_patient(self.patient_3)
+        self.assertFalse(os.path.exists(self.filename), "journaled writes do not rewrite the snapshot")
+        self.assertTrue(os.path.exists(dao.journal_filename), "journaled writes are appended to the log")
+
+        # changing the phn moves the patient to its new key
+        moved = Patient(9793334444, "Joe Hancock", "1990-01-15", "278 456 7890", "john.hancock@gmail.com", "200 Quadra St, Victoria")
+        self.assertTrue(dao.update_patient(9792225555, moved))
+        self.assertTrue(dao.delete_patient(9790012000))
+
+        dao = self.reopen(journal=True)
+        self.assertIsNone(dao.search_patient(9790012000), "deleted patient is gone after replay")
+        self.assertIsNone(dao.search_patient(9792225555), "old phn is gone after replay")
+        self.assertEqual(dao.search_patient(9790014444), self.patient_2)
+        self.assertEqual(dao.search_patient(9793334444), moved)
+        self.assertEqual(dao.journal_entries, 6)
+
+    def test_compaction(self):
+        dao = self.reopen(journal=True, compact_threshold=2)
+        dao.create_patient(self.patient_1)
+        self.assertTrue(os.path.exists(dao.journal_filename))
+        dao.create_patient(self.patient_2)
+        self.assertTrue(os.path.exists(self.filename), "reaching the threshold writes a snapshot")
+        self.assertFalse(os.path.exists(dao.journal_filename), "the compacted log is removed")
+        dao.create_patient(self.patient_3)
+
+        dao = self.reopen()
+        self.assertEqual(len(dao.list_patients()), 3, "snapshot and log are both loaded")
+        dao.compact_patients()
+        self.assertFalse(os.path.exists(dao.journal_filename))
+        self.assertEqual(len(self.reopen().list_patients()), 3)
+
+    def test_torn_journal_tail(self):
+        dao = self.reopen(journal=True)
+        dao.create_patient(self.patient_1)
+        with open(dao.journal_filename, 'a') as f:
+            f.write('{"op": "put", "patient": {"phn": 97')
+        dao = self.reopen(journal=True)
+        self.assertEqual(dao.list_patients(), [self.patient_1], "a torn last record is ignored")
+        dao.create_patient(self.patient_2)
+        dao = self.reopen(journal=True)
+        self.assertEqual(len(dao.list_patients()), 2, "records appended after a torn tail are replayed")
+
+    def test_notes_loaded_on_demand(self):
+        dao = self.reopen()
+        dao.create_patient(self.patient_1)
+        patient = self.reopen().search_patient(9790012000)
+        self.assertIsNone(patient._note_dao, "loading patients does not open their note stores")
+        self.assertIsInstance(patient.note_dao, NoteDAOPickle)
+        self.assertIs(patient.note_dao, patient.note_dao, "the note store is opened only once")
+
+    def test_streaming_decode(self):
+        dao = self.reopen()
+        dao.create_patient(self.patient_1)
+        dao.create_patient(self.patient_2)
+        dao.create_patient(self.patient_3)
+        decoder = PatientDecoder()
+        for chunk_size in (1, 7, 1 << 16):
+            with open(self.filename) as f:
+                patients = list(decoder.iter_decode(f, chunk_size))
+            self.assertEqual(sorted(patients, key=lambda p: p.phn), [self.patient_1, self.patient_2, self.patient_3])
+        with open(self.filename, 'w') as f:
+            f.write('[{"phn": 1, "name": "A"},')
+        with open(self.filename) as f:
+            with self.assertRaises(json.JSONDecodeError, msg="a truncated file is rejected"):
+                list(decoder.iter_decode(f, 4))
+
+    def test_maintained_order(self):
+        dao = self.reopen()
+        others = [Patient(9700000000 + i * 7 % 100, "Patient %d" % i, "1990-01-15", "250 203 1010", "p@gmail.com", "Victoria")
+                  for i in range(100)]
+        dao.create_patient(self.patient_3)
+        dao.create_patients(others[:50])
+        dao.create_patient(self.patient_1)
+        for patient in others[50:]:
+            dao.create_patient(patient)
+        dao.create_patient(self.patient_2)
+        dao.update_patient(9700000007, Patient(9700000500, "Moved", "1990-01-15", "250 203 1010", "p@gmail.com", "Victoria"))
+        dao.delete_patient(9700000042)
+        listed = dao.list_patients()
+        self.assertEqual(listed[:3], [self.patient_1, self.patient_2, self.patient_3], "priority patients come first")
+        self.assertEqual([p.phn for p in listed], sorted(dao.patients, key=sort_key))
+        self.assertEqual(len(listed), 102)
+        self.assertEqual([p.phn for p in self.reopen().list_patients()], [p.phn for p in listed])
+        with open(self.filename) as f:
+            self.assertEqual([p['phn'] for p in json.load(f)], [p.phn for p in listed], "saved in listing order")
+
+if __name__ == "__main__":
+    unittest.main()
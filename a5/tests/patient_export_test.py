@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+import unittest
+from datetime import datetime, timedelta
+from clinic.cli.export_cli import parse_until
+from clinic.controller import Controller
+from clinic.patient_export import write_csv, write_jsonl
+
+class PatientExportTest(unittest.TestCase):
+    def setUp(self):
+        self.controller = Controller(users={"user": "clinic2024"})
+        self.controller.login("user", "clinic2024")
+        self.controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.controller.create_patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+        self.controller.create_patient(9792225555, "Joe Hancock", "1990-01-15", "278 456 7890", "john.hancock@outlook.com", "5000 Douglas St, Saanich")
+        self.controller.set_current_patient(9790014444)
+        self.controller.create_note("Patient comes with headache.")
+        self.controller.create_note("Patient says high BP is controlled, 120x80 in general.")
+        self.controller.unset_current_patient()
+
+    def test_jsonl(self):
+        f = io.StringIO()
+        self.assertEqual(write_jsonl(self.controller.export_patients(phn_from=9790014444), f), 2)
+        rows = [json.loads(line) for line in f.getvalue().splitlines()]
+        self.assertEqual([row['phn'] for row in rows], [9790014444, 9792225555])
+        self.assertEqual([note['code'] for note in rows[0]['notes']], [1, 2])
+        self.assertEqual(rows[0]['notes'][1]['text'], "Patient says high BP is controlled, 120x80 in general.")
+        self.assertEqual(rows[1]['notes'], [])
+
+    def test_csv(self):
+        f = io.StringIO()
+        self.assertEqual(write_csv(self.controller.export_patients(phn_to=9790014444), f), 2)
+        rows = list(csv.DictReader(io.StringIO(f.getvalue())))
+        self.assertEqual([(row['phn'], row['note_code']) for row in rows],
+                         [('9790012000', ''), ('9790014444', '1'), ('9790014444', '2')])
+        self.assertEqual(rows[1]['address'], "300 Moss St, Victoria")
+
+    def test_note_time_filter(self):
+        records = list(self.controller.export_patients(since=datetime.now() + timedelta(days=1)))
+        self.assertEqual(len(records), 3, "time bounds filter notes, not patients")
+        self.assertEqual([notes for patient, notes in records], [[], [], []])
+        patient = self.controller.search_patient(9792225555)
+        self.assertIsNone(patient._note_dao, "exporting does not keep note stores on patients")
+
+    def test_until_date(self):
+        today = datetime.now().date().isoformat()
+        records = list(self.controller.export_patients(until=parse_until(today)))
+        self.assertEqual(len(records[1][1]), 2, "a date alone includes the notes of that whole day")
+        self.assertEqual(parse_until('2024-03-01T12:30'), datetime(2024, 3, 1, 12, 30))
+
+if __name__ == "__main__":
+    unittest.main()
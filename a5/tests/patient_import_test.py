@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.controller import Controller
+from clinic.patient import Patient
+from clinic.patient_import import read_rows
+
+class PatientImportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.controller = Controller(users={"user": "clinic2024"})
+        self.controller.login("user", "clinic2024")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as f:
+            f.write(content)
+        return filename
+
+    def test_import_csv(self):
+        self.controller.create_patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        filename = self.write('patients.csv',
+            'phn,name,birth_date,phone,email,address\n'
+            '9790012000,John Doe,2000-10-10,250 203 1010,john.doe@gmail.com,"300 Moss St, Victoria"\n'
+            '9790014444,Mary Doe,1995-07-01,250 203 2020,mary.doe@gmail.com,"300 Moss St, Victoria"\n'
+            '9790014444,Mary Doe,1995-07-01,250 203 2020,mary.doe@gmail.com,"300 Moss St, Victoria"\n'
+            'not a phn,Jin Hu,2002-02-28,278 222 4545,jinhu@outlook.com,"200 Admirals Rd, Esquimalt"\n'
+            '9792225555,Joe Hancock,1990-01-15,278 456 7890,,"5000 Douglas St, Saanich"\n')
+        progress = []
+        counts = self.controller.import_patients(read_rows(filename), progress=progress.append, chunk_size=1)
+        self.assertEqual(counts, {'read': 5, 'imported': 1, 'duplicates': 2, 'invalid': 2})
+        self.assertTrue(progress, "progress is reported")
+        expected = Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+        self.assertEqual(self.controller.search_patient(9790014444), expected)
+        self.assertEqual(self.controller.retrieve_patients("doe")[1], expected, "imported patients are indexed")
+
+    def test_import_jsonl(self):
+        filename = self.write('patients.jsonl',
+            '{"phn": 9790012000, "name": "John Doe", "birth_date": "2000-10-10", "phone": "250 203 1010", '
+            '"email": "john.doe@gmail.com", "address": "300 Moss St, Victoria"}\n\n')
+        counts = self.controller.import_patients(read_rows(filename))
+        self.assertEqual(counts['imported'], 1)
+
+    def test_failed_import_is_rolled_back(self):
+        filename = self.write('patients.jsonl',
+            '{"phn": 9790012000, "name": "John Doe", "birth_date": "2000-10-10", "phone": "250 203 1010", '
+            '"email": "john.doe@gmail.com", "address": "300 Moss St, Victoria"}\n{"phn": 97')
+        with self.assertRaises(ValueError):
+            self.controller.import_patients(read_rows(filename), chunk_size=1)
+        self.assertEqual(self.controller.list_patients(), [])
+        with self.assertRaises(ValueError, msg="unknown formats are rejected"):
+            list(read_rows(self.write('patients.txt', '')))
+
+if __name__ == "__main__":
+    unittest.main()
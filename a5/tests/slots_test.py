@@ -0,0 +1,37 @@
+import pickle
+import unittest
+from clinic.note import Note
+from clinic.patient import Patient
+
+class SlotsTest(unittest.TestCase):
+    def test_patient(self):
+        patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "".join(["300 Moss St", ", Victoria"]))
+        patient_2 = Patient(9790014444, "Mary Doe", "2000-10-10", "250 203 2020", "mary.doe@gmail.com", "".join(["300 Moss St", ", Victoria"]))
+        self.assertFalse(hasattr(patient_1, '__dict__'), "patients have no per-instance dict")
+        self.assertEqual(patient_1.address, "300 Moss St, Victoria")
+        self.assertIs(patient_1.birth_date, patient_2.birth_date, "repeated birth dates share one string")
+
+    def test_city(self):
+        patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "".join(["300 Moss St", ", Victoria"]))
+        patient_2 = Patient(9790014444, "Mary Doe", "2001-01-01", "250 203 2020", "mary.doe@gmail.com", "".join(["12 Fort St", ", Victoria"]))
+        self.assertIs(patient_1.city, patient_2.city, "different streets in one city share the city string")
+        self.assertEqual(patient_2.address, "12 Fort St, Victoria")
+        patient_2.address = "9 Main St"
+        self.assertIsNone(patient_2.city)
+        self.assertEqual(patient_2.address, "9 Main St")
+
+    def test_note(self):
+        note = Note(1, "Patient comes with headache and high blood pressure.")
+        self.assertFalse(hasattr(note, '__dict__'), "notes have no per-instance dict")
+        self.assertEqual(pickle.loads(pickle.dumps(note)), note)
+
+    def test_old_note_pickle(self):
+        #a note pickled while Note still had a __dict__ and no timestamp
+        old = (b'\x80\x04\x956\x00\x00\x00\x00\x00\x00\x00\x8c\x0bclinic.note\x94\x8c\x04Note\x94\x93\x94)'
+               b'\x81\x94}\x94(\x8c\x04code\x94K\x01\x8c\x04text\x94\x8c\x03old\x94ub.')
+        note = pickle.loads(old)
+        self.assertEqual(note, Note(1, "old"))
+        self.assertIsNone(note.timestamp)
+
+if __name__ == "__main__":
+    unittest.main()
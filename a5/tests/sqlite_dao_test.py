@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from clinic.dao.patient_dao_sqlite import PatientDAOSQLite
+from clinic.dao.note_dao_sqlite import NoteDAOSQLite
+from clinic.patient import Patient
+
+class SQLiteDAOTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'clinic.db')
+        self.dao = PatientDAOSQLite(autosave=True, filename=self.filename)
+        self.patient_1 = Patient(9790012000, "John Doe", "2000-10-10", "250 203 1010", "john.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_2 = Patient(9790014444, "Mary Doe", "1995-07-01", "250 203 2020", "mary.doe@gmail.com", "300 Moss St, Victoria")
+        self.patient_3 = Patient(9792225555, "Joe Hancock", "1990-01-15", 2784567890, "john.hancock@outlook.com", "5000 Douglas St, Saanich")
+
+    def tearDown(self):
+        self.dao.connection.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.dao.connection.close()
+        self.dao = PatientDAOSQLite(autosave=True, filename=self.filename)
+
+    def test_patients(self):
+        self.assertTrue(self.dao.create_patient(self.patient_3))
+        self.assertTrue(self.dao.create_patient(self.patient_1))
+        self.assertTrue(self.dao.create_patient(self.patient_2))
+        self.assertFalse(self.dao.create_patient(self.patient_1), "cannot create a patient twice")
+        self.reopen()
+
+        self.assertEqual(self.dao.search_patient(9792225555), self.patient_3, "column values keep their type")
+        self.assertIsNone(self.dao.search_patient(9790017777))
+        self.assertEqual(self.dao.retrieve_patients("doe"), [self.patient_1, self.patient_2])
+        self.assertEqual(self.dao.list_patients(), [self.patient_1, self.patient_2, self.patient_3])
+
+        moved = Patient(9793334444, "Joe Hancock", "1990-01-15", "278 456 7890", "john.hancock@gmail.com", "200 Quadra St, Victoria")
+        self.assertTrue(self.dao.update_patient(9792225555, moved))
+        self.assertFalse(self.dao.update_patient(9792225555, moved), "old phn no longer exists")
+        self.assertTrue(self.dao.delete_patient(9790012000))
+        self.assertFalse(self.dao.delete_patient(9790012000))
+        self.reopen()
+        self.assertEqual(self.dao.list_patients(), [self.patient_2, moved])
+
+    def test_notes(self):
+        self.dao.create_patient(self.patient_1)
+        note_dao = self.dao.search_patient(9790012000).note_dao
+        self.assertIsInstance(note_dao, NoteDAOSQLite)
+        note_dao.create_note("Patient comes with headache and high blood pressure.")
+        note_dao.create_note("Patient complains of a strong headache on the back of neck.")
+        note_dao.create_note("Patient says high BP is controlled, 120x80 in general.")
+        self.assertTrue(note_dao.update_note(1, "Patient comes with a headache."))
+        self.assertTrue(note_dao.delete_note(2))
+        self.assertFalse(note_dao.delete_note(2))
+        self.reopen()
+
+        note_dao = self.dao.search_patient(9790012000).note_dao
+        self.assertEqual(note_dao.search_note(1).text, "Patient comes with a headache.")
+        self.assertIsNone(note_dao.search_note(2))
+        self.assertEqual([note.code for note in note_dao.retrieve_notes("HEADACHE")], [1])
+        self.assertEqual([note.code for note in note_dao.list_notes()], [1, 3], "most recently changed note first")
+        self.assertEqual(note_dao.create_note("Follow up in two weeks.").code, 4)
+        other_notes = NoteDAOSQLite(self.dao.connection, 9790014444)
+        self.assertEqual(other_notes.list_notes(), [], "notes are kept per patient")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#entry point -> module it runs, import time budget in seconds, modules it must not import
+ENTRY_POINTS = {
+    'cli': ('clinic.cli.clinic_cli', 0.5, ('PyQt6',)),
+    'import': ('clinic.cli.import_cli', 0.5, ('PyQt6',)),
+    'export': ('clinic.cli.export_cli', 0.5, ('PyQt6',)),
+    'gui': ('clinic.gui.clinic_gui', 2.0, ()),
+}
+
+def import_times(*modules):
+    """Return {module: cumulative import seconds} from python -X importtime importing modules."""
+    command = [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modules)]
+    #the first run may compile bytecode, only the second is timed
+    subprocess.run(command, cwd=ROOT, capture_output=True)
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise AssertionError(result.stderr)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('package'):
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative_us) / 1e6
+    return times
+
+class StartupTest(unittest.TestCase):
+    def test_main_imports_no_front_end(self):
+        times = import_times('clinic.__main__')
+        for name in times:
+            self.assertFalse(name.startswith(('clinic.cli', 'clinic.gui', 'clinic.controller', 'PyQt6')), name)
+
+    def test_entry_point_budgets(self):
+        for entry_point, (module, budget, forbidden) in ENTRY_POINTS.items():
+            with self.subTest(entry_point):
+                if module.startswith('clinic.gui') and importlib.util.find_spec('PyQt6') is None:
+                    self.skipTest('PyQt6 is not installed')
+                times = import_times('clinic.__main__', module)
+                for name in times:
+                    self.assertFalse(name.split('.')[0] in forbidden, '%s imports %s' % (entry_point, name))
+                self.assertLess(times[module], budget, '%s takes %.3f s to import' % (entry_point, times[module]))
+
+if __name__ == '__main__':
+    unittest.main()
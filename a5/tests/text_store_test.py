@@ -0,0 +1,177 @@
+import copy
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from clinic.dao.text_store import TextStore, open_text_store
+from clinic.dao.block_note import BlockNote
+from clinic.dao.memory_note_dao import MemoryNoteDAO
+from clinic.dao.memory_patient_dao import MemoryPatientDAO
+from clinic.dao.note_dao_pickle import NoteDAOPickle, used_blocks
+from clinic.dao.note_dao_log import NoteDAOLog
+from clinic.note import Note
+from clinic.patient import Patient
+
+HISTORY = "Family history of hypertension and type 2 diabetes, no known drug allergies.\n"
+PLAN = "Plan: continue the current medication, repeat blood work in three months.\n"
+
+class TextStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'blocks.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_share(self):
+        store = TextStore()
+        first = store.note(1, HISTORY + "Headache for two days.\n" + PLAN)
+        second = store.note(2, HISTORY + "Back pain after a fall.\n" + PLAN)
+        self.assertIsInstance(first, BlockNote)
+        self.assertEqual(first.text, HISTORY + "Headache for two days.\n" + PLAN)
+        self.assertEqual(second.text, HISTORY + "Back pain after a fall.\n" + PLAN)
+        self.assertIs(first.blocks[0], second.blocks[0], "identical lines are stored once")
+        self.assertIs(first.blocks[2], second.blocks[2])
+        self.assertEqual(len(store.blocks), 2, "short lines are not worth sharing")
+        short = store.note(3, "Patient is allergic to penicillin.")
+        self.assertIs(type(short), Note, "a note without a shared line stays a plain note")
+        self.assertIs(type(store.note(4, HISTORY)), Note)
+        self.assertIs(store.note(4, HISTORY).text, first.blocks[0])
+        self.assertEqual(store.note(5, "").text, "")
+
+    def test_copies_are_plain_notes(self):
+        note = TextStore().note(1, HISTORY + "Headache.\n" + PLAN)
+        for copied in (copy.copy(note), pickle.loads(pickle.dumps(note))):
+            self.assertIs(type(copied), Note)
+            self.assertEqual(copied, note)
+            self.assertEqual(copied.text, note.text)
+
+    def test_refs(self):
+        store = TextStore()
+        note = store.note(1, HISTORY + "Headache.\n" + PLAN)
+        refs = store.refs(note)
+        self.assertEqual(refs[1], "Headache.\n")
+        self.assertTrue(isinstance(refs[0], bytes) and isinstance(refs[2], bytes))
+        self.assertEqual(store.resolve(1, refs).text, note.text)
+        self.assertIsNone(store.refs(Note(2, "Headache.")))
+
+    def test_persistence(self):
+        store = TextStore(self.filename)
+        refs = store.refs(store.note(1, HISTORY + "Headache.\n" + PLAN))
+        store.save()
+        store.note(2, PLAN + HISTORY)
+        store.save()
+        self.assertEqual(len(TextStore(self.filename).offsets), 2, "blocks are appended once")
+        self.assertEqual(TextStore(self.filename).resolve(1, refs).text, HISTORY + "Headache.\n" + PLAN)
+        with open(self.filename, 'ab') as f:
+            f.write(b'torn')
+        size = os.path.getsize(self.filename)
+        store = TextStore(self.filename)
+        self.assertEqual(len(store.offsets), 2)
+        self.assertEqual(os.path.getsize(self.filename), size, "loading does not write")
+        store.note(3, "Referred to a specialist for further assessment of the chest pain.\n")
+        store.save()
+        self.assertEqual(len(TextStore(self.filename).offsets), 3, "a torn tail is dropped before appending")
+
+    def test_reload(self):
+        writer = TextStore(self.filename)
+        writer.note(1, HISTORY)
+        writer.save()
+        reader = TextStore(self.filename)
+        refs = writer.refs(writer.note(2, PLAN + "Headache.\n"))
+        writer.save()
+        self.assertEqual(reader.resolve(2, refs).text, PLAN + "Headache.\n",
+                         "blocks appended since the store was loaded are read")
+        self.assertEqual(len(reader.offsets), 2)
+        with self.assertRaises(LookupError):
+            reader.resolve(3, (b'\0' * 16,))
+
+    def test_unused_blocks_freed(self):
+        store = TextStore()
+        notes = MemoryNoteDAO(store)
+        notes.create_note(HISTORY + "Headache.\n")
+        notes.create_note(HISTORY + "Fever.\n" + PLAN)
+        self.assertEqual(len(store.blocks), 2)
+        notes.update_note(2, "Fever.\n")
+        self.assertEqual(len(store.blocks), 1, "a block no note holds is dropped")
+        notes.delete_note(1)
+        self.assertEqual(len(store.blocks), 0)
+        self.assertEqual(store.pending, [], "a store without a file keeps nothing to write")
+
+    def test_compact(self):
+        records = os.path.join(self.directory, 'records')
+        store = TextStore(os.path.join(records, 'blocks.dat'))
+        first = NoteDAOPickle(phn=9790012000, autosave=True, records_path=records, text_store=store)
+        first.create_note(HISTORY + "Headache.\n" + PLAN)
+        second = NoteDAOPickle(phn=9790014444, autosave=True, records_path=records, text_store=store)
+        second.create_note(PLAN + "Fever.\n")
+        #a reader that indexed the file before it is compacted
+        open_text_store(store.filename)
+        first.update_note(1, "Headache.\n")
+        del first, second
+        size = os.path.getsize(store.filename)
+        store.compact(used_blocks(records))
+        self.assertLess(os.path.getsize(store.filename), size, "blocks no record uses are dropped")
+        self.assertEqual(len(store.offsets), 1)
+        self.assertEqual(NoteDAOPickle(phn=9790014444, autosave=True, records_path=records).search_note(1).text,
+                         PLAN + "Fever.\n", "readers of the old file find the blocks in the new one")
+        self.assertEqual(len(TextStore(store.filename).offsets), 1)
+
+    def test_open_text_store(self):
+        records = os.path.join(self.directory, 'records')
+        store = TextStore(os.path.join(records, 'blocks.dat'))
+        for phn in (9790012000, 9790014444):
+            NoteDAOPickle(phn=phn, autosave=True, records_path=records, text_store=store).create_note(HISTORY + PLAN)
+        first, second = (NoteDAOPickle(phn=phn, autosave=True, records_path=records).search_note(1)
+                         for phn in (9790012000, 9790014444))
+        self.assertIs(first.blocks[0], second.blocks[0], "records without a store share the blocks read once")
+        self.assertIs(open_text_store(os.path.join(records, 'blocks.dat')), open_text_store(store.filename))
+
+    def test_memory_note_dao(self):
+        store = TextStore()
+        patient_dao = MemoryPatientDAO(store)
+        for phn in (9790012000, 9790014444):
+            patient_dao.create_patient(Patient(phn, "John Doe", "1990-01-01", "250 203 1010",
+                                               "john@gmail.com", "300 Moss St, Victoria"))
+        first = patient_dao.search_patient(9790012000).add_note(HISTORY + "Headache.\n")
+        second = patient_dao.search_patient(9790014444).add_note(HISTORY + "Fever.\n")
+        self.assertIs(first.blocks[0], second.blocks[0], "blocks are shared across patients")
+        note_dao = MemoryNoteDAO(store)
+        note_dao.create_note("Headache.")
+        note_dao.update_note(1, HISTORY + "Migraine.\n")
+        self.assertEqual(note_dao.search_note(1).text, HISTORY + "Migraine.\n")
+        self.assertEqual(note_dao.retrieve_notes("hypertension"), [note_dao.search_note(1)])
+        self.assertEqual(note_dao.query_notes("migraine"), [note_dao.search_note(1)])
+
+    def test_note_dao_pickle(self):
+        records = os.path.join(self.directory, 'records')
+        store = TextStore(os.path.join(records, 'blocks.dat'))
+        notes = NoteDAOPickle(phn=9790012000, autosave=True, records_path=records, text_store=store)
+        notes.create_note(HISTORY + "Headache for two days.\n" + PLAN)
+        notes.create_note("Patient is allergic to penicillin.")
+        notes.create_note(HISTORY + PLAN)
+        expected = notes.list_notes()
+        loaded = NoteDAOPickle(phn=9790012000, autosave=True, records_path=records,
+                               text_store=TextStore(os.path.join(records, 'blocks.dat')))
+        self.assertEqual([note.text for note in loaded.list_notes()], [note.text for note in expected])
+        self.assertIs(loaded.search_note(1).blocks[0], loaded.search_note(3).blocks[0])
+        without_store = NoteDAOPickle(phn=9790012000, autosave=True, records_path=records)
+        self.assertEqual([note.text for note in without_store.list_notes()], [note.text for note in expected],
+                         "records with shared blocks load without a text store")
+        self.assertEqual(NoteDAOLog(phn=9790012000, autosave=True, records_path=records).search_note(1).text,
+                         HISTORY + "Headache for two days.\n" + PLAN)
+
+    def test_smaller_records(self):
+        records = os.path.join(self.directory, 'records')
+        store = TextStore(os.path.join(records, 'blocks.dat'))
+        for phn, text_store in ((9790012000, store), (9790014444, None)):
+            notes = NoteDAOPickle(phn=phn, autosave=True, records_path=records, text_store=text_store)
+            for i in range(50):
+                notes.create_note(HISTORY + "Visit %d.\n" % i + PLAN)
+        shared = os.path.getsize(os.path.join(records, '9790012000.dat'))
+        plain = os.path.getsize(os.path.join(records, '9790014444.dat'))
+        self.assertLess(shared + os.path.getsize(store.filename), plain / 2)
+
+if __name__ == '__main__':
+    unittest.main()